@@ -0,0 +1,164 @@
+import asyncio
+import io
+import termios
+import time
+from collections import deque, namedtuple
+
+import serial
+
+from frame_decoder import decode_frames
+from frame_scanner import FRAME_SIZE, FrameScanner
+
+RADAR_BAUDRATE = 256000
+READ_QUEUE_SIZE = 256  # Items kept for a slow consumer before the oldest are dropped
+
+# One decoded report frame: arrival time (monotonic ns), raw bytes, and a
+# DETECTION_DTYPE array of its occupied target slots
+SerialFrame = namedtuple("SerialFrame", ["t_ns", "raw", "targets"])
+
+
+def set_vmin(fd, vmin, vtime=0):
+    """
+    Set the tty read thresholds: in non-canonical mode with vtime=0 the
+    descriptor only polls readable once vmin bytes are buffered.
+    """
+    attrs = termios.tcgetattr(fd)
+    attrs[6][termios.VMIN] = vmin
+    attrs[6][termios.VTIME] = vtime
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+
+class AsyncSerialReader:
+    """
+    Event-driven serial reader for asyncio.
+
+    The tty file descriptor is registered with the event loop, so nothing
+    runs until the kernel has data: there is no in_waiting polling and no
+    sleep between reads. Batching is done by the tty driver with VMIN/VTIME:
+    with vtime=0 the descriptor only becomes readable once vmin bytes are
+    buffered, and after a partial frame vmin is lowered to exactly the bytes
+    still missing, so each wakeup normally completes a frame.
+
+    Iterate with `async for` to get SerialFrame tuples, or open with
+    raw=True to get (t_ns, bytes) chunks instead of frames. write() sends
+    commands on the same port; while low_latency is set (a reply is
+    expected) vmin stays at 1 so short ACK frames are not held back until
+    the next report frame fills the batch.
+    """
+
+    def __init__(self, port, baudrate=RADAR_BAUDRATE, vmin=FRAME_SIZE, vtime=0,
+                 raw=False, queue_size=READ_QUEUE_SIZE, scanner=None):
+        self.port = port
+        self.baudrate = baudrate
+        self.vmin = max(1, min(255, vmin))
+        self.vtime = vtime
+        self.raw = raw
+        self.scanner = scanner or FrameScanner()
+        self._queue = deque(maxlen=queue_size)
+        self._ready = asyncio.Event()
+        self._serial = None
+        self._stream = None
+        self._loop = None
+        self._error = None
+        self._closed = False
+        self._current_vmin = None
+        self.low_latency = False
+        self.items_dropped = 0
+        self.wakeups = 0
+        self.bytes_written = 0
+
+    async def open(self):
+        self._loop = asyncio.get_running_loop()
+        self._serial = serial.Serial(self.port, self.baudrate, timeout=0)
+        self._stream = io.FileIO(self._serial.fileno(), 'rb', closefd=False)
+        self._set_vmin(self.vmin)
+        self._loop.add_reader(self._serial.fileno(), self._on_readable)
+        return self
+
+    def _set_vmin(self, vmin):
+        if vmin == self._current_vmin:
+            return
+        set_vmin(self._serial.fileno(), vmin, self.vtime)
+        self._current_vmin = vmin
+
+    def _push(self, item):
+        if len(self._queue) == self._queue.maxlen:
+            self.items_dropped += 1
+        self._queue.append(item)
+
+    def _on_readable(self):
+        self.wakeups += 1
+        t_ns = time.monotonic_ns()
+        try:
+            if self.raw:
+                data = self._stream.read(4096)
+                if data:
+                    self._push((t_ns, data))
+            else:
+                self.scanner.fill(self._stream)
+                for frame in self.scanner.frames():
+                    self._push(SerialFrame(t_ns, bytes(frame), decode_frames(frame)))
+                backlog = self.scanner.backlog
+                if self.low_latency or backlog >= self.vmin:
+                    self._set_vmin(1)
+                else:
+                    self._set_vmin(self.vmin - backlog)
+        except OSError as e:
+            self._error = e
+            self._loop.remove_reader(self._serial.fileno())
+        if self._queue or self._error:
+            self._ready.set()
+
+    def set_low_latency(self, enabled):
+        self.low_latency = enabled
+        if enabled and self._serial and not self._closed:
+            self._set_vmin(1)
+
+    def write(self, data):
+        """
+        Send bytes to the device (command frames are a few dozen bytes, so
+        the write completes without waiting on the loop).
+        """
+        if self._closed or self._serial is None:
+            raise EOFError("serial reader closed")
+        self._serial.write(data)
+        self.bytes_written += len(data)
+
+    async def read(self):
+        """
+        Wait for the next frame (or chunk in raw mode).
+        """
+        while not self._queue:
+            if self._error:
+                raise self._error
+            if self._closed:
+                raise EOFError("serial reader closed")
+            self._ready.clear()
+            await self._ready.wait()
+        return self._queue.popleft()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.read()
+        except EOFError:
+            raise StopAsyncIteration
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._serial:
+            if self._loop and not self._error:
+                self._loop.remove_reader(self._serial.fileno())
+            self._serial.close()
+        self._ready.set()
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        self.close()
+
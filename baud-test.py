@@ -1,16 +1,29 @@
+import argparse
+import os
+import select
 import serial
 import struct
+import sys
 import time
 import curses
 
+from frame_decoder import decode_frames
+from frame_scanner import FrameScanner
+
 
 # Radar constants
-RADAR_PORT = '/dev/ttyTHS1'  # Update with your Jetson Nano UART port
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')  # Update with your Jetson Nano UART port
 RADAR_BAUDRATE = 256000
 
 # Frame markers
 FRAME_HEADER = b'\xF1\xF2\xF3\xF4'  # Data frame header
 FRAME_TRAILER = b'\xF5\xF6\xF7\xF8'  # Data frame trailer
+RD03_FRAME_SIZE = 45  # Header, length, state, range, 16 range energies, trailer
+
+# TUI settings
+PROTOCOL_NAMES = {"rd03d": "RD-03D", "rd03": "RD-03"}
+REFRESH_HZ = 10  # Maximum screen refreshes per second
+TARGET_ROWS = 3  # Rows reserved for the latest frame
 
 
 def parse_frame(data):
@@ -84,18 +97,89 @@ def parse_frame(data):
 #             stdscr.refresh()
 #             time.sleep(1)
 
-def radar_read_loop(stdscr, serial_connection):
+class ScreenRows:
+    """
+    Row cache for the TUI: a row is only rewritten when its text changed,
+    and the terminal is only refreshed when something was written, at most
+    REFRESH_HZ times per second. The screen is never cleared (except on
+    resize), so curses sends just the changed cells.
+    """
+
+    def __init__(self, stdscr):
+        self.stdscr = stdscr
+        self.rows = {}
+        self.dirty = False
+        self.last_refresh = 0.0
+
+    def reset(self):
+        self.stdscr.clear()
+        self.stdscr.border(0)
+        self.rows.clear()
+        self.dirty = True
+
+    def put(self, row, text):
+        height, width = self.stdscr.getmaxyx()
+        if row >= height - 1:
+            return
+        text = text[:width - 4].ljust(width - 4)
+        if self.rows.get(row) != text:
+            self.stdscr.addstr(row, 2, text)
+            self.rows[row] = text
+            self.dirty = True
+
+    def refresh(self, now):
+        if self.dirty and now - self.last_refresh >= 1.0 / REFRESH_HZ:
+            self.stdscr.refresh()
+            self.dirty = False
+            self.last_refresh = now
+
+
+def target_rows(frame, protocol):
+    """
+    Display rows for the most recent frame.
+    """
+    if frame is None:
+        return ["No valid frame received."]
+    if protocol == "rd03":
+        frame_data = parse_frame(bytes(frame))
+        if frame_data is None:
+            return ["No valid frame received."]
+        if "error" in frame_data:
+            return [f"Error: {frame_data['error']}"]
+        return [
+            f"Target State: {frame_data['target_state']}",
+            f"Target Range: {frame_data['target_range']} cm",
+            f"Range Energy: {frame_data['range_energy']}",
+        ]
+    targets = decode_frames(frame, keep_empty=True)
+    rows = []
+    for target in targets:
+        if target["x_mm"] == target["y_mm"] == target["speed_cms"] == target["gate"] == 0:
+            rows.append(f"Target {target['slot'] + 1}: -")
+        else:
+            rows.append(f"Target {target['slot'] + 1}: x {target['x_mm']:6d} mm  y {target['y_mm']:6d} mm  "
+                        f"speed {target['speed_cms']:5d} cm/s  gate {target['gate']} mm")
+    return rows
+
+
+def radar_read_loop(stdscr, serial_connection, protocol):
     """
     Main loop to read data from the radar and display it in a TUI.
     """
     stdscr.nodelay(True)
     curses.curs_set(0)
-    stdscr.clear()
-    stdscr.border(0)
-
-    stdscr.addstr(1, 2, "Ai-Thinker RD-03 Radar TUI")
-    stdscr.addstr(2, 2, f"Listening on {RADAR_PORT} at {RADAR_BAUDRATE} baud")
-    stdscr.refresh()
+    screen = ScreenRows(stdscr)
+    screen.reset()
+
+    if protocol == "rd03":
+        scanner = FrameScanner(header=FRAME_HEADER, tail=FRAME_TRAILER, frame_size=RD03_FRAME_SIZE)
+    else:
+        scanner = FrameScanner()
+    frame = None
+    backlog = 0  # OS input queue at the last read
+    rates = (0.0, 0.0)
+    window_start = time.monotonic()
+    window_frames = window_bytes = 0
 
     while True:
         try:
@@ -103,34 +187,42 @@ def radar_read_loop(stdscr, serial_connection):
             key = stdscr.getch()
             if key == ord('q'):
                 break
-
-            if serial_connection.in_waiting:
-                raw_data = serial_connection.read(43)  # Example length of frame
-                frame_data = parse_frame(raw_data)
-
-                stdscr.clear()
-                stdscr.border(0)
-                stdscr.addstr(1, 2, "Ai-Thinker RD-03 Radar TUI")
-                stdscr.addstr(2, 2, f"Listening on {RADAR_PORT} at {RADAR_BAUDRATE} baud")
-
-                if frame_data:
-                    if "error" in frame_data:
-                        stdscr.addstr(4, 2, f"Error: {frame_data['error']}")
-                    else:
-                        stdscr.addstr(4, 2, f"Target State: {frame_data['target_state']}")
-                        stdscr.addstr(5, 2, f"Target Range: {frame_data['target_range']} cm")
-                        stdscr.addstr(6, 2, f"Range Energy: {frame_data['range_energy']}")
-                else:
-                    stdscr.addstr(4, 2, "No valid frame received.")
-
-                stdscr.addstr(8, 2, "Press 'q' to quit.")
-                stdscr.refresh()
-
-            time.sleep(0.1)
+            if key == curses.KEY_RESIZE:
+                screen.reset()
+
+            # Sleep until the radar sends data, a key is pressed or the
+            # next refresh is due
+            readable, _, _ = select.select([serial_connection.fileno(), sys.stdin], [], [], 1.0 / REFRESH_HZ)
+            if serial_connection.fileno() in readable:
+                # Bytes the OS queued since the last pass; grows when the
+                # TUI falls behind the sensor
+                backlog = serial_connection.in_waiting
+                scanner.fill(serial_connection, max(1, backlog))
+                for view in scanner.frames():
+                    frame = bytes(view)
+
+            now = time.monotonic()
+            if now - window_start >= 1.0:
+                rates = ((scanner.frame_count - window_frames) / (now - window_start),
+                         (scanner.bytes_in - window_bytes) / (now - window_start))
+                window_start = now
+                window_frames = scanner.frame_count
+                window_bytes = scanner.bytes_in
+
+            screen.put(1, f"Ai-Thinker {PROTOCOL_NAMES[protocol]} Radar TUI")
+            screen.put(2, f"Listening on {RADAR_PORT} at {RADAR_BAUDRATE} baud")
+            screen.put(4, f"Frames/s: {rates[0]:6.1f}  Bytes/s: {rates[1]:8.0f}  "
+                          f"Resyncs: {scanner.resyncs}  Backlog: {backlog} B  "
+                          f"Dropped: {scanner.dropped_bytes} B")
+            rows = target_rows(frame, protocol)
+            for i in range(TARGET_ROWS):
+                screen.put(6 + i, rows[i] if i < len(rows) else "")
+            screen.put(7 + TARGET_ROWS, "Press 'q' to quit.")
+            screen.refresh(now)
 
         except Exception as e:
-            stdscr.addstr(10, 2, f"Error: {str(e)}")
-            stdscr.refresh()
+            screen.put(9 + TARGET_ROWS, f"Error: {str(e)}")
+            screen.refresh(time.monotonic())
             time.sleep(1)
 
 
@@ -138,6 +230,11 @@ def main():
     """
     Entry point for the TUI application.
     """
+    parser = argparse.ArgumentParser(description="Radar serial monitor")
+    parser.add_argument("--protocol", choices=sorted(PROTOCOL_NAMES), default="rd03d",
+                        help="Frame format to sync on (default: rd03d)")
+    args = parser.parse_args()
+
     try:
         # Initialize serial connection
         serial_connection = serial.Serial(
@@ -145,7 +242,7 @@ def main():
             baudrate=RADAR_BAUDRATE,
             timeout=1
         )
-        curses.wrapper(radar_read_loop, serial_connection)
+        curses.wrapper(radar_read_loop, serial_connection, args.protocol)
 
     except serial.SerialException as e:
         print(f"Failed to connect to the radar module: {e}")
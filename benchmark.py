@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import contextlib
+import gc
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from capture import CaptureReader
+from frame_decoder import decode_frames
+from frame_scanner import FrameScanner
+from virtual_radar import SCENARIOS, VirtualRadar, encode_frame, generate_frames
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BACKEND_PATH = os.path.join(ROOT, 'www', 'backend', 'main.py')
+WIRE_PATH = os.path.join(ROOT, 'www', 'backend', 'wire.py')
+
+# Per-frame decoders to compare: (name, script, function)
+DECODERS = [
+    ("hex-decode.decode_packet", "hex-decode.py", "decode_packet"),
+    ("hex-vis.decode_packet", "hex-vis.py", "decode_packet"),
+    ("hex-decode0.parse_frame", "hex-decode0.py", "parse_frame"),
+    ("test-data.parse_frame", "test-data.py", "parse_frame"),
+]
+
+
+def load_script(path, name=None):
+    """
+    Import a script by path (the tools have dashes in their names).
+    """
+    name = name or os.path.splitext(os.path.basename(path))[0].replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.path.insert(0, os.path.dirname(path))
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.pop(0)
+    return module
+
+
+def load_frames(count, capture=None):
+    """
+    Benchmark input: complete frames from a capture, or a synthetic
+    multi-target stream from the emulator.
+    """
+    if capture:
+        with CaptureReader(capture) as reader:
+            frames = [bytes(frame) for _, frame in reader.frames()]
+        if not frames:
+            raise SystemExit(f"{capture} contains no complete frames")
+        return (frames * (count // len(frames) + 1))[:count]
+    return list(generate_frames(SCENARIOS["crossing"], count))
+
+
+def _time_per_frame(fn, frames, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(frames)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _allocations(fn, frames):
+    """
+    Memory per frame as seen by tracemalloc: the peak allocated during the
+    call (working buffers and output) and what is still held after it (the
+    output alone).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn(frames)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak / len(frames), retained / len(frames)
+
+
+def benchmark_decoder(fn, frames, repeat, batch=False):
+    if batch:
+        run = fn
+    else:
+        def run(frames):
+            return [fn(frame) for frame in frames]
+    elapsed = _time_per_frame(run, frames, repeat)
+    peak_bytes, retained_bytes = _allocations(run, frames)
+    return {
+        "frames_per_s": round(len(frames) / elapsed),
+        "peak_bytes_per_frame": round(peak_bytes, 1),
+        "retained_bytes_per_frame": round(retained_bytes, 1),
+    }
+
+
+def benchmark_decoders(frames, repeat):
+    results = {}
+    for name, script, function in DECODERS:
+        try:
+            module = load_script(os.path.join(ROOT, script))
+        except ImportError as e:
+            results[name] = {"skipped": f"import failed: {e}"}
+            continue
+        fn = getattr(module, function, None)
+        if fn is None:
+            results[name] = {"skipped": f"{script} has no {function}()"}
+            continue
+        results[name] = benchmark_decoder(fn, frames, repeat)
+
+    stream = b''.join(frames)
+    results["frame_decoder.decode_frames"] = benchmark_decoder(
+        lambda frames: decode_frames(stream), frames, repeat, batch=True)
+
+    def scan(frames):
+        scanner = FrameScanner()
+        view = memoryview(stream)
+        count = 0
+        for i in range(0, len(stream), 1024):
+            scanner.feed(view[i:i + 1024])
+            for _ in scanner.frames():
+                count += 1
+        return count
+    results["frame_scanner.FrameScanner"] = benchmark_decoder(scan, frames, repeat, batch=True)
+    return results
+
+
+def sequence_frames():
+    """
+    Frames whose first target carries a sequence number in x_mm, so the
+    client side can tell which frame a message was decoded from.
+    """
+    seq = 0
+    while True:
+        yield encode_frame([(seq % 0x7FFF, 1000, 0, 360)])
+        seq += 1
+
+
+def message_seq(wire, message):
+    """
+    Sequence number of the frame a backend message was decoded from.
+    """
+    data = wire.decode_binary(message) if isinstance(message, bytes) else json.loads(message)
+    if not data["targets"]:
+        return None
+    return data["targets"][0]["x_mm"]
+
+
+def benchmark_wire(frames, repeat):
+    """
+    Bytes and encode cost per frame for each websocket payload format.
+    """
+    wire = load_script(WIRE_PATH, "wire")
+    decoded = [decode_frames(frame) for frame in frames]
+    results = {}
+    for name, subprotocol in wire.FORMATS.items():
+        def encode(frames):
+            return [wire.WireFrame(seq, 0, targets).encode(subprotocol) for seq, targets in enumerate(decoded)]
+        elapsed = _time_per_frame(encode, frames, repeat)
+        size = sum(len(message) for message in encode(frames))
+        results[name] = {
+            "frames_per_s": round(len(frames) / elapsed),
+            "bytes_per_frame": round(size / len(frames), 1),
+        }
+    return results
+
+
+async def _measure_latency(backend, radar, duration, warmup, fmt):
+    import websockets
+
+    wire = load_script(WIRE_PATH, "wire")
+
+    sent = {}
+    radar.on_frame = lambda seq, t_ns: sent.__setitem__(seq % 0x7FFF, t_ns)
+    backend.RADAR_PORT = radar.port
+
+    backend.hub = backend.SensorHub(radar.port, backend.RADAR_BAUDRATE)
+    ingest = asyncio.create_task(backend.hub.run())
+
+    latencies = []
+    received = 0
+    async with websockets.serve(backend.radar_data_listener, "localhost", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        # Every frame, whatever delivery controls the environment turns on
+        query = f"format={fmt}&rate=0&deadband=0&deadband_speed=0&keyframe=0"
+        async with websockets.connect(f"ws://localhost:{port}/?{query}") as client:
+            await asyncio.sleep(0.2)  # Let the hub open the port first
+            radar.start()
+            started = time.monotonic()
+            while time.monotonic() - started < duration:
+                try:
+                    message = await asyncio.wait_for(client.recv(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                now = time.monotonic_ns()
+                received += 1
+                seq = message_seq(wire, message)
+                if seq in sent and time.monotonic() - started >= warmup:
+                    latencies.append((now - sent.pop(seq)) / 1e6)
+    ingest.cancel()
+
+    if not latencies:
+        return {"frames_sent": radar.frames_sent, "messages": received, "error": "no frames matched"}
+    latencies = np.array(latencies)
+    return {
+        "frames_sent": radar.frames_sent,
+        "messages": received,
+        "frames_matched": len(latencies),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "max_ms": round(float(latencies.max()), 3),
+    }
+
+
+def benchmark_latency(duration, warmup, interval, fmt="json"):
+    """
+    Byte-to-client latency: from the emulator writing a frame's last byte to
+    a websocket client of www/backend/main.py receiving the message.
+    """
+    try:
+        backend = load_script(BACKEND_PATH, "backend_main")
+    except ImportError as e:
+        return {"skipped": f"backend import failed: {e}"}
+    radar = VirtualRadar(sequence_frames(), interval=interval)
+    try:
+        # The backend's status lines go to stderr, keeping stdout valid JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            return asyncio.run(_measure_latency(backend, radar, duration, warmup, fmt))
+    finally:
+        radar.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RD-03D decoders and backend latency.")
+    parser.add_argument("--frames", type=int, default=50000, help="frames per decoder run")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per decoder (best is kept)")
+    parser.add_argument("--capture", help="use frames from a capture file instead of synthetic data")
+    parser.add_argument("--latency-seconds", type=float, default=10.0, help="0 to skip the latency run")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds of latency samples to discard")
+    parser.add_argument("--interval", type=float, default=0.1, help="emulated frame interval for the latency run")
+    parser.add_argument("--format", choices=["json", "binary"], default="json", help="websocket payload format")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.capture)
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "host": platform.node(),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "frames": len(frames),
+            "input": args.capture or "synthetic:crossing",
+        },
+        "decoders": benchmark_decoders(frames, args.repeat),
+        "wire": benchmark_wire(frames, args.repeat),
+    }
+    if args.latency_seconds > 0:
+        results["latency"] = benchmark_latency(args.latency_seconds, args.warmup, args.interval, args.format)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
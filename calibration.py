@@ -0,0 +1,213 @@
+import argparse
+import csv
+import os
+
+import numpy as np
+
+from capture import CaptureReader
+from frame_decoder import frame_view
+
+# Default conversion, measured by hand on the first unit (used by hex-vis.py
+# until a unit has its own calibration file)
+ANGLE_MAX_VALUE_LEFT = 34000  # Maximum value representing left 60 degrees boundary
+ANGLE_MIN_VALUE_LEFT = 32770  # Minimum value representing 0 degrees from left
+ANGLE_MAX_VALUE_RIGHT = 2000  # Maximum value representing right 60 degrees
+DISTANCE_CONVERSION_FACTOR = 33900  # Value representing 1 meter away
+ADDITIONAL_DISTANCE_FACTOR = 800  # Approximate value increment per meter after 1 meter
+
+# Per-unit calibration files, <serial>.npz
+CALIBRATION_DIR = os.environ.get('RADAR_CALIBRATION_DIR', 'calibration')
+
+RAW_VALUES = 1 << 16  # One table entry per possible 16-bit raw word
+
+
+class Calibration:
+    """
+    Raw-word to physical-unit conversion compiled into 65536-entry tables.
+
+    angle_deg and distance_m are indexed by the raw angle and distance words;
+    cos and sin are precomputed per raw angle word, so converting any number
+    of samples to cartesian coordinates is a few array lookups with no
+    per-sample Python or trigonometry.
+    """
+
+    def __init__(self, angle_deg, distance_m, serial=None, corrections=None):
+        self.angle_deg = np.asarray(angle_deg, dtype=np.float64)
+        self.distance_m = np.asarray(distance_m, dtype=np.float64)
+        if self.angle_deg.shape != (RAW_VALUES,) or self.distance_m.shape != (RAW_VALUES,):
+            raise ValueError(f"calibration tables must have {RAW_VALUES} entries")
+        radians = np.radians(self.angle_deg)
+        self.cos = np.cos(radians)
+        self.sin = np.sin(radians)
+        self.serial = serial
+        # Knots of the fitted correction curves, kept for inspection
+        self.corrections = corrections or {}
+
+    def to_polar(self, angle_raw, distance_raw):
+        """
+        Returns (angle degrees, distance m) for scalars or arrays of raw words.
+        """
+        return self.angle_deg[angle_raw], self.distance_m[distance_raw]
+
+    def to_cartesian(self, angle_raw, distance_raw):
+        """
+        Returns (x, y) in meters for scalars or arrays of raw words.
+        """
+        distance = self.distance_m[distance_raw]
+        return distance * self.cos[angle_raw], distance * self.sin[angle_raw]
+
+    def save(self, path):
+        arrays = {f"{name}_{part}": values for name, (knots, offsets) in self.corrections.items()
+                  for part, values in (("knots", knots), ("offsets", offsets))}
+        np.savez_compressed(path, angle_deg=self.angle_deg, distance_m=self.distance_m,
+                            serial=np.array(self.serial or ""), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            corrections = {}
+            for name in ("angle", "distance"):
+                if f"{name}_knots" in data:
+                    corrections[name] = (data[f"{name}_knots"], data[f"{name}_offsets"])
+            return cls(data["angle_deg"], data["distance_m"], str(data["serial"]) or None, corrections)
+
+
+def default_calibration():
+    """
+    Tables for the hand-tuned piecewise conversion hex-vis.py used per sample.
+    """
+    raw = np.arange(RAW_VALUES, dtype=np.float64)
+    angle = np.zeros(RAW_VALUES)  # 0 degrees for values outside the expected ranges
+    left = raw >= ANGLE_MIN_VALUE_LEFT
+    angle[left] = -60 + (ANGLE_MAX_VALUE_LEFT - raw[left]) / (ANGLE_MAX_VALUE_LEFT - ANGLE_MIN_VALUE_LEFT) * 60
+    right = raw <= ANGLE_MAX_VALUE_RIGHT
+    angle[right] = raw[right] / ANGLE_MAX_VALUE_RIGHT * 60
+    distance = (raw - DISTANCE_CONVERSION_FACTOR) / ADDITIONAL_DISTANCE_FACTOR + 1
+    return Calibration(angle, distance)
+
+
+def calibration_path(serial, directory=CALIBRATION_DIR):
+    return os.path.join(directory, f"{serial}.npz")
+
+
+def load_calibration(serial=None, directory=CALIBRATION_DIR):
+    """
+    Calibration for a sensor serial number, or the default when the unit has
+    not been calibrated.
+    """
+    if serial:
+        path = calibration_path(serial, directory)
+        if os.path.exists(path):
+            return Calibration.load(path)
+        print(f"No calibration for {serial} in {directory}, using defaults")
+    return default_calibration()
+
+
+def save_calibration(calibration, directory=CALIBRATION_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = calibration_path(calibration.serial, directory)
+    calibration.save(path)
+    return path
+
+
+def fit_correction(predicted, truth):
+    """
+    Piecewise-linear correction curve from reference measurements.
+
+    Samples are grouped by their true value; each group contributes one knot
+    at its median uncorrected value with its median residual as the offset.
+    Between knots the offset is interpolated, outside them it is held, so a
+    single reference position gives a constant offset.
+    Returns (knots, offsets) sorted by knot.
+    """
+    predicted = np.asarray(predicted, dtype=np.float64)
+    truth = np.asarray(truth, dtype=np.float64)
+    values, group = np.unique(truth, return_inverse=True)
+    knots = np.array([np.median(predicted[group == i]) for i in range(len(values))])
+    offsets = np.array([np.median(truth[group == i] - predicted[group == i]) for i in range(len(values))])
+    order = np.argsort(knots)
+    return knots[order], offsets[order]
+
+
+def fit_calibration(angle_raw, distance_raw, true_angle_deg, true_distance_m, serial=None, base=None):
+    """
+    Fit per-unit angle and distance corrections on top of a base calibration
+    (the default one unless given) and compile them into new tables.
+    """
+    base = base or default_calibration()
+    angle_raw = np.asarray(angle_raw, dtype=np.uint16)
+    distance_raw = np.asarray(distance_raw, dtype=np.uint16)
+    if not len(angle_raw):
+        raise ValueError("no calibration samples")
+
+    angle_knots, angle_offsets = fit_correction(base.angle_deg[angle_raw], true_angle_deg)
+    distance_knots, distance_offsets = fit_correction(base.distance_m[distance_raw], true_distance_m)
+    angle = base.angle_deg + np.interp(base.angle_deg, angle_knots, angle_offsets)
+    distance = base.distance_m + np.interp(base.distance_m, distance_knots, distance_offsets)
+    return Calibration(angle, distance, serial, {
+        "angle": (angle_knots, angle_offsets),
+        "distance": (distance_knots, distance_offsets),
+    })
+
+
+def load_session(capture_path, references_path):
+    """
+    Collect calibration samples from a recorded session.
+
+    The references file is a CSV with start_s, end_s, angle_deg and
+    distance_m columns: a target was held at that true position between
+    those capture times. Every frame in the interval with an occupied first
+    slot becomes one sample. Returns (angle_raw, distance_raw, true_angle,
+    true_distance) arrays.
+    """
+    times = []
+    words = []
+    with CaptureReader(capture_path) as reader:
+        for t_ns, frame in reader.frames():
+            target = frame_view(frame)["targets"][0, 0]
+            if target["x"] or target["y"]:
+                times.append((t_ns - reader.start_ns) / 1e9)
+                words.append((target["x"], target["y"]))
+    times = np.array(times)
+    words = np.array(words, dtype=np.uint16).reshape(-1, 2)
+
+    samples = []
+    with open(references_path, newline='') as f:
+        for row in csv.DictReader(f):
+            mask = (times >= float(row["start_s"])) & (times <= float(row["end_s"]))
+            if not mask.any():
+                print(f"No frames between {row['start_s']} s and {row['end_s']} s")
+                continue
+            count = int(mask.sum())
+            samples.append((words[mask, 0], words[mask, 1],
+                            np.full(count, float(row["angle_deg"])), np.full(count, float(row["distance_m"]))))
+    if not samples:
+        raise ValueError("no reference interval contained any frames")
+    return tuple(np.concatenate(column) for column in zip(*samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit a per-unit calibration from a recorded session.")
+    parser.add_argument("capture", help="capture file written by hex-stream.py --record")
+    parser.add_argument("references", help="CSV of start_s,end_s,angle_deg,distance_m reference positions")
+    parser.add_argument("--serial", required=True, help="sensor serial number the calibration is saved under")
+    parser.add_argument("--dir", default=CALIBRATION_DIR, help="calibration directory")
+    args = parser.parse_args()
+
+    angle_raw, distance_raw, true_angle, true_distance = load_session(args.capture, args.references)
+    calibration = fit_calibration(angle_raw, distance_raw, true_angle, true_distance, args.serial)
+    default = default_calibration()
+
+    for name, before, after, truth, unit in (
+        ("Angle", default.angle_deg[angle_raw], calibration.angle_deg[angle_raw], true_angle, "degrees"),
+        ("Distance", default.distance_m[distance_raw], calibration.distance_m[distance_raw], true_distance, "m"),
+    ):
+        rms_before = np.sqrt(np.mean((before - truth) ** 2))
+        rms_after = np.sqrt(np.mean((after - truth) ** 2))
+        print(f"{name} RMS error: {rms_before:.3f} -> {rms_after:.3f} {unit}")
+
+    print(f"Saved {len(angle_raw)} samples as {save_calibration(calibration, args.dir)}")
+
+
+if __name__ == "__main__":
+    main()
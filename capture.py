@@ -0,0 +1,239 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections import deque
+
+import numpy as np
+
+from frame_decoder import decode_frames
+from frame_scanner import FrameScanner
+
+RADAR_BAUDRATE = 256000
+
+# Capture file: header, then one record per serial read (host monotonic
+# timestamp, byte count, raw bytes). Appending never rewrites earlier data.
+CAPTURE_MAGIC = b'RD03DCAP'
+CAPTURE_HEADER = struct.Struct('<8sIq')  # magic, baud rate, wall clock ns at start
+CHUNK_HEADER = struct.Struct('<qI')  # monotonic ns of the read, length
+
+# Side index (<capture>.idx): one entry per complete frame, stamped with the
+# read that completed it and pointing at the record holding its first byte.
+INDEX_DTYPE = np.dtype([
+    ("t_ns", "<i8"),
+    ("record", "<u8"),  # file offset of the chunk record
+    ("skip", "<u4"),  # offset of the frame header inside that chunk
+])
+INDEX_RECORD = struct.Struct('<qQI')
+assert INDEX_RECORD.size == INDEX_DTYPE.itemsize
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+class CaptureWriter:
+    """
+    Append raw serial reads to a capture file and maintain its frame index.
+    """
+
+    def __init__(self, path, baudrate=RADAR_BAUDRATE):
+        self.path = path
+        self._data = open(path, 'wb')
+        self._index = open(index_path(path), 'wb')
+        self._data.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, baudrate, time.time_ns()))
+        self._offset = CAPTURE_HEADER.size
+        self._scanner = FrameScanner()
+        self._chunks = deque()  # (stream offset, record offset) of recent chunks
+        self._stream_pos = 0
+        self.frames = 0
+
+    def write(self, data, t_ns=None):
+        """
+        Record one read from the serial port. t_ns defaults to now.
+        """
+        if not data:
+            return
+        if t_ns is None:
+            t_ns = time.monotonic_ns()
+
+        self._data.write(CHUNK_HEADER.pack(t_ns, len(data)))
+        self._data.write(data)
+        self._chunks.append((self._stream_pos, self._offset))
+        self._offset += CHUNK_HEADER.size + len(data)
+        self._stream_pos += len(data)
+
+        self._scanner.feed(data)
+        for _ in self._scanner.frames():
+            start = self._scanner.last_offset
+            while len(self._chunks) > 1 and self._chunks[1][0] <= start:
+                self._chunks.popleft()
+            chunk_start, record = self._chunks[0]
+            self._index.write(INDEX_RECORD.pack(t_ns, record, start - chunk_start))
+            self.frames += 1
+
+    def flush(self):
+        self._data.flush()
+        self._index.flush()
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CaptureReader:
+    """
+    Memory-mapped reader for capture files.
+
+    Times passed to the replay methods are seconds from the start of the
+    capture; seeking goes through the frame index with a binary search.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.baudrate, self.wall_start_ns = CAPTURE_HEADER.unpack_from(self._mmap)
+        if magic != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not an RD-03D capture file")
+
+        try:
+            count = os.path.getsize(index_path(path)) // INDEX_DTYPE.itemsize
+        except FileNotFoundError:
+            count = 0
+        if count:
+            self.index = np.memmap(index_path(path), dtype=INDEX_DTYPE, mode='r', shape=(count,))
+        else:
+            self.index = np.empty(0, dtype=INDEX_DTYPE)
+
+        first = self._chunk_at(CAPTURE_HEADER.size)
+        self.start_ns = first[0] if first else 0
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def duration(self):
+        if not len(self.index):
+            return 0.0
+        return (int(self.index["t_ns"][-1]) - self.start_ns) / 1e9
+
+    def _chunk_at(self, offset):
+        """
+        Return (t_ns, data offset, length) for the record at offset, or None
+        at the end of the file or on a record truncated by an interrupted write.
+        """
+        if offset + CHUNK_HEADER.size > len(self._mmap):
+            return None
+        t_ns, length = CHUNK_HEADER.unpack_from(self._mmap, offset)
+        data = offset + CHUNK_HEADER.size
+        if data + length > len(self._mmap):
+            return None
+        return t_ns, data, length
+
+    def seek(self, seconds):
+        """
+        Return (record offset, skip) of the first frame completed at or after
+        the given time, or None if the capture ends before it.
+        """
+        t_ns = self.start_ns + int(seconds * 1e9)
+        i = int(np.searchsorted(self.index["t_ns"], t_ns, side='left'))
+        if i >= len(self.index):
+            return None
+        entry = self.index[i]
+        return int(entry["record"]), int(entry["skip"])
+
+    def chunks(self, start=None):
+        """
+        Yield (t_ns, memoryview) for each recorded read, without copying.
+        """
+        offset, skip = CAPTURE_HEADER.size, 0
+        if start:
+            position = self.seek(start)
+            if position is None:
+                return
+            offset, skip = position
+
+        view = memoryview(self._mmap)
+        try:
+            while True:
+                chunk = self._chunk_at(offset)
+                if chunk is None:
+                    return
+                t_ns, data, length = chunk
+                yield t_ns, view[data + skip:data + length]
+                offset = data + length
+                skip = 0
+        finally:
+            view.release()
+
+    def replay(self, speed=1.0, start=None):
+        """
+        Yield recorded reads paced at speed times real time (1.0 is real
+        time, 0 or None is as fast as possible).
+        """
+        origin = None
+        for t_ns, data in self.chunks(start):
+            if speed:
+                if origin is None:
+                    origin = (t_ns, time.monotonic_ns())
+                due = origin[1] + (t_ns - origin[0]) / speed
+                delay = (due - time.monotonic_ns()) / 1e9
+                if delay > 0:
+                    time.sleep(delay)
+            yield t_ns, data
+
+    def frames(self, speed=None, start=None):
+        """
+        Yield (t_ns, frame) for every complete frame, replayed through a
+        FrameScanner. Frames are memoryviews valid until the next iteration.
+        """
+        scanner = FrameScanner()
+        for t_ns, data in self.replay(speed, start):
+            scanner.feed(data)
+            for frame in scanner.frames():
+                yield t_ns, frame
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay an RD-03D capture file.")
+    parser.add_argument("path", help="capture file written by hex-stream.py --record")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 0 for as fast as possible")
+    parser.add_argument("--from", dest="start", type=float, default=None, help="start time in seconds")
+    parser.add_argument("--info", action="store_true", help="print capture summary and exit")
+    args = parser.parse_args()
+
+    with CaptureReader(args.path) as reader:
+        if args.info:
+            print(f"{args.path}: {len(reader)} frames, {reader.duration:.1f} s at {reader.baudrate} baud")
+            return
+
+        try:
+            for t_ns, frame in reader.frames(args.speed, args.start):
+                offset = (t_ns - reader.start_ns) / 1e9
+                for target in decode_frames(frame):
+                    print(f"{offset:10.3f}s slot {target['slot'] + 1}: x={target['x_mm']} mm "
+                          f"y={target['y_mm']} mm speed={target['speed_cms']} cm/s")
+        except KeyboardInterrupt:
+            print("\nStopped replay.")
+
+
+if __name__ == "__main__":
+    main()
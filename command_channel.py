@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import json
+import os
+import struct
+import time
+from collections import defaultdict, deque
+
+from async_serial import RADAR_BAUDRATE, AsyncSerialReader
+from frame_scanner import COMMAND_HEADER, COMMAND_TAIL
+
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')
+
+COMMAND_TIMEOUT = 0.5  # Seconds to wait for an ACK
+ACK_FLAG = 0x0100  # Set in the command word of every ACK
+
+# Command words
+CMD_ENABLE_CONFIG = 0x00FF
+CMD_END_CONFIG = 0x00FE
+CMD_SINGLE_TARGET = 0x0080
+CMD_MULTI_TARGET = 0x0090
+CMD_QUERY_TRACKING = 0x0091
+CMD_READ_FIRMWARE = 0x00A0
+CMD_RESTART = 0x00A3
+
+# Tracking modes reported by CMD_QUERY_TRACKING
+TRACKING_SINGLE = 1
+TRACKING_MULTI = 2
+TRACKING_MODES = {TRACKING_SINGLE: "single", TRACKING_MULTI: "multi"}
+
+ACK_STATUS = struct.Struct('<HH')  # command word | ACK_FLAG, status (0 = success)
+
+
+class CommandError(Exception):
+    pass
+
+
+class CommandTimeout(CommandError):
+    pass
+
+
+def encode_command(command, value=b''):
+    """
+    Build a command frame: header, payload length, command word, value, tail.
+    """
+    payload = struct.pack('<H', command) + value
+    return COMMAND_HEADER + struct.pack('<H', len(payload)) + payload + COMMAND_TAIL
+
+
+def parse_ack(frame):
+    """
+    Split an ACK frame into (command word, status, data).
+    """
+    frame = bytes(frame)
+    word, status = ACK_STATUS.unpack_from(frame, len(COMMAND_HEADER) + 2)
+    data = frame[len(COMMAND_HEADER) + 2 + ACK_STATUS.size:-len(COMMAND_TAIL)]
+    return word & ~ACK_FLAG, status, data
+
+
+class CommandChannel:
+    """
+    Send configuration commands over a port that is also streaming reports.
+
+    ACKs are picked out of the report stream by the reader's FrameScanner,
+    so data frames keep flowing and stay in sync while commands are in
+    flight. Every request waits on its own future; ACKs are matched to
+    requests by command word, first in first out, so any number of commands
+    can be written back to back (pipelined) and awaited together.
+    """
+
+    def __init__(self, reader, timeout=COMMAND_TIMEOUT):
+        self.reader = reader
+        self.timeout = timeout
+        self._pending = defaultdict(deque)  # command word -> futures in send order
+        self._in_flight = 0
+        self.sent = 0
+        self.acked = 0
+        self.timeouts = 0
+        self.stray_acks = 0
+        reader.scanner.on_ack = self._on_ack
+
+    def _on_ack(self, frame):
+        command, status, data = parse_ack(frame)
+        waiting = self._pending.get(command)
+        # Requests that already timed out stay queued until an ACK pops them
+        while waiting and waiting[0].done():
+            waiting.popleft()
+        if not waiting:
+            self.stray_acks += 1
+            return
+        self.acked += 1
+        waiting.popleft().set_result((status, data))
+
+    async def send(self, command, value=b'', timeout=None):
+        """
+        Send one command and return the data of its ACK.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending[command].append(future)
+        self._in_flight += 1
+        self.reader.set_low_latency(True)
+        try:
+            self.reader.write(encode_command(command, value))
+            self.sent += 1
+            status, data = await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise CommandTimeout(f"no ACK for command 0x{command:04X}") from None
+        finally:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self.reader.set_low_latency(False)
+        if status != 0:
+            raise CommandError(f"command 0x{command:04X} failed with status {status}")
+        return data
+
+    async def pipeline(self, *commands):
+        """
+        Write several (command, value) pairs without waiting in between and
+        return their ACK data in order.
+        """
+        return await asyncio.gather(*(self.send(command, value) for command, value in commands))
+
+    async def configure(self, *commands):
+        """
+        Run commands inside a configuration session, as one pipelined burst.
+        """
+        results = await self.pipeline((CMD_ENABLE_CONFIG, b'\x01\x00'), *commands, (CMD_END_CONFIG, b''))
+        return results[1:-1]
+
+    async def set_tracking_mode(self, mode):
+        command = CMD_MULTI_TARGET if mode == TRACKING_MULTI else CMD_SINGLE_TARGET
+        await self.configure((command, b''))
+
+    async def tracking_mode(self):
+        data, = await self.configure((CMD_QUERY_TRACKING, b''))
+        return struct.unpack_from('<H', data)[0]
+
+    async def firmware_version(self):
+        data, = await self.configure((CMD_READ_FIRMWARE, b''))
+        _, major, minor = struct.unpack_from('<HHI', data)
+        return f"V{major >> 8}.{major & 0xFF:02x}.{minor:08x}"
+
+    async def restart(self):
+        await self.configure((CMD_RESTART, b''))
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "acked": self.acked,
+            "timeouts": self.timeouts,
+            "stray_acks": self.stray_acks,
+        }
+
+
+async def configure_port(port, baudrate, mode=None):
+    """
+    Open a port, apply the tracking mode if given and report its state.
+    """
+    start = time.monotonic()
+    result = {"port": port}
+    try:
+        async with AsyncSerialReader(port, baudrate) as reader:
+            channel = CommandChannel(reader)
+            if mode:
+                await channel.set_tracking_mode(mode)
+            result["tracking_mode"] = TRACKING_MODES.get(await channel.tracking_mode())
+            result["firmware"] = await channel.firmware_version()
+            result["frames_seen"] = reader.scanner.frame_count
+    except (OSError, CommandError) as e:
+        result["error"] = str(e)
+    result["elapsed"] = round(time.monotonic() - start, 4)
+    return result
+
+
+async def configure_ports(ports, baudrate, mode=None):
+    return await asyncio.gather(*(configure_port(port, baudrate, mode) for port in ports))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or configure RD-03D modules while they stream.")
+    parser.add_argument("ports", nargs="*", default=[RADAR_PORT], help="serial ports (default: $RADAR_PORT)")
+    parser.add_argument("--baudrate", type=int, default=RADAR_BAUDRATE)
+    parser.add_argument("--mode", choices=["single", "multi"], help="set the tracking mode")
+    args = parser.parse_args()
+
+    mode = {"single": TRACKING_SINGLE, "multi": TRACKING_MULTI}.get(args.mode)
+    results = asyncio.run(configure_ports(args.ports, args.baudrate, mode))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
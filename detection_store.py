@@ -0,0 +1,508 @@
+import argparse
+import lzma
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+# Row kinds
+DETECTION, TRACK = 0, 1
+KINDS = {DETECTION: "detection", TRACK: "track"}
+
+# One stored row. t_ns is wall clock (ns since the epoch); ident is the
+# report slot of a detection or the ID of a track; speed is radial, negative
+# when closing in, as the sensor reports it.
+STORE_DTYPE = np.dtype([
+    ("t_ns", "<i8"),
+    ("sensor", "<u2"),
+    ("kind", "u1"),
+    ("ident", "<u4"),
+    ("x_mm", "<i4"),
+    ("y_mm", "<i4"),
+    ("speed_cms", "<i4"),
+])
+
+CHUNK_SECONDS = 60  # Time span of one chunk; chunks start on multiples of it
+CHUNK_MAX_ROWS = 1 << 16  # A busy chunk is sealed early at this many rows
+
+# Codecs
+CODEC_ZLIB, CODEC_LZMA = 1, 2
+ZLIB_LEVEL = 6
+
+# Store file: header, then one record per chunk (row count, payload length,
+# codec, compressed columns). Chunks are only ever appended.
+STORE_MAGIC = b'RD03DDET'
+STORE_HEADER = struct.Struct('<8sI')  # magic, chunk seconds
+CHUNK_HEADER = struct.Struct('<IIB')  # rows, payload length, codec
+
+# Side index (<store>.idx): one entry per chunk, so a query reads the index
+# and decompresses only the chunks overlapping its time window
+INDEX_DTYPE = np.dtype([
+    ("t_first", "<i8"),
+    ("t_last", "<i8"),
+    ("offset", "<u8"),  # file offset of the chunk record
+    ("rows", "<u4"),
+])
+INDEX_RECORD = struct.Struct('<qqQI')
+assert INDEX_RECORD.size == INDEX_DTYPE.itemsize
+
+# Segmented stores (SegmentedWriter): one complete store per time segment,
+# <path>.<segment start, Unix seconds>, so old data goes by deleting files
+SEGMENT_SECONDS = 86400
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+def encode_chunk(rows, codec=CODEC_ZLIB):
+    """
+    Delta-encode every column (timestamps and positions change little from
+    row to row, so the deltas are small and repetitive) and compress the
+    columns back to back.
+    """
+    columns = b''.join(np.diff(rows[name], prepend=rows[name].dtype.type(0)).tobytes()
+                       for name in STORE_DTYPE.names)
+    if codec == CODEC_LZMA:
+        return lzma.compress(columns)
+    return zlib.compress(columns, ZLIB_LEVEL)
+
+
+def decode_chunk(payload, count, codec):
+    columns = lzma.decompress(payload) if codec == CODEC_LZMA else zlib.decompress(payload)
+    rows = np.empty(count, dtype=STORE_DTYPE)
+    offset = 0
+    for name in STORE_DTYPE.names:
+        dtype = STORE_DTYPE[name]
+        deltas = np.frombuffer(columns, dtype=dtype, count=count, offset=offset)
+        rows[name] = np.cumsum(deltas, dtype=dtype)
+        offset += count * dtype.itemsize
+    return rows
+
+
+def detection_rows(t_ns, sensor, targets):
+    """
+    STORE_DTYPE rows for a DETECTION_DTYPE array (frame_decoder.py).
+    """
+    rows = np.empty(len(targets), dtype=STORE_DTYPE)
+    rows["t_ns"] = t_ns
+    rows["sensor"] = sensor
+    rows["kind"] = DETECTION
+    rows["ident"] = targets["slot"]
+    rows["x_mm"] = targets["x_mm"]
+    rows["y_mm"] = targets["y_mm"]
+    rows["speed_cms"] = targets["speed_cms"]
+    return rows
+
+
+def track_rows(t_ns, sensor, tracks):
+    """
+    STORE_DTYPE rows for a TRACK_DTYPE array (tracker.py).
+    """
+    x, y = tracks["x_mm"], tracks["y_mm"]
+    radial = (x * tracks["vx_mms"] + y * tracks["vy_mms"]) / np.maximum(np.hypot(x, y), 1.0)
+    rows = np.empty(len(tracks), dtype=STORE_DTYPE)
+    rows["t_ns"] = t_ns
+    rows["sensor"] = sensor
+    rows["kind"] = TRACK
+    rows["ident"] = tracks["track_id"]
+    rows["x_mm"] = np.rint(x)
+    rows["y_mm"] = np.rint(y)
+    rows["speed_cms"] = np.rint(radial / 10)
+    return rows
+
+
+def select_rows(rows, start_ns=None, end_ns=None, sensor=None, kind=None):
+    """
+    Rows within [start_ns, end_ns] of one sensor and kind (None matches any).
+    """
+    mask = np.ones(len(rows), dtype=bool)
+    if start_ns is not None:
+        mask &= rows["t_ns"] >= start_ns
+    if end_ns is not None:
+        mask &= rows["t_ns"] <= end_ns
+    if sensor is not None:
+        mask &= rows["sensor"] == sensor
+    if kind is not None:
+        mask &= rows["kind"] == kind
+    return rows[mask]
+
+
+class DetectionWriter:
+    """
+    Append detections and tracks to a chunked columnar store.
+
+    Rows are buffered in memory until their chunk's time window closes, then
+    written as one compressed record plus one index entry, so the device only
+    ever sees sequential appends of whole chunks. Opening an existing store
+    appends to it.
+    """
+
+    def __init__(self, path, codec=CODEC_ZLIB, chunk_seconds=CHUNK_SECONDS, max_rows=CHUNK_MAX_ROWS):
+        self.path = path
+        self.codec = codec
+        self.max_rows = max_rows
+        if os.path.exists(path) and os.path.getsize(path) >= STORE_HEADER.size:
+            with open(path, 'rb') as f:
+                magic, chunk_seconds = STORE_HEADER.unpack(f.read(STORE_HEADER.size))
+            if magic != STORE_MAGIC:
+                raise ValueError(f"{path} is not a detection store")
+            self._data = open(path, 'ab')
+        else:
+            self._data = open(path, 'wb')
+            self._data.write(STORE_HEADER.pack(STORE_MAGIC, chunk_seconds))
+            self._data.flush()
+        self._index = open(index_path(path), 'ab')
+        self.chunk_ns = chunk_seconds * 1_000_000_000
+        self._pending = []
+        self._pending_rows = 0
+        self._window = None
+        self.rows = 0
+        self.chunks = 0
+
+    def append(self, rows):
+        """
+        Buffer STORE_DTYPE rows, sealing chunks whose window has closed.
+        """
+        if not len(rows):
+            return
+        windows = rows["t_ns"] // self.chunk_ns
+        while len(rows):
+            if self._window is None:
+                self._window = windows[0]
+            same = np.flatnonzero(windows != self._window)
+            take = same[0] if len(same) else len(rows)
+            take = min(take, self.max_rows - self._pending_rows)
+            if take:
+                self._pending.append(rows[:take])
+                self._pending_rows += take
+                rows, windows = rows[take:], windows[take:]
+            if len(rows) or self._pending_rows >= self.max_rows:
+                self.seal()
+
+    def add_detections(self, t_ns, sensor, targets):
+        self.append(detection_rows(t_ns, sensor, targets))
+
+    def add_tracks(self, t_ns, sensor, tracks):
+        self.append(track_rows(t_ns, sensor, tracks))
+
+    def pending(self):
+        """
+        Rows buffered for the open chunk (not yet on disk).
+        """
+        if not self._pending:
+            return np.empty(0, dtype=STORE_DTYPE)
+        return np.concatenate(self._pending)
+
+    def seal(self):
+        """
+        Write the open chunk, if any.
+        """
+        self._window = None
+        if not self._pending:
+            return
+        rows = np.concatenate(self._pending)
+        self._pending.clear()
+        self._pending_rows = 0
+        payload = encode_chunk(rows, self.codec)
+        offset = self._data.tell()
+        self._data.write(CHUNK_HEADER.pack(len(rows), len(payload), self.codec))
+        self._data.write(payload)
+        # The index entry follows its data, so a reader never finds an entry
+        # for a chunk that is not completely written
+        self._data.flush()
+        t = rows["t_ns"]
+        self._index.write(INDEX_RECORD.pack(int(t.min()), int(t.max()), offset, len(rows)))
+        self._index.flush()
+        self.rows += len(rows)
+        self.chunks += 1
+
+    def close(self):
+        self.seal()
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DetectionReader:
+    """
+    Query a detection store by time window.
+
+    Chunks are found through the side index with binary searches; only
+    chunks overlapping the window are read and decompressed. refresh() picks
+    up chunks a live writer has added since.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        magic, self.chunk_seconds = STORE_HEADER.unpack(self._file.read(STORE_HEADER.size))
+        if magic != STORE_MAGIC:
+            raise ValueError(f"{path} is not a detection store")
+        self.index = np.empty(0, dtype=INDEX_DTYPE)
+        self._last_seen = self._first_after = np.empty(0, dtype=np.int64)
+        self.refresh()
+
+    def refresh(self):
+        try:
+            count = os.path.getsize(index_path(self.path)) // INDEX_DTYPE.itemsize
+        except FileNotFoundError:
+            count = 0
+        if count != len(self.index):
+            self.index = np.fromfile(index_path(self.path), dtype=INDEX_DTYPE, count=count)
+            # Chunks are in time order but rows from several sensors may
+            # overlap slightly; the running maximum keeps the search sorted
+            self._last_seen = np.maximum.accumulate(self.index["t_last"])
+            self._first_after = np.minimum.accumulate(self.index["t_first"][::-1])[::-1]
+
+    def __len__(self):
+        return int(self.index["rows"].sum())
+
+    @property
+    def time_range(self):
+        if not len(self.index):
+            return None
+        return int(self.index["t_first"].min()), int(self._last_seen[-1])
+
+    def overlapping(self, start_ns=None, end_ns=None):
+        """
+        Index positions of the chunks that may hold rows in [start_ns, end_ns].
+        """
+        first = 0 if start_ns is None else int(np.searchsorted(self._last_seen, start_ns, side='left'))
+        last = len(self.index) if end_ns is None else int(np.searchsorted(self._first_after, end_ns, side='right'))
+        return range(first, max(first, last))
+
+    def read_chunk(self, position):
+        entry = self.index[position]
+        self._file.seek(int(entry["offset"]))
+        count, length, codec = CHUNK_HEADER.unpack(self._file.read(CHUNK_HEADER.size))
+        return decode_chunk(self._file.read(length), count, codec)
+
+    def chunks(self, start_ns=None, end_ns=None, sensor=None, kind=None):
+        """
+        Yield the matching STORE_DTYPE rows chunk by chunk, in time order.
+        """
+        for position in self.overlapping(start_ns, end_ns):
+            rows = select_rows(self.read_chunk(position), start_ns, end_ns, sensor, kind)
+            if len(rows):
+                yield rows
+
+    def query(self, start_ns=None, end_ns=None, sensor=None, kind=None):
+        found = list(self.chunks(start_ns, end_ns, sensor, kind))
+        return np.concatenate(found) if found else np.empty(0, dtype=STORE_DTYPE)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def segment_path(path, segment, segment_seconds=SEGMENT_SECONDS):
+    return f"{path}.{segment * segment_seconds}"
+
+
+def list_segments(path, segment_seconds=SEGMENT_SECONDS):
+    """
+    Segment numbers of a segmented store, oldest first.
+    """
+    directory, prefix = os.path.split(path + '.')
+    segments = []
+    for name in os.listdir(directory or '.'):
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and suffix.isdigit():
+            segments.append(int(suffix) // segment_seconds)
+    return sorted(segments)
+
+
+class SegmentedWriter:
+    """
+    A detection store split into one DetectionWriter file per segment of
+    segment_seconds. A batch whose first row falls in a later segment opens
+    the next file; rows arriving late stay in the current one, so every row
+    of a segment is older than the segment's end. Expiring old data is
+    deleting whole segment files: nothing is ever rewritten.
+    """
+
+    def __init__(self, path, codec=CODEC_ZLIB, chunk_seconds=CHUNK_SECONDS, max_rows=CHUNK_MAX_ROWS,
+                 segment_seconds=SEGMENT_SECONDS):
+        self.path = path
+        self.codec = codec
+        self.chunk_seconds = chunk_seconds
+        self.max_rows = max_rows
+        self.segment_seconds = segment_seconds
+        self.segment_ns = segment_seconds * 1_000_000_000
+        self.segment = None
+        self.writer = None
+
+    def append(self, rows):
+        if not len(rows):
+            return
+        segment = int(rows["t_ns"][0]) // self.segment_ns
+        if self.segment is None or segment > self.segment:
+            if self.writer:
+                self.writer.close()
+            self.segment = segment
+            self.writer = DetectionWriter(segment_path(self.path, segment, self.segment_seconds),
+                                          self.codec, self.chunk_seconds, self.max_rows)
+        self.writer.append(rows)
+
+    def pending(self):
+        if self.writer is None:
+            return np.empty(0, dtype=STORE_DTYPE)
+        return self.writer.pending()
+
+    def drop_before(self, t_ns):
+        """
+        Delete the segments whose rows are all older than t_ns. Returns how
+        many were deleted.
+        """
+        dropped = 0
+        for segment in list_segments(self.path, self.segment_seconds):
+            if segment == self.segment or (segment + 1) * self.segment_ns > t_ns:
+                continue
+            data = segment_path(self.path, segment, self.segment_seconds)
+            for name in (data, index_path(data)):
+                try:
+                    os.remove(name)
+                except FileNotFoundError:
+                    pass
+            dropped += 1
+        return dropped
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SegmentedReader:
+    """
+    Query every segment of a segmented store as one store. positioned()
+    also gives each chunk's position, (segment, chunk), which never changes
+    once written, so a client can resume exactly where it stopped whatever
+    the order of the rows.
+    """
+
+    def __init__(self, path, segment_seconds=SEGMENT_SECONDS):
+        self.path = path
+        self.segments = {}
+        for segment in list_segments(path, segment_seconds):
+            try:
+                self.segments[segment] = DetectionReader(segment_path(path, segment, segment_seconds))
+            except (FileNotFoundError, ValueError, struct.error):
+                pass  # Deleted by retention meanwhile, or created but not written yet
+
+    def __len__(self):
+        return sum(len(reader) for reader in self.segments.values())
+
+    @property
+    def chunk_count(self):
+        return sum(len(reader.index) for reader in self.segments.values())
+
+    @property
+    def time_range(self):
+        spans = [reader.time_range for reader in self.segments.values() if reader.time_range]
+        if not spans:
+            return None
+        return min(first for first, _ in spans), max(last for _, last in spans)
+
+    def next_position(self, segment):
+        """
+        Position the next chunk sealed in segment will get.
+        """
+        reader = self.segments.get(segment)
+        return segment, len(reader.index) if reader else 0
+
+    def positioned(self, start_ns=None, end_ns=None, sensor=None, kind=None, after=None):
+        """
+        Yield ((segment, chunk), rows) for the matching rows, chunk by chunk;
+        with after, only chunks at or past that position.
+        """
+        for segment, reader in sorted(self.segments.items()):
+            if after and segment < after[0]:
+                continue
+            for position in reader.overlapping(start_ns, end_ns):
+                if after and (segment, position) < after:
+                    continue
+                rows = select_rows(reader.read_chunk(position), start_ns, end_ns, sensor, kind)
+                if len(rows):
+                    yield (segment, position), rows
+
+    def chunks(self, start_ns=None, end_ns=None, sensor=None, kind=None):
+        for _, rows in self.positioned(start_ns, end_ns, sensor, kind):
+            yield rows
+
+    @property
+    def size(self):
+        return sum(os.path.getsize(reader.path) for reader in self.segments.values())
+
+    def query(self, start_ns=None, end_ns=None, sensor=None, kind=None):
+        found = list(self.chunks(start_ns, end_ns, sensor, kind))
+        return np.concatenate(found) if found else np.empty(0, dtype=STORE_DTYPE)
+
+    def close(self):
+        for reader in self.segments.values():
+            reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_store(path):
+    """
+    Reader for a single-file store, or for the segments of a segmented one.
+    """
+    return DetectionReader(path) if os.path.exists(path) else SegmentedReader(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or query a detection store.")
+    parser.add_argument("path", help="store written by DetectionWriter (e.g. hex-vis.py with RADAR_STORE set), "
+                                     "or the base path of a segmented store (the backend's RADAR_HISTORY)")
+    parser.add_argument("--last", type=float, metavar="SECONDS", help="only rows from the last SECONDS")
+    parser.add_argument("--sensor", type=int, help="only this sensor")
+    parser.add_argument("--kind", choices=sorted(KINDS.values()), help="only detections or tracks")
+    parser.add_argument("--info", action="store_true", help="print store summary and exit")
+    args = parser.parse_args()
+
+    with open_store(args.path) as reader:
+        if args.info:
+            segmented = isinstance(reader, SegmentedReader)
+            size = reader.size if segmented else os.path.getsize(args.path)
+            chunks = reader.chunk_count if segmented else len(reader.index)
+            span = reader.time_range
+            duration = (span[1] - span[0]) / 1e9 if span else 0.0
+            print(f"{args.path}: {len(reader)} rows in {chunks} chunks, {duration:.1f} s, "
+                  f"{size / max(len(reader), 1):.2f} bytes/row on disk")
+            return
+
+        start_ns = time.time_ns() - int(args.last * 1e9) if args.last else None
+        kind = {name: value for value, name in KINDS.items()}.get(args.kind)
+        print("t,sensor,kind,ident,x_mm,y_mm,speed_cms")
+        for rows in reader.chunks(start_ns, None, args.sensor, kind):
+            for row in rows.tolist():
+                t_ns, sensor, row_kind, ident, x, y, speed = row
+                print(f"{t_ns / 1e9:.3f},{sensor},{KINDS[row_kind]},{ident},{x},{y},{speed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# Event kinds
+TRACK_START = "track_start"
+TRACK_LOST = "track_lost"
+ZONE_ENTER = "zone_enter"
+ZONE_EXIT = "zone_exit"
+ZONE_DWELL = "zone_dwell"
+APPROACH = "approach"
+DEPART = "depart"
+
+# Hysteresis
+ZONE_ENTER_SECONDS = 0.3  # A track must stay inside this long before it enters
+ZONE_EXIT_SECONDS = 1.0  # ... and stay outside this long before it exits
+ZONE_DWELL_SECONDS = 10.0  # Time inside a zone that raises a dwell event (once per visit)
+APPROACH_ENTER_MMS = 150.0  # Radial speed that starts an approach or departure
+APPROACH_EXIT_MMS = 50.0  # Radial speed below which the track counts as stationary again
+
+# Stationary, approaching, departing
+STILL, CLOSING, OPENING = 0, -1, 1
+
+# t is in seconds on the caller's clock; zone is a zone name; dwell_s is the
+# time spent inside the zone so far (dwell and exit events)
+Event = namedtuple("Event", ["kind", "sensor", "track_id", "t", "x_mm", "y_mm", "zone", "dwell_s"])
+
+
+def radial_speed(track):
+    """
+    Track velocity along the line of sight in mm/s, negative when closing in.
+    """
+    x, y = float(track["x_mm"]), float(track["y_mm"])
+    return (x * float(track["vx_mms"]) + y * float(track["vy_mms"])) / max(math.hypot(x, y), 1.0)
+
+
+class TrackState:
+    """
+    What the deriver last reported for one track.
+    """
+
+    __slots__ = ("layer", "inside", "since", "entered", "dwelled", "motion", "x_mm", "y_mm")
+
+    def __init__(self, layer):
+        self.motion = STILL
+        self.x_mm = self.y_mm = 0
+        self.reset_zones(layer)
+
+    def reset_zones(self, layer):
+        zones = len(layer.zones) if layer else 0
+        self.layer = layer
+        self.inside = np.zeros(zones, dtype=bool)  # Reported zone membership
+        self.since = np.full(zones, np.nan)  # When the raw membership started to differ
+        self.entered = np.zeros(zones)  # Time of the last enter
+        self.dwelled = np.zeros(zones, dtype=bool)  # Dwell already reported this visit
+
+    def move_to(self, layer):
+        """
+        Switch to a reloaded zone layer, carrying the state of every zone
+        that kept its name. Returns (name, entered) for each zone the track
+        was inside that no longer exists.
+        """
+        old, inside, since, entered, dwelled = self.layer, self.inside, self.since, self.entered, self.dwelled
+        self.reset_zones(layer)
+        if old is None:
+            return []
+        positions = {}
+        for position, zone in enumerate(layer.zones):
+            positions.setdefault(zone.name, position)
+        gone = []
+        for position, zone in enumerate(old.zones):
+            new = positions.get(zone.name)
+            if new is None:
+                if inside[position]:
+                    gone.append((zone.name, entered[position]))
+                continue
+            self.inside[new] = inside[position]
+            self.since[new] = since[position]
+            self.entered[new] = entered[position]
+            self.dwelled[new] = dwelled[position]
+        return gone
+
+
+class EventDeriver:
+    """
+    Turns per-frame confirmed tracks into sparse, edge-triggered events.
+
+    Track start and loss follow the tracker, which already coasts through
+    missed frames. Zone membership comes from one label lookup per track
+    (zones.py) and only changes after the raw membership has differed for
+    ZONE_ENTER_SECONDS (entering) or ZONE_EXIT_SECONDS (leaving), so a
+    track on a zone edge does not flap. Approach and depart use a Schmitt
+    trigger on the radial speed. Nothing is emitted while nothing changes.
+    """
+
+    def __init__(self, zones=None, enter_s=ZONE_ENTER_SECONDS, exit_s=ZONE_EXIT_SECONDS,
+                 dwell_s=ZONE_DWELL_SECONDS, approach_enter=APPROACH_ENTER_MMS, approach_exit=APPROACH_EXIT_MMS):
+        self.zones = zones  # zones.ZoneEngine, or None for track and motion events only
+        self.enter_s = enter_s
+        self.exit_s = exit_s
+        self.dwell_s = dwell_s
+        self.approach_enter = approach_enter
+        self.approach_exit = approach_exit
+        self.tracks = {}  # sensor -> {track_id: TrackState}
+        self.emitted = 0
+
+    def update(self, sensor, t, tracks):
+        """
+        Feed one sensor's confirmed tracks (TRACK_DTYPE) at time t and return
+        the events they cause.
+        """
+        events = []
+        known = self.tracks.setdefault(sensor, {})
+        layer, labels = None, None
+        if self.zones and len(tracks):
+            layer, labels = self.zones.lookup(sensor, tracks["x_mm"], tracks["y_mm"])
+
+        seen = set()
+        for i, track in enumerate(tracks):
+            track_id = int(track["track_id"])
+            x, y = int(track["x_mm"]), int(track["y_mm"])
+            seen.add(track_id)
+            state = known.get(track_id)
+            if state is None:
+                state = known[track_id] = TrackState(layer)
+                events.append(Event(TRACK_START, sensor, track_id, t, x, y, None, None))
+            state.x_mm, state.y_mm = x, y
+            if layer is not None:
+                if state.layer is not layer:
+                    # The zone file was reloaded: zones that kept their name
+                    # keep their membership, removed ones are exited
+                    for name, entered in state.move_to(layer):
+                        events.append(Event(ZONE_EXIT, sensor, track_id, t, x, y, name, round(t - entered, 3)))
+                self._zones(events, sensor, track_id, state, layer.membership[labels[i]], t)
+            self._motion(events, sensor, track_id, state, radial_speed(track), t)
+
+        for track_id in [track_id for track_id in known if track_id not in seen]:
+            state = known.pop(track_id)
+            for zone in np.flatnonzero(state.inside):
+                events.append(Event(ZONE_EXIT, sensor, track_id, t, state.x_mm, state.y_mm,
+                                    state.layer.zones[zone].name, round(t - state.entered[zone], 3)))
+            events.append(Event(TRACK_LOST, sensor, track_id, t, state.x_mm, state.y_mm, None, None))
+
+        self.emitted += len(events)
+        return events
+
+    def _zones(self, events, sensor, track_id, state, raw, t):
+        differs = raw != state.inside
+        state.since[~differs] = np.nan
+        state.since[differs & np.isnan(state.since)] = t
+        hold = np.where(raw, self.enter_s, self.exit_s)
+        flips = np.flatnonzero(differs & (t - state.since >= hold))
+        for zone in flips:
+            name = state.layer.zones[zone].name
+            if raw[zone]:
+                state.entered[zone] = t
+                state.dwelled[zone] = False
+                events.append(Event(ZONE_ENTER, sensor, track_id, t, state.x_mm, state.y_mm, name, None))
+            else:
+                events.append(Event(ZONE_EXIT, sensor, track_id, t, state.x_mm, state.y_mm, name,
+                                    round(t - state.entered[zone], 3)))
+        state.inside[flips] = raw[flips]
+        state.since[flips] = np.nan
+
+        dwelling = np.flatnonzero(state.inside & ~state.dwelled & (t - state.entered >= self.dwell_s))
+        for zone in dwelling:
+            events.append(Event(ZONE_DWELL, sensor, track_id, t, state.x_mm, state.y_mm,
+                                state.layer.zones[zone].name, round(t - state.entered[zone], 3)))
+        state.dwelled[dwelling] = True
+
+    def _motion(self, events, sensor, track_id, state, speed, t):
+        if state.motion == STILL:
+            if speed <= -self.approach_enter:
+                motion = CLOSING
+            elif speed >= self.approach_enter:
+                motion = OPENING
+            else:
+                return
+        elif abs(speed) < self.approach_exit or (speed > 0) != (state.motion == OPENING):
+            motion = STILL
+        else:
+            return
+        state.motion = motion
+        if motion != STILL:
+            events.append(Event(APPROACH if motion == CLOSING else DEPART, sensor, track_id, t,
+                                state.x_mm, state.y_mm, None, None))
+
+
+def main():
+    from capture import CaptureReader
+    from frame_decoder import decode_frames
+    from tracker import Tracker
+    from zones import RADAR_ZONES, ZoneEngine
+
+    parser = argparse.ArgumentParser(description="Print the events a capture file produces.")
+    parser.add_argument("capture", help="capture file written by hex-stream.py --record")
+    parser.add_argument("--zones", default=RADAR_ZONES, help="zone file (default: $RADAR_ZONES)")
+    args = parser.parse_args()
+
+    tracker = Tracker()
+    deriver = EventDeriver(ZoneEngine(args.zones))
+    frames = 0
+    with CaptureReader(args.capture) as reader:
+        for t_ns, frame in reader.frames():
+            targets = decode_frames(frame)
+            t = (t_ns - reader.start_ns) / 1e9
+            tracks = tracker.step(0, np.column_stack((targets["x_mm"], targets["y_mm"])), t)
+            for event in deriver.update(0, t, tracks):
+                where = f" {event.zone}" if event.zone else ""
+                dwell = f" after {event.dwell_s:.1f} s" if event.dwell_s is not None else ""
+                print(f"{event.t:10.3f}s track {event.track_id}: {event.kind}{where}{dwell} "
+                      f"at ({event.x_mm}, {event.y_mm}) mm")
+            frames += 1
+    print(f"{frames} frames, {deriver.emitted} events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import numpy as np
+
+from frame_scanner import FRAME_HEADER, FRAME_TAIL, FRAME_SIZE
+
+TARGET_SLOTS = 3
+
+# On-the-wire layout of one report frame. Every target field is a 16-bit
+# sign-magnitude value: bit 15 set means positive, clear means negative.
+TARGET_RAW_DTYPE = np.dtype([
+    ("x", "<u2"),       # mm
+    ("y", "<u2"),       # mm
+    ("speed", "<u2"),   # cm/s
+    ("gate", "<u2"),    # distance resolution, mm
+])
+FRAME_DTYPE = np.dtype([
+    ("header", "<u4"),
+    ("targets", TARGET_RAW_DTYPE, (TARGET_SLOTS,)),
+    ("tail", "<u2"),
+])
+assert FRAME_DTYPE.itemsize == FRAME_SIZE
+
+HEADER_WORD = int.from_bytes(FRAME_HEADER, 'little')
+TAIL_WORD = int.from_bytes(FRAME_TAIL, 'little')
+
+# One row per detected target
+DETECTION_DTYPE = np.dtype([
+    ("frame_idx", "<u4"),
+    ("slot", "u1"),
+    ("x_mm", "<i2"),
+    ("y_mm", "<i2"),
+    ("speed_cms", "<i2"),
+    ("gate", "<u2"),
+])
+
+
+def sign_magnitude(raw):
+    """
+    Convert RD-03D sign-magnitude words (scalar or array) to signed values.
+    """
+    if isinstance(raw, int):
+        return raw - 0x8000 if raw & 0x8000 else -raw
+    raw = np.asarray(raw, dtype=np.uint16)
+    magnitude = (raw & 0x7FFF).astype(np.int16)
+    return np.where(raw & 0x8000, magnitude, -magnitude)
+
+
+def to_sign_magnitude(values):
+    """
+    Inverse of sign_magnitude() for arrays: signed values back to the raw
+    words the sensor sent (zero comes back as positive zero, 0x8000).
+    """
+    values = np.asarray(values, dtype=np.int32)
+    return np.where(values >= 0, values | 0x8000, -values).astype(np.uint16)
+
+
+def frame_view(data):
+    """
+    View a buffer of concatenated frames as a FRAME_DTYPE array without
+    copying. Any trailing partial frame is ignored.
+    """
+    data = memoryview(data).cast('B')
+    count = len(data) // FRAME_SIZE
+    return np.frombuffer(data, dtype=FRAME_DTYPE, count=count)
+
+
+def decode_frames(data, keep_empty=False, validate=True):
+    """
+    Decode any number of concatenated report frames in one pass.
+
+    data may be bytes, a bytearray, a memoryview from FrameScanner or a
+    FRAME_DTYPE array. Returns a DETECTION_DTYPE array with one row per
+    occupied target slot (or per slot if keep_empty is set); frame_idx is
+    the position of the frame in the input. Frames with a bad header or
+    tail are skipped when validate is set.
+    """
+    frames = data if isinstance(data, np.ndarray) else frame_view(data)
+    raw = frames["targets"]  # (n_frames, TARGET_SLOTS)
+
+    mask = np.ones(raw.shape, dtype=bool)
+    if validate:
+        valid = (frames["header"] == HEADER_WORD) & (frames["tail"] == TAIL_WORD)
+        mask &= valid[:, None]
+    if not keep_empty:
+        mask &= (raw["x"] | raw["y"] | raw["speed"] | raw["gate"]) != 0
+
+    frame_idx, slot = np.nonzero(mask)
+    hits = raw[frame_idx, slot]
+
+    out = np.empty(len(hits), dtype=DETECTION_DTYPE)
+    out["frame_idx"] = frame_idx
+    out["slot"] = slot
+    out["x_mm"] = sign_magnitude(hits["x"])
+    out["y_mm"] = sign_magnitude(hits["y"])
+    out["speed_cms"] = sign_magnitude(hits["speed"])
+    out["gate"] = hits["gate"]
+    return out
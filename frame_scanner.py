@@ -0,0 +1,218 @@
+# RD-03D report frame layout: header, 3 target slots of 8 bytes, tail
+FRAME_HEADER = b'\xAA\xFF\x03\x00'
+FRAME_TAIL = b'\x55\xCC'
+FRAME_SIZE = 30
+
+# Command and ACK frames: header, u16 payload length, payload, tail
+COMMAND_HEADER = b'\xFD\xFC\xFB\xFA'
+COMMAND_TAIL = b'\x04\x03\x02\x01'
+COMMAND_MAX_PAYLOAD = 256  # Longer length fields are treated as corruption
+
+# Default scan buffer size, enough for ~130 frames of backlog
+SCANNER_CAPACITY = 4096
+
+
+class FrameScanner:
+    """
+    Incremental framer for the RD-03D serial stream.
+
+    Bytes are read straight into a preallocated bytearray (with readinto) and
+    complete frames are yielded as memoryview slices of that buffer, so no
+    frame is ever copied. A yielded view is only valid until the next call to
+    fill() or feed(); decode it (or copy it) before reading more data.
+
+    The buffer is kept linear: consumed bytes are reclaimed by moving the
+    unconsumed remainder (always less than one frame once frames() has run)
+    back to the front, so the copying done per read is bounded by the frame
+    size instead of the backlog.
+
+    Command ACK frames interleaved with the reports are passed to on_ack
+    (as a memoryview valid during the call) when it is set; otherwise they
+    are skipped like any other foreign bytes.
+    """
+
+    def __init__(self, capacity=SCANNER_CAPACITY, header=FRAME_HEADER, tail=FRAME_TAIL, frame_size=FRAME_SIZE):
+        if capacity < 2 * frame_size:
+            raise ValueError(f"capacity must be at least {2 * frame_size} bytes")
+        self.header = header
+        self.tail = tail
+        self.frame_size = frame_size
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0  # First unconsumed byte
+        self._end = 0  # One past the last valid byte
+
+        # Ingest statistics
+        self.bytes_in = 0
+        self.frame_count = 0
+        self.dropped_bytes = 0
+        self.resyncs = 0
+        self.partial_frames = 0
+
+        # Stream offset of the most recently yielded frame
+        self.last_offset = None
+        self._in_sync = True
+
+        # Optional callback(frame) for command ACK frames
+        self.on_ack = None
+        self.ack_frames = 0
+
+    @property
+    def backlog(self):
+        """
+        Number of buffered bytes not yet consumed as frames or dropped.
+        """
+        return self._end - self._start
+
+    def stats(self):
+        return {
+            "bytes_in": self.bytes_in,
+            "frames": self.frame_count,
+            "dropped_bytes": self.dropped_bytes,
+            "resyncs": self.resyncs,
+            "partial_frames": self.partial_frames,
+            "ack_frames": self.ack_frames,
+            "backlog": self.backlog,
+        }
+
+    def _compact(self):
+        """
+        Move the unconsumed bytes to the front of the buffer.
+        """
+        remaining = self._end - self._start
+        if self._start and remaining:
+            self._buf[:remaining] = self._buf[self._start:self._end]
+        self._start = 0
+        self._end = remaining
+
+    def _writable(self):
+        if self._end == len(self._buf):
+            self._compact()
+        return self._view[self._end:]
+
+    def fill(self, stream, size=None):
+        """
+        Read from a stream with readinto() (pyserial, FileIO, sockets...)
+        directly into the scan buffer. Returns the number of bytes read.
+        """
+        target = self._writable()
+        if size is not None:
+            target = target[:size]
+        n = stream.readinto(target)
+        if not n:  # None for a non-blocking stream with no data
+            return 0
+        self._end += n
+        self.bytes_in += n
+        return n
+
+    def feed(self, data):
+        """
+        Copy bytes from any buffer into the scan buffer, for sources that
+        cannot readinto (replayed captures, tests, network payloads).
+        """
+        data = memoryview(data).cast('B')
+        while len(data):
+            target = self._writable()
+            n = min(len(target), len(data))
+            target[:n] = data[:n]
+            self._end += n
+            self.bytes_in += n
+            data = data[n:]
+            if len(data):
+                # Buffer is full: make room by consuming frames, dropping the
+                # oldest bytes if the caller never drained them
+                if self._start == 0:
+                    self._drop(self.frame_size)
+                self._compact()
+
+    def _drop(self, count):
+        self._start += count
+        self.dropped_bytes += count
+
+    def _resync(self):
+        """
+        Skip forward to the next frame header. Each call discards at least
+        one byte, so a corrupt stream costs time linear in its length.
+        Returns False when no header candidate is buffered.
+        """
+        if self._in_sync:
+            # Count each loss of sync once, however many reads it takes
+            self.resyncs += 1
+            self._in_sync = False
+        pos = self._buf.find(self.header, self._start + 1, self._end)
+        if self.on_ack is not None:
+            ack = self._buf.find(COMMAND_HEADER, self._start + 1, self._end)
+            if ack >= 0 and (pos < 0 or ack < pos):
+                pos = ack
+        if pos < 0:
+            # Keep a possible partial header at the end of the buffer
+            keep = min(len(self.header) - 1, self._end - self._start - 1)
+            self._drop(self._end - self._start - keep)
+            return False
+        self._drop(pos - self._start)
+        return True
+
+    def _ack(self, start):
+        """
+        Consume an ACK frame starting at start. Returns True if one was
+        handled, False if it is corrupt, None if it is not complete yet.
+        """
+        length_at = start + len(COMMAND_HEADER)
+        if self._end < length_at + 2:
+            return None
+        payload = int.from_bytes(self._buf[length_at:length_at + 2], 'little')
+        if payload > COMMAND_MAX_PAYLOAD:
+            return False
+        size = len(COMMAND_HEADER) + 2 + payload + len(COMMAND_TAIL)
+        if self._end < start + size:
+            return None
+        if not self._buf.startswith(COMMAND_TAIL, start + size - len(COMMAND_TAIL)):
+            return False
+        self._start = start + size
+        self._in_sync = True
+        self.ack_frames += 1
+        self.on_ack(self._view[start:start + size])
+        return True
+
+    def frames(self):
+        """
+        Yield every complete frame currently buffered as a memoryview.
+        """
+        header = self.header
+        tail = self.tail
+        size = self.frame_size
+        header_len = len(header)
+        tail_len = len(tail)
+        buf = self._buf
+
+        while self._end - self._start >= header_len:
+            start = self._start
+            if not buf.startswith(header, start):
+                if self.on_ack is not None and buf.startswith(COMMAND_HEADER, start):
+                    handled = self._ack(start)
+                    if handled is None:
+                        return
+                    if handled:
+                        continue
+                if not self._resync():
+                    return
+                continue
+            if self._end - start < size:
+                return
+            if not buf.startswith(tail, start + size - tail_len):
+                # A header starting inside the frame window means the frame
+                # was cut short by lost bytes rather than corrupted in place.
+                # Wait for the bytes that could complete such a header.
+                window_end = start + size + header_len - 1
+                if self._end < window_end:
+                    return
+                if buf.find(header, start + 1, window_end) >= 0:
+                    self.partial_frames += 1
+                self._resync()
+                continue
+
+            self._start = start + size
+            self._in_sync = True
+            self.frame_count += 1
+            self.last_offset = self.bytes_in - (self._end - start)
+            yield self._view[start:start + size]
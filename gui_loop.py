@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+
+import serial
+
+from frame_decoder import decode_frames
+from frame_scanner import FrameScanner
+
+RENDER_FPS = 30  # Default render tick rate
+PENDING_FRAMES = 64  # Frames held for the render tick before the oldest are skipped
+
+
+class LatestState:
+    """
+    Hand-off slot between an ingest thread and the GUI render tick.
+
+    The ingest thread only appends and the render tick only drains; both are
+    single deque operations that are atomic under the GIL, so neither side
+    takes a lock or ever waits on the other. If rendering falls more than
+    `capacity` frames behind, the oldest pending frames are overwritten and
+    counted as skipped.
+    """
+
+    def __init__(self, capacity=PENDING_FRAMES):
+        self._pending = deque(maxlen=capacity)
+        self.latest = None
+        self.published = 0  # Written by the ingest thread only
+        self.taken = 0  # Written by the render tick only
+
+    def publish(self, item):
+        self._pending.append(item)
+        self.latest = item
+        self.published += 1
+
+    def drain(self):
+        """
+        Take every frame published since the last drain, oldest first.
+        """
+        items = []
+        pending = self._pending
+        while pending:
+            items.append(pending.popleft())
+        self.taken += len(items)
+        return items
+
+    @property
+    def skipped(self):
+        return max(0, self.published - self.taken - len(self._pending))
+
+
+class FrameIngest(threading.Thread):
+    """
+    Daemon thread that reads an open serial port, frames the stream with
+    FrameScanner and publishes (t, decode(frame)) to a LatestState, where t
+    is the monotonic arrival time. decode receives a memoryview of one
+    30-byte frame that is only valid during the call.
+    """
+
+    def __init__(self, serial_connection, state, decode=decode_frames, scanner=None):
+        super().__init__(daemon=True)
+        self.serial_connection = serial_connection
+        self.state = state
+        self.decode = decode
+        self.scanner = scanner or FrameScanner()
+        self.running = True
+
+    def run(self):
+        ser = self.serial_connection
+        try:
+            while self.running:
+                # Blocks for up to the port timeout until at least one byte arrives
+                if not self.scanner.fill(ser, max(1, ser.in_waiting)):
+                    continue
+                t = time.monotonic()
+                for frame in self.scanner.frames():
+                    self.state.publish((t, self.decode(frame)))
+        except (OSError, serial.SerialException) as e:
+            print(f"Radar read error: {e}")
+
+    def stop(self):
+        self.running = False
+
+
+class RenderLoop:
+    """
+    Fixed-rate render tick on the Tk main thread.
+
+    Every tick calls render(frames) once with all frames published since the
+    previous tick (an empty list when nothing arrived, so animations keep
+    running). Ticks are scheduled against a fixed timeline; a tick that runs
+    late does not trigger a burst of catch-up ticks.
+    """
+
+    def __init__(self, root, state, render, fps=RENDER_FPS):
+        self.root = root
+        self.state = state
+        self.render = render
+        self.interval = 1.0 / fps
+        self.ticks = 0
+        self.coalesced = 0  # Frames folded into a tick beyond the first
+        self.fps = 0.0
+        self._last = None
+        self._next = None
+        self._after_id = None
+
+    def start(self):
+        self._next = time.monotonic()
+        self._after_id = self.root.after(0, self._tick)
+        return self
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        now = time.monotonic()
+        if self._last is not None:
+            self.fps = 0.9 * self.fps + 0.1 / max(now - self._last, 1e-6)
+        self._last = now
+
+        frames = self.state.drain()
+        if len(frames) > 1:
+            self.coalesced += len(frames) - 1
+        self.ticks += 1
+        self.render(frames)
+
+        self._next += self.interval
+        now = time.monotonic()
+        if self._next < now:
+            self._next = now
+        self._after_id = self.root.after(max(1, int((self._next - now) * 1000)), self._tick)
+
+    def stats(self):
+        return {
+            "fps": self.fps,
+            "ticks": self.ticks,
+            "frames": self.state.taken,
+            "coalesced": self.coalesced,
+            "skipped": self.state.skipped,
+        }
+
+    def status(self):
+        return f"{self.fps:.0f} FPS  coalesced {self.coalesced}  skipped {self.state.skipped}"
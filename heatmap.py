@@ -0,0 +1,233 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+RANGE_MAX_MM = 8000  # Sensor range covered by the grids
+FOV_DEG = 60  # Half of the field of view
+
+CELL_MM = 200  # Cartesian cell size
+RANGE_BIN_MM = 250  # Polar range bin
+ANGLE_BIN_DEG = 5  # Polar angle bin
+
+# Rolling windows: name -> (sub-buckets, seconds per sub-bucket). A window
+# covers its last `sub-buckets` sub-buckets, the current one included.
+WINDOWS = {
+    "1m": (60, 1),
+    "1h": (60, 60),
+    "24h": (96, 900),
+}
+
+BINCOUNT_MIN = 64  # Batches at least this large are binned with bincount instead of add.at
+
+
+class CartesianGrid:
+    """
+    Square cells over x in [-range, range], y in [0, range] (mm).
+    """
+
+    name = "cartesian"
+
+    def __init__(self, cell_mm=CELL_MM, range_mm=RANGE_MAX_MM):
+        self.cell_mm = cell_mm
+        self.range_mm = range_mm
+        self.shape = (int(np.ceil(range_mm / cell_mm)), int(np.ceil(2 * range_mm / cell_mm)))  # rows (y), columns (x)
+        self.size = self.shape[0] * self.shape[1]
+
+    def cells(self, x_mm, y_mm):
+        """
+        Flat cell index for each point, -1 outside the grid.
+        """
+        column = np.floor((np.asarray(x_mm, dtype=np.float64) + self.range_mm) / self.cell_mm).astype(np.int64)
+        row = np.floor(np.asarray(y_mm, dtype=np.float64) / self.cell_mm).astype(np.int64)
+        inside = (column >= 0) & (column < self.shape[1]) & (row >= 0) & (row < self.shape[0])
+        return np.where(inside, row * self.shape[1] + column, -1)
+
+    def describe(self):
+        return {"grid": self.name, "shape": self.shape, "cell_mm": self.cell_mm,
+                "extent_mm": [-self.range_mm, self.range_mm, 0, self.shape[0] * self.cell_mm]}
+
+
+class PolarGrid:
+    """
+    Range by angle bins over the field of view; angle 0 is straight ahead.
+    """
+
+    name = "polar"
+
+    def __init__(self, range_bin_mm=RANGE_BIN_MM, angle_bin_deg=ANGLE_BIN_DEG, range_mm=RANGE_MAX_MM, fov_deg=FOV_DEG):
+        self.range_bin_mm = range_bin_mm
+        self.angle_bin_deg = angle_bin_deg
+        self.fov_deg = fov_deg
+        self.shape = (int(np.ceil(range_mm / range_bin_mm)), int(np.ceil(2 * fov_deg / angle_bin_deg)))  # range, angle
+        self.size = self.shape[0] * self.shape[1]
+
+    def cells(self, x_mm, y_mm):
+        x = np.asarray(x_mm, dtype=np.float64)
+        y = np.asarray(y_mm, dtype=np.float64)
+        row = np.floor(np.hypot(x, y) / self.range_bin_mm).astype(np.int64)
+        column = np.floor((np.degrees(np.arctan2(x, y)) + self.fov_deg) / self.angle_bin_deg).astype(np.int64)
+        inside = (column >= 0) & (column < self.shape[1]) & (row < self.shape[0])
+        return np.where(inside, row * self.shape[1] + column, -1)
+
+    def describe(self):
+        return {"grid": self.name, "shape": self.shape, "range_bin_mm": self.range_bin_mm,
+                "angle_bin_deg": self.angle_bin_deg, "angle_min_deg": -self.fov_deg}
+
+
+GRIDS = {"cartesian": CartesianGrid, "polar": PolarGrid}
+
+
+class RollingWindow:
+    """
+    Per-cell counts over a sliding time window.
+
+    The window is a ring of sub-bucket count arrays plus their running sum.
+    Detections are added to the current sub-bucket and to the sum; when time
+    moves into a new sub-bucket, the oldest one is subtracted from the sum
+    and reused. Expiry therefore costs one array operation per sub-bucket
+    boundary however much has been counted, and reading the window is just
+    the running sum.
+    """
+
+    def __init__(self, buckets, bucket_seconds, cells):
+        self.buckets = buckets
+        self.bucket_seconds = bucket_seconds
+        self.ring = np.zeros((buckets, cells), dtype=np.uint32)
+        self.total = np.zeros(cells, dtype=np.uint32)
+        self.current = None  # Index of the current sub-bucket (time // bucket_seconds)
+
+    @property
+    def seconds(self):
+        return self.buckets * self.bucket_seconds
+
+    def advance(self, t):
+        bucket = int(t // self.bucket_seconds)
+        if self.current is None:
+            self.current = bucket
+        steps = bucket - self.current
+        if steps <= 0:
+            return  # Late detections count in the current sub-bucket
+        if steps >= self.buckets:
+            self.ring[:] = 0
+            self.total[:] = 0
+        else:
+            for expired in range(self.current + 1, bucket + 1):
+                slot = expired % self.buckets
+                self.total -= self.ring[slot]
+                self.ring[slot] = 0
+        self.current = bucket
+
+    def add(self, cells):
+        slot = self.current % self.buckets
+        if len(cells) >= BINCOUNT_MIN:
+            counts = np.bincount(cells, minlength=len(self.total)).astype(np.uint32)
+            self.ring[slot] += counts
+            self.total += counts
+        else:
+            np.add.at(self.ring[slot], cells, 1)
+            np.add.at(self.total, cells, 1)
+
+
+class OccupancyHeatmap:
+    """
+    Where targets spend time: detections binned into a grid and counted over
+    several rolling windows at once (WINDOWS). Every detection costs a cell
+    lookup and an increment per window, so the cost per frame stays the
+    same however long it runs.
+    """
+
+    def __init__(self, grid=None, windows=WINDOWS):
+        self.grid = grid or CartesianGrid()
+        self.windows = {name: RollingWindow(buckets, seconds, self.grid.size)
+                        for name, (buckets, seconds) in windows.items()}
+        self.detections = 0
+
+    def add(self, t, x_mm, y_mm):
+        """
+        Count detections at time t (seconds, any steadily increasing clock).
+        """
+        cells = self.grid.cells(x_mm, y_mm)
+        cells = cells[cells >= 0]
+        for window in self.windows.values():
+            window.advance(t)
+            if len(cells):
+                window.add(cells)
+        self.detections += len(cells)
+
+    def counts(self, window, t=None):
+        """
+        Counts of one window as a grid-shaped uint32 array (a copy). With t,
+        sub-buckets that have expired by then are dropped first.
+        """
+        rolling = self.windows[window]
+        if t is not None:
+            rolling.advance(t)
+        return rolling.total.reshape(self.grid.shape).copy()
+
+    def describe(self, window):
+        return dict(self.grid.describe(), window=window, seconds=self.windows[window].seconds,
+                    detections=self.detections)
+
+
+class SensorHeatmaps:
+    """
+    One OccupancyHeatmap per sensor, created on the sensor's first frame.
+    """
+
+    def __init__(self, grid=None, windows=WINDOWS):
+        self.grid = grid or CartesianGrid()
+        self.window_spec = windows
+        self.sensors = {}
+
+    def add(self, sensor, t, x_mm, y_mm):
+        heatmap = self.sensors.get(sensor)
+        if heatmap is None:
+            heatmap = self.sensors[sensor] = OccupancyHeatmap(self.grid, self.window_spec)
+        heatmap.add(t, x_mm, y_mm)
+
+    def __getitem__(self, sensor):
+        return self.sensors[sensor]
+
+    def __contains__(self, sensor):
+        return sensor in self.sensors
+
+
+def main():
+    from capture import CaptureReader
+    from frame_decoder import decode_frames
+
+    parser = argparse.ArgumentParser(description="Build an occupancy heatmap from a capture file.")
+    parser.add_argument("capture", help="capture file written by hex-stream.py --record")
+    parser.add_argument("--grid", choices=sorted(GRIDS), default="cartesian")
+    parser.add_argument("--window", choices=list(WINDOWS), default="24h")
+    parser.add_argument("--output", help="save the counts as .npy instead of printing them")
+    args = parser.parse_args()
+
+    heatmap = OccupancyHeatmap(GRIDS[args.grid]())
+    start = time.perf_counter()
+    frames = 0
+    with CaptureReader(args.capture) as reader:
+        for t_ns, frame in reader.frames():
+            targets = decode_frames(frame)
+            heatmap.add(t_ns / 1e9, targets["x_mm"], targets["y_mm"])
+            frames += 1
+    elapsed = time.perf_counter() - start
+    counts = heatmap.counts(args.window)
+    print(f"{frames} frames, {heatmap.detections} detections in {elapsed:.2f} s "
+          f"({elapsed / max(frames, 1) * 1e6:.1f} us per frame)")
+
+    if args.output:
+        np.save(args.output, counts)
+        print(f"Saved {args.window} counts {counts.shape} to {os.path.abspath(args.output)}")
+    else:
+        # Coarse text rendering, farthest row first
+        shades = " .:-=+*#%@"
+        peak = max(int(counts.max()), 1)
+        for row in counts[::-1]:
+            print("".join(shades[min(len(shades) - 1, int(c) * len(shades) // (peak + 1))] for c in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
+import asyncio
+import os
 import serial
-import time
+
+from async_serial import AsyncSerialReader
 
 # Configuration for the radar module
-RADAR_PORT = '/dev/ttyTHS1' 
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')
 RADAR_BAUDRATE = 256000
 
 def decode_packet(raw_data):
@@ -31,28 +34,26 @@ def decode_packet(raw_data):
         print(f"Error decoding packet: {e}")
         return {"Angle": None, "Distance (mm)": None, "Speed (mm/s)": None}
 
+async def decode_stream():
+    """
+    Decodes each complete frame as soon as it arrives.
+    """
+    async with AsyncSerialReader(RADAR_PORT, RADAR_BAUDRATE) as reader:
+        print(f"Listening on {RADAR_PORT} at {RADAR_BAUDRATE} baud...")
+        print("Press Ctrl+C to stop.")
+
+        async for frame in reader:
+            # Decode and print the packet in human-readable format
+            decoded_data = decode_packet(frame.raw)
+            # print(f"Raw Data (Hex): {frame.raw.hex(' ')}")
+            print(f"Decoded Data: {decoded_data}")
+
 def read_and_decode_data():
     """
     Reads raw binary data from the radar and decodes it into human-readable formats.
     """
     try:
-        # Open serial connection
-        with serial.Serial(RADAR_PORT, RADAR_BAUDRATE, timeout=1) as ser:
-            print(f"Listening on {RADAR_PORT} at {RADAR_BAUDRATE} baud...")
-            print("Press Ctrl+C to stop.")
-
-            while True:
-                if ser.in_waiting:  # Check if there is data waiting to be read
-                    raw_data = ser.read(ser.in_waiting)  # Read all available data
-                    hex_output = ' '.join(f'{byte:02x}' for byte in raw_data)  # Format as hex
-
-                    # Decode and print the packet in human-readable format
-                    decoded_data = decode_packet(raw_data)
-                    # print(f"Raw Data (Hex): {hex_output}")
-                    print(f"Decoded Data: {decoded_data}")
-
-                time.sleep(0.1)  # Small delay to reduce CPU usage
-
+        asyncio.run(decode_stream())
     except serial.SerialException as e:
         print(f"Error: {e}")
     except KeyboardInterrupt:
@@ -1,13 +1,14 @@
+import os
 import serial
 import struct
 
+from frame_decoder import sign_magnitude
+from frame_scanner import FrameScanner
+
 # Configure the serial connection
-serial_port = '/dev/ttyTHS1' 
+serial_port = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')
 baud_rate = 256000
 
-# Open serial connection
-ser = serial.Serial(serial_port, baud_rate, timeout=1)
-
 def parse_frame(frame):
     # Verify header and tail
     if frame[:4] != b'\xAA\xFF\x03\x00' or frame[-2:] != b'\x55\xCC':
@@ -21,13 +22,17 @@ def parse_frame(frame):
         if offset + 8 > len(frame):
             break
 
-        # Parse target data
-        x, y, speed, distance = struct.unpack('<hhhi', frame[offset:offset + 8])
+        # Parse target data (four little-endian 16-bit words)
+        x, y, speed, resolution = struct.unpack('<HHHH', frame[offset:offset + 8])
+
+        # An all-zero slot means no target
+        if not (x or y or speed or resolution):
+            continue
 
-        # Convert values
-        x = x if x < 32768 else x - 65536
-        y = y if y < 32768 else y - 65536
-        speed = speed if speed < 32768 else speed - 65536
+        # Convert values (sign-magnitude: bit 15 set means positive)
+        x = sign_magnitude(x)
+        y = sign_magnitude(y)
+        speed = sign_magnitude(speed)
 
         # Append parsed target
         targets.append({
@@ -35,37 +40,32 @@ def parse_frame(frame):
             "X (mm)": x,
             "Y (mm)": y,
             "Speed (cm/s)": speed,
-            "Distance (mm)": distance
+            "Resolution (mm)": resolution
         })
 
     return targets
 
 def main():
+    # Open serial connection here so parse_frame() can be imported on its own
+    ser = serial.Serial(serial_port, baud_rate, timeout=1)
     print("Listening for RD-03D data...")
-    buffer = b''
+    scanner = FrameScanner()
 
     try:
         while True:
-            # Read incoming data
-            buffer += ser.read(1024)
+            # Read whatever is waiting (at least one byte) straight into the scan buffer
+            scanner.fill(ser, max(1, ser.in_waiting))
 
-            # Look for valid frame (header and tail)
-            while b'\xAA\xFF\x03\x00' in buffer and b'\x55\xCC' in buffer:
-                start = buffer.find(b'\xAA\xFF\x03\x00')
-                end = buffer.find(b'\x55\xCC', start) + 2
-                frame = buffer[start:end]
-
-                # Parse and display frame
+            # Parse and display every complete frame
+            for frame in scanner.frames():
                 targets = parse_frame(frame)
                 if targets:
                     for target in targets:
                         print(target)
 
-                # Remove processed frame from buffer
-                buffer = buffer[end:]
-
     except KeyboardInterrupt:
         print("\nExiting...")
+        print(f"Scanner stats: {scanner.stats()}")
     finally:
         ser.close()
 
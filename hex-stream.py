@@ -1,33 +1,52 @@
+import argparse
+import asyncio
+import os
 import serial
-import time
+
+from async_serial import AsyncSerialReader
+from capture import CaptureWriter
 
 # Configuration for the radar module
-RADAR_PORT = '/dev/ttyTHS1'  # Replace with your actual UART port
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')  # Replace with your actual UART port
 RADAR_BAUDRATE = 256000      # Default baud rate for the radar module
 
-def read_raw_data():
+async def stream_raw_data(writer):
     """
-    Reads raw binary data from the radar and prints it in hex format.
+    Prints every chunk of bytes as soon as the port delivers it.
     """
-    try:
-        # Open serial connection
-        with serial.Serial(RADAR_PORT, RADAR_BAUDRATE, timeout=1) as ser:
-            print(f"Listening on {RADAR_PORT} at {RADAR_BAUDRATE} baud...")
-            print("Press Ctrl+C to stop.")
-
-            while True:
-                if ser.in_waiting:  # Check if there is data waiting to be read
-                    raw_data = ser.read(ser.in_waiting)  # Read all available data
-                    # Manually format the hex output
-                    hex_output = ' '.join(f'{byte:02x}' for byte in raw_data)
-                    print(f"Raw Data (Hex): {hex_output}")  # Print in hex format
+    async with AsyncSerialReader(RADAR_PORT, RADAR_BAUDRATE, vmin=1, raw=True) as reader:
+        print(f"Listening on {RADAR_PORT} at {RADAR_BAUDRATE} baud...")
+        if writer:
+            print(f"Recording to {writer.path}")
+        print("Press Ctrl+C to stop.")
 
-                time.sleep(0.1)  # Small delay to reduce CPU usage
+        async for t_ns, raw_data in reader:
+            if writer:
+                writer.write(raw_data, t_ns)
+            # Manually format the hex output
+            hex_output = ' '.join(f'{byte:02x}' for byte in raw_data)
+            print(f"Raw Data (Hex): {hex_output}")  # Print in hex format
 
+def read_raw_data(record_path=None):
+    """
+    Reads raw binary data from the radar and prints it in hex format.
+    With record_path set, every read is also appended to a capture file
+    that capture.py can replay.
+    """
+    writer = CaptureWriter(record_path, RADAR_BAUDRATE) if record_path else None
+    try:
+        asyncio.run(stream_raw_data(writer))
     except serial.SerialException as e:
         print(f"Error: {e}")
     except KeyboardInterrupt:
         print("\nStopped reading data.")
+    finally:
+        if writer:
+            writer.close()
+            print(f"Saved {writer.frames} frames to {record_path}")
 
 if __name__ == "__main__":
-    read_raw_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Print raw RD-03D serial data in hex.")
+    parser.add_argument("--record", metavar="PATH", help="also record raw bytes to a capture file")
+    args = parser.parse_args()
+    read_raw_data(args.record)
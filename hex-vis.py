@@ -1,23 +1,32 @@
 import tkinter as tk
 from tkinter import ttk
 import serial
-import threading
 import math
+import os
+import sys
 import time
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
+import numpy as np
+
+from calibration import load_calibration
+from detection_store import DETECTION, STORE_DTYPE, DetectionWriter
+from frame_decoder import sign_magnitude
+from heatmap import WINDOWS, OccupancyHeatmap
+from gui_loop import FrameIngest, LatestState, RenderLoop
+from trail_buffer import TrailBuffer
+from tracker import MAX_TRACKS, Tracker
 
 # Radar setup
-RADAR_PORT = '/dev/ttyTHS1' 
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')
 RADAR_BAUDRATE = 256000
 RANGE_MAX = 8.0  # Maximum range in meters
+RADAR_SERIAL = os.environ.get('RADAR_SERIAL')  # Selects calibration/<serial>.npz, defaults otherwise
+RADAR_STORE = os.environ.get('RADAR_STORE')  # Also append detections and tracks to this detection store
 
-# Conversion factors based on measurements
-ANGLE_MAX_VALUE_LEFT = 34000  # Maximum value representing left 60 degrees boundary
-ANGLE_MIN_VALUE_LEFT = 32770  # Minimum value representing 0 degrees from left
-ANGLE_MAX_VALUE_RIGHT = 2000  # Maximum value representing right 60 degrees
-DISTANCE_CONVERSION_FACTOR = 33900  # Value representing 1 meter away
-ADDITIONAL_DISTANCE_FACTOR = 800  # Approximate value increment per meter after 1 meter
+TRAJECTORY_SPEED_THRESHOLD = 0.1  # m/s of radial speed before a track counts as moving
+RENDER_FPS = int(os.environ.get('RENDER_FPS', 30))  # Render ticks per second, independent of the frame rate
+HEATMAP_WINDOW = os.environ.get('HEATMAP_WINDOW')  # Show occupancy over this window (1m, 1h or 24h)
 
 # Decode packet function
 def decode_packet(raw_data):
@@ -50,6 +59,25 @@ def decode_packet(raw_data):
         print(f"Error decoding packet: {e}")
         return None
 
+def describe_track(track):
+    """
+    Returns (id, distance m, angle degrees, radial speed m/s, trajectory) for
+    a confirmed track.
+    """
+    track_x = track["x_mm"] / 1000
+    track_y = track["y_mm"] / 1000
+    track_distance = math.hypot(track_x, track_y)
+    track_angle = math.degrees(math.atan2(track_y, track_x))
+    # Radial speed from the track velocity, negative when closing in
+    radial_speed = (track_x * track["vx_mms"] + track_y * track["vy_mms"]) / max(track_distance, 0.001) / 1000
+    if radial_speed < -TRAJECTORY_SPEED_THRESHOLD:
+        trajectory = "Approaching"
+    elif radial_speed > TRAJECTORY_SPEED_THRESHOLD:
+        trajectory = "Departing"
+    else:
+        trajectory = "Stationary"
+    return int(track["track_id"]), track_distance, track_angle, radial_speed, trajectory
+
 # Main App Class
 class RadarApp:
     def __init__(self, root):
@@ -88,7 +116,7 @@ class RadarApp:
         self.target_list.heading("#0", text="ID")
         self.target_list.heading("Distance", text="Distance (m)")
         self.target_list.heading("Angle", text="Angle (degree)")
-        self.target_list.heading("Speed", text="Speed (units)")
+        self.target_list.heading("Speed", text="Speed (m/s)")
         self.target_list.heading("Trajectory", text="Trajectory")
         self.target_list.column("#0", width=50)
         self.target_list.column("Distance", width=100)
@@ -107,86 +135,144 @@ class RadarApp:
         self.root.grid_columnconfigure(0, weight=3)
         self.root.grid_columnconfigure(1, weight=1)
 
-        # Store target dots
-        self.target_dots = []
-
-        # Start Data Updates
-        self.update_data_thread = threading.Thread(target=self.update_data)
-        self.update_data_thread.daemon = True
-        self.update_data_thread.start()
-
-    def update_data(self):
-        while True:
-            # Read radar data from serial
-            if self.serial_connection.in_waiting:
-                raw_data = self.serial_connection.read(self.serial_connection.in_waiting)
-                target_data = decode_packet(raw_data)
-
-                # Clear existing targets
-                self.ax.clear()
-                self.ax.set_xlim(-RANGE_MAX, RANGE_MAX)
-                self.ax.set_ylim(0, RANGE_MAX)
-                self.ax.set_title("Radar View")
-                self.ax.grid(True)
-                for r in range(1, int(RANGE_MAX) + 1):
-                    self.ax.add_artist(plt.Circle((0, 0), r, color='gray', fill=False, linestyle='dashed'))
-
-                # Draw FOV lines
-                fov_left = math.radians(-60)
-                fov_right = math.radians(60)
-                self.ax.plot([0, RANGE_MAX * math.cos(fov_left)], [0, RANGE_MAX * math.sin(fov_left)], color='blue', linestyle='dotted')
-                self.ax.plot([0, RANGE_MAX * math.cos(fov_right)], [0, RANGE_MAX * math.sin(fov_right)], color='blue', linestyle='dotted')
-
-                self.target_list.delete(*self.target_list.get_children())
-
-                if target_data:
-                    # Convert angle and distance to meters and degrees
-                    if target_data["angle"] >= ANGLE_MIN_VALUE_LEFT:
-                        angle_proportion = (ANGLE_MAX_VALUE_LEFT - target_data["angle"]) / (ANGLE_MAX_VALUE_LEFT - ANGLE_MIN_VALUE_LEFT)
-                        angle_degrees = -60 + (angle_proportion * 60)
-                    elif target_data["angle"] <= ANGLE_MAX_VALUE_RIGHT:
-                        angle_proportion = target_data["angle"] / ANGLE_MAX_VALUE_RIGHT
-                        angle_degrees = angle_proportion * 60
-                    else:
-                        angle_degrees = 0  # Default to 0 if angle is not in expected range
-
-                    distance_meters = (target_data["distance"] - DISTANCE_CONVERSION_FACTOR) / ADDITIONAL_DISTANCE_FACTOR + 1
-
-                    x = distance_meters * math.cos(math.radians(angle_degrees))
-                    y = distance_meters * math.sin(math.radians(angle_degrees))
-
-                    # Add target to list and update plot
-                    self.target_dots.append({"x": x, "y": y, "timestamp": time.time()})
-
-                    # Update target list
-                    self.target_list.insert("", "end", iid=1, text="1", values=(
-                        f"{distance_meters:.2f}",
-                        f"{angle_degrees:.2f}",
-                        f"{target_data['speed']}",
-                        "Approaching" if target_data['speed'] > 0 else "Stationary"
-                    ))
-
-                    # Update raw data log
-                    raw_data = f"ID: 1, Distance: {distance_meters:.2f} m, Angle: {angle_degrees:.2f} degrees, " \
-                               f"Speed: {target_data['speed']}, Trajectory: {'Approaching' if target_data['speed'] > 0 else 'Stationary'}\n"
-                    self.raw_data_text.insert(tk.END, raw_data)
-                    self.raw_data_text.see(tk.END)
-
-                # Draw fading dots
-                current_time = time.time()
-                new_target_dots = []
-                for dot in self.target_dots:
-                    age = current_time - dot["timestamp"]
-                    if age < 3:  # Keep dots for 3 seconds
-                        alpha = max(0, 1 - age / 3)  # Fade over time
-                        self.ax.scatter(dot["x"], dot["y"], color='red', alpha=alpha)
-                        new_target_dots.append(dot)
-                self.target_dots = new_target_dots
-
-                self.canvas.draw()
+        # Raw value conversion for this unit
+        self.calibration = load_calibration(RADAR_SERIAL)
+
+        # Recent detections, faded out over 3 seconds
+        self.trail = TrailBuffer(ttl=3.0)
+
+        # Persistent target identities across frames
+        self.tracker = Tracker()
+        self.tracks = self.tracker.tracks(0)
+
+        # History kept past the raw data log (see detection_store.py);
+        # frames are stamped on the monotonic clock, the store uses wall time
+        self.store = DetectionWriter(RADAR_STORE) if RADAR_STORE else None
+        self.clock_offset_ns = time.time_ns() - time.monotonic_ns()
+
+        # Animated artists: drawn over a cached copy of the static background
+        # (grid, range circles, FOV lines) instead of redrawing the whole plot
+        self.trail_scatter = self.ax.scatter([], [], animated=True)
+        self.track_labels = [
+            self.ax.text(0, 0, "", fontsize=8, animated=True, visible=False)
+            for _ in range(MAX_TRACKS)
+        ]
+        # Occupancy overlay, drawn under the trail
+        self.heatmap = OccupancyHeatmap() if HEATMAP_WINDOW else None
+        if self.heatmap:
+            x0, x1, y0, y1 = (v / 1000 for v in self.heatmap.grid.describe()["extent_mm"])
+            self.heatmap_image = self.ax.imshow(np.zeros(self.heatmap.grid.shape), extent=(x0, x1, y0, y1),
+                                                origin='lower', cmap='hot', alpha=0.5, interpolation='nearest',
+                                                animated=True, zorder=0)
+            self.ax.set_xlim(-RANGE_MAX, RANGE_MAX)
+            self.ax.set_ylim(0, RANGE_MAX)
+        self.status_text = self.ax.text(0.02, 0.97, "", transform=self.ax.transAxes, va='top', fontsize=8, animated=True)
+        self.background = None
+        # A full draw (first show, resize) invalidates the cached background
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+        # Start Data Updates: the ingest thread decodes frames into a
+        # latest-state slot, the render tick on the Tk main thread consumes
+        # them at a fixed rate; only the main thread touches widgets
+        self.frames = LatestState()
+        self.ingest = FrameIngest(self.serial_connection, self.frames, decode=decode_packet)
+        self.ingest.start()
+        self.render_loop = RenderLoop(self.root, self.frames, self.render, RENDER_FPS).start()
+
+    def process_packet(self, t, target_data):
+        detections = []
+        if target_data:
+            # Convert raw angle and distance to meters through the unit's
+            # calibration tables
+            x, y = self.calibration.to_cartesian(target_data["angle"], target_data["distance"])
+
+            self.trail.append(x, y, t)
+            detections.append((x * 1000, y * 1000))
+            if self.heatmap:
+                self.heatmap.add(t, [x * 1000], [y * 1000])
+
+        # Associate the detection with a persistent track
+        self.tracks = self.tracker.step(0, detections, t)
+
+        if self.store:
+            t_ns = int(t * 1e9) + self.clock_offset_ns
+            if detections:
+                (x_mm, y_mm), = detections
+                speed = sign_magnitude(target_data["speed"])
+                self.store.append(np.array([(t_ns, 0, DETECTION, 0, round(x_mm), round(y_mm), speed)], dtype=STORE_DTYPE))
+            self.store.add_tracks(t_ns, 0, self.tracks)
+
+        for track in self.tracks:
+            track_id, track_distance, track_angle, radial_speed, trajectory = describe_track(track)
+            # Update raw data log
+            raw_data = f"ID: {track_id}, Distance: {track_distance:.2f} m, Angle: {track_angle:.2f} degrees, " \
+                       f"Speed: {radial_speed:.2f} m/s, Trajectory: {trajectory}\n"
+            self.raw_data_text.insert(tk.END, raw_data)
+        if len(self.tracks):
+            self.raw_data_text.see(tk.END)
+
+    def update_target_list(self):
+        self.target_list.delete(*self.target_list.get_children())
+        for track in self.tracks:
+            track_id, track_distance, track_angle, radial_speed, trajectory = describe_track(track)
+            self.target_list.insert("", "end", iid=track_id, text=str(track_id), values=(
+                f"{track_distance:.2f}",
+                f"{track_angle:.2f}",
+                f"{radial_speed:.2f}",
+                trajectory
+            ))
+
+    def render(self, frames):
+        """
+        Render tick: apply every frame that arrived since the last tick (the
+        tracker needs all of them), then blit the animated artists once.
+        """
+        for t, target_data in frames:
+            self.process_packet(t, target_data)
+        if frames:
+            self.update_target_list()
+
+        if self.background is not None:
+            self.canvas.restore_region(self.background)
+            self.draw_animated()
+            self.canvas.blit(self.ax.bbox)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        if self.heatmap:
+            counts = self.heatmap.counts(HEATMAP_WINDOW, time.monotonic())
+            self.heatmap_image.set_data(counts)
+            self.heatmap_image.set_clim(0, max(1, int(counts.max())))
+            self.ax.draw_artist(self.heatmap_image)
+
+        # Draw fading dots (kept for 3 seconds)
+        xs, ys, alpha = self.trail.live(time.monotonic())
+        self.trail_scatter.set_offsets(np.column_stack((xs, ys)))
+        self.trail_scatter.set_color(self.trail.colors(alpha))
+        self.ax.draw_artist(self.trail_scatter)
+
+        for i, label in enumerate(self.track_labels):
+            if i < len(self.tracks):
+                track = self.tracks[i]
+                label.set_position((track["x_mm"] / 1000, track["y_mm"] / 1000))
+                label.set_text(f"#{track['track_id']}")
+                label.set_visible(True)
+                self.ax.draw_artist(label)
+            else:
+                label.set_visible(False)
+
+        self.status_text.set_text(self.render_loop.status())
+        self.ax.draw_artist(self.status_text)
 
 # Run App
 if __name__ == "__main__":
+    if HEATMAP_WINDOW and HEATMAP_WINDOW not in WINDOWS:
+        sys.exit(f"HEATMAP_WINDOW must be one of {', '.join(WINDOWS)}, not {HEATMAP_WINDOW!r}")
     root = tk.Tk()
     app = RadarApp(root)
     root.mainloop()
+    if app.store:
+        app.store.close()
@@ -0,0 +1,224 @@
+import argparse
+import io
+import os
+import selectors
+import time
+from collections import namedtuple
+
+import numpy as np
+import serial
+
+from async_serial import RADAR_BAUDRATE, set_vmin
+from frame_decoder import decode_frames
+from frame_scanner import FRAME_SIZE, FrameScanner
+
+# Comma-separated list of radar ports; sensor IDs follow the list order
+RADAR_PORTS = os.environ.get('RADAR_PORTS', os.environ.get('RADAR_PORT', '/dev/ttyTHS1'))
+
+RECONNECT_DELAY = 2.0  # Seconds between attempts to reopen a failed port
+
+# One decoded report frame from one sensor: sensor ID, per-sensor sequence
+# number, arrival time (monotonic ns) and a DETECTION_DTYPE array
+SensorFrame = namedtuple("SensorFrame", ["sensor", "seq", "t_ns", "targets"])
+
+
+class SensorPort:
+    """
+    One radar in the reactor: its port, its own framer and its counters.
+    """
+
+    def __init__(self, sensor, port, baudrate=RADAR_BAUDRATE, vmin=FRAME_SIZE):
+        self.sensor = sensor
+        self.port = port
+        self.baudrate = baudrate
+        self.vmin = vmin
+        self.scanner = FrameScanner()
+        self.serial = None
+        self._stream = None
+        self._current_vmin = None
+        self.frames = 0
+        self.reads = 0
+        self.errors = 0
+        self.retry_at = 0.0
+        self._rate_mark = (time.monotonic(), 0, 0)  # time, frames, bytes at the last stats() call
+
+    def open(self):
+        self.serial = serial.Serial(self.port, self.baudrate, timeout=0)
+        self._stream = io.FileIO(self.serial.fileno(), 'rb', closefd=False)
+        self._current_vmin = None
+        self._set_vmin(self.vmin)
+
+    def close(self):
+        if self.serial:
+            self.serial.close()
+        self.serial = None
+        self._stream = None
+
+    def fileno(self):
+        return self.serial.fileno()
+
+    def _set_vmin(self, vmin):
+        if vmin != self._current_vmin:
+            set_vmin(self.serial.fileno(), vmin)
+            self._current_vmin = vmin
+
+    def read(self, t_ns):
+        """
+        Drain the port and return the SensorFrames it completed. All frames
+        of one wakeup are decoded in a single vectorized pass.
+        """
+        self.reads += 1
+        self.scanner.fill(self._stream)
+        raw = b''.join(self.scanner.frames())
+        backlog = self.scanner.backlog
+        # Wake up again only once the rest of the next frame is buffered
+        self._set_vmin(self.vmin - backlog if backlog < self.vmin else 1)
+
+        count = len(raw) // FRAME_SIZE
+        if not count:
+            return []
+        targets = decode_frames(raw, validate=False)
+        bounds = np.searchsorted(targets["frame_idx"], np.arange(count + 1))
+        frames = [
+            SensorFrame(self.sensor, self.frames + i, t_ns, targets[bounds[i]:bounds[i + 1]])
+            for i in range(count)
+        ]
+        self.frames += count
+        return frames
+
+    def stats(self, now):
+        """
+        Counters, with throughput measured since the previous call.
+        """
+        then, frames, bytes_in = self._rate_mark
+        elapsed = max(now - then, 1e-9)
+        self._rate_mark = (now, self.frames, self.scanner.bytes_in)
+        return {
+            "sensor": self.sensor,
+            "port": self.port,
+            "connected": self.serial is not None,
+            "frames": self.frames,
+            "frames_per_s": round((self.frames - frames) / elapsed, 1),
+            "bytes_per_s": round((self.scanner.bytes_in - bytes_in) / elapsed, 1),
+            "backlog": self.scanner.backlog,
+            "resyncs": self.scanner.resyncs,
+            "dropped_bytes": self.scanner.dropped_bytes,
+            "reads": self.reads,
+            "errors": self.errors,
+        }
+
+
+class SensorReactor:
+    """
+    Ingest any number of radar ports from one thread.
+
+    Every port is registered with a selectors event loop and only read when
+    the kernel reports it readable (VMIN keeps that to roughly one wakeup
+    per frame). Each stream has its own FrameScanner, so a noisy or stalled
+    sensor never affects the others. poll() returns the frames completed by
+    one wakeup as a single stream ordered by arrival time and tagged with
+    the sensor ID; ports that fail are reopened in the background.
+    """
+
+    def __init__(self, ports, baudrate=RADAR_BAUDRATE, vmin=FRAME_SIZE, first_sensor=0):
+        self.sensors = [SensorPort(first_sensor + i, port, baudrate, vmin) for i, port in enumerate(ports)]
+        self.selector = selectors.DefaultSelector()
+
+    def open(self):
+        for sensor in self.sensors:
+            self._connect(sensor)
+        return self
+
+    def _connect(self, sensor):
+        try:
+            sensor.open()
+        except (OSError, serial.SerialException) as e:
+            sensor.errors += 1
+            sensor.retry_at = time.monotonic() + RECONNECT_DELAY
+            print(f"Sensor {sensor.sensor} ({sensor.port}) unavailable: {e}")
+            return
+        self.selector.register(sensor.fileno(), selectors.EVENT_READ, sensor)
+
+    def _disconnect(self, sensor, error):
+        print(f"Sensor {sensor.sensor} ({sensor.port}) read error: {error}")
+        self.selector.unregister(sensor.fileno())
+        sensor.close()
+        sensor.errors += 1
+        sensor.retry_at = time.monotonic() + RECONNECT_DELAY
+
+    def poll(self, timeout=None):
+        """
+        Wait up to timeout seconds (forever if None) for data on any port
+        and return the SensorFrames it completed.
+        """
+        now = time.monotonic()
+        offline = [sensor for sensor in self.sensors if sensor.serial is None]
+        for sensor in offline:
+            if now >= sensor.retry_at:
+                self._connect(sensor)
+        if offline:
+            timeout = RECONNECT_DELAY if timeout is None else min(timeout, RECONNECT_DELAY)
+
+        frames = []
+        for key, _ in self.selector.select(timeout):
+            sensor = key.data
+            try:
+                frames.extend(sensor.read(time.monotonic_ns()))
+            except OSError as e:
+                self._disconnect(sensor, e)
+        return frames
+
+    def __iter__(self):
+        while True:
+            yield from self.poll()
+
+    def stats(self):
+        now = time.monotonic()
+        return [sensor.stats(now) for sensor in self.sensors]
+
+    def close(self):
+        for sensor in self.sensors:
+            if sensor.serial is not None:
+                self.selector.unregister(sensor.fileno())
+                sensor.close()
+        self.selector.close()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read several RD-03D sensors from one process.")
+    parser.add_argument("ports", nargs="*", default=RADAR_PORTS.split(","),
+                        help="serial ports, one per sensor (default: $RADAR_PORTS)")
+    parser.add_argument("--baudrate", type=int, default=RADAR_BAUDRATE)
+    parser.add_argument("--stats", type=float, default=0.0, metavar="SECONDS",
+                        help="print per-sensor counters at this interval")
+    parser.add_argument("--quiet", action="store_true", help="do not print targets")
+    args = parser.parse_args()
+
+    next_stats = time.monotonic() + args.stats
+    with SensorReactor(args.ports, args.baudrate) as reactor:
+        try:
+            while True:
+                for frame in reactor.poll(args.stats or None):
+                    if args.quiet:
+                        continue
+                    for target in frame.targets:
+                        print(f"{frame.t_ns / 1e9:.3f} sensor {frame.sensor} slot {target['slot'] + 1}: "
+                              f"x={target['x_mm']} mm y={target['y_mm']} mm speed={target['speed_cms']} cm/s")
+                if args.stats and time.monotonic() >= next_stats:
+                    next_stats += args.stats
+                    for row in reactor.stats():
+                        print(f"sensor {row['sensor']} ({row['port']}): {row['frames_per_s']} frames/s, "
+                              f"{row['bytes_per_s']} B/s, backlog {row['backlog']} B, "
+                              f"resyncs {row['resyncs']}, errors {row['errors']}")
+        except KeyboardInterrupt:
+            print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+from frame_scanner import COMMAND_HEADER, COMMAND_TAIL, FRAME_HEADER, FRAME_SIZE, FRAME_TAIL
+
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')
+
+# Baud rates tried in order; the RD-03D default comes first so a correctly
+# configured unit is identified on the first pass
+CANDIDATE_BAUDRATES = [256000, 115200, 230400, 460800, 57600, 38400, 9600]
+
+PROBE_SECONDS = 0.2  # Listening time per baud rate (RD-03D reports every 100 ms)
+PROBE_BYTES = 4096  # Byte budget per baud rate
+CONFIRM_FRAMES = 2  # Valid frames that end a probe early
+MAX_PAYLOAD = 1024  # Larger length fields are treated as noise
+MAX_WORKERS = 32  # Ports probed at once
+
+# A frame grammar: fixed-size frames (size) or frames whose payload length
+# is the little-endian u16 right after the header (size None)
+Grammar = namedtuple("Grammar", ["name", "header", "tail", "size"])
+
+GRAMMARS = [
+    Grammar("rd03d", FRAME_HEADER, FRAME_TAIL, FRAME_SIZE),  # AA FF 03 00 ... 55 CC (test-struct.py, hex-decode0.py)
+    Grammar("rd03", b'\xF1\xF2\xF3\xF4', b'\xF5\xF6\xF7\xF8', None),  # test-data.py, baud-test.py --protocol rd03
+    Grammar("ld2410", b'\xF4\xF3\xF2\xF1', b'\xF8\xF7\xF6\xF5', None),  # HLK-LD2410 style report frames
+    Grammar("command", COMMAND_HEADER, COMMAND_TAIL, None),  # Command ACKs (config mode)
+]
+
+ProbeResult = namedtuple("ProbeResult", [
+    "port", "baudrate", "protocol", "frames", "density", "bytes_read", "elapsed", "error",
+])
+
+
+def frame_length(sample, pos, grammar):
+    """
+    Length of the frame whose header starts at pos: 0 while its length
+    field has not arrived yet, None for an implausible length field.
+    """
+    if grammar.size is not None:
+        return grammar.size
+    length_at = pos + len(grammar.header)
+    if length_at + 2 > len(sample):
+        return 0
+    payload = int.from_bytes(sample[length_at:length_at + 2], 'little')
+    if payload > MAX_PAYLOAD:
+        return None
+    return len(grammar.header) + 2 + payload + len(grammar.tail)
+
+
+class GrammarScore:
+    """
+    Running frame count of one grammar over a growing sample: update()
+    scans only the bytes added since the previous call, resuming at a
+    frame that was still incomplete.
+    """
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.frames = 0
+        self.covered = 0  # Sample bytes inside counted frames
+        self.pos = 0  # Where the next header search starts
+
+    def update(self, sample):
+        header, tail = self.grammar.header, self.grammar.tail
+        start = self.pos
+        pos = sample.find(header, start)
+        while pos >= 0:
+            size = frame_length(sample, pos, self.grammar)
+            if size == 0 or (size and pos + size > len(sample)):
+                # Incomplete frame: check it once the rest has arrived
+                self.pos = pos
+                return
+            if size and sample.startswith(tail, pos + size - len(tail)):
+                self.frames += 1
+                self.covered += size
+                start = pos + size
+            else:
+                start = pos + 1
+            pos = sample.find(header, start)
+        # A header may be split across this read and the next one
+        self.pos = max(start, len(sample) - len(header) + 1)
+
+    def density(self, sample):
+        return self.covered / len(sample) if sample else 0.0
+
+
+def score(sample, grammar):
+    """
+    Count frames of a grammar in a byte sample: a header whose tail is
+    exactly where the grammar puts it. Returns (frames, density), density
+    being the share of sample bytes covered by those frames. Random data
+    essentially never lines up a header and tail, so even one frame is
+    strong evidence and a correct configuration scores close to 1.0.
+    """
+    scorer = GrammarScore(grammar)
+    scorer.update(sample)
+    return scorer.frames, scorer.density(sample)
+
+
+def best_grammar(sample, grammars=GRAMMARS):
+    """
+    Returns (grammar, frames, density) for the highest scoring grammar.
+    """
+    best = (None, 0, 0.0)
+    for grammar in grammars:
+        frames, density = score(sample, grammar)
+        if (density, frames) > (best[2], best[1]):
+            best = (grammar, frames, density)
+    return best
+
+
+def listen(connection, seconds, budget):
+    """
+    Read up to budget bytes, returning early once CONFIRM_FRAMES frames of
+    one grammar have been seen. Each read is scored on its own new bytes,
+    so listening stays linear in the sample size.
+    """
+    sample = bytearray()
+    scorers = [GrammarScore(grammar) for grammar in GRAMMARS]
+    deadline = time.monotonic() + seconds
+    while len(sample) < budget:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        connection.timeout = remaining
+        data = connection.read(min(max(1, connection.in_waiting), budget - len(sample)))
+        if not data:
+            break
+        sample += data
+        for scorer in scorers:
+            scorer.update(sample)
+        if any(scorer.frames >= CONFIRM_FRAMES for scorer in scorers):
+            break
+    return bytes(sample)
+
+
+def probe_port(port, baudrates=CANDIDATE_BAUDRATES, seconds=PROBE_SECONDS, budget=PROBE_BYTES):
+    """
+    Cycle through the baud rates until one shows valid frames of a known
+    grammar.
+    """
+    start = time.monotonic()
+    bytes_read = 0
+    try:
+        with serial.Serial(port, baudrates[0], timeout=seconds) as connection:
+            for baudrate in baudrates:
+                connection.baudrate = baudrate
+                # Drop bytes received at the previous rate
+                connection.reset_input_buffer()
+                sample = listen(connection, seconds, budget)
+                bytes_read += len(sample)
+                grammar, frames, density = best_grammar(sample)
+                if frames:
+                    return ProbeResult(port, baudrate, grammar.name, frames, round(density, 3),
+                                       bytes_read, round(time.monotonic() - start, 3), None)
+    except (OSError, serial.SerialException) as e:
+        return ProbeResult(port, None, None, 0, 0.0, bytes_read, round(time.monotonic() - start, 3), str(e))
+    return ProbeResult(port, None, None, 0, 0.0, bytes_read, round(time.monotonic() - start, 3), None)
+
+
+def probe_ports(ports, baudrates=CANDIDATE_BAUDRATES, seconds=PROBE_SECONDS, budget=PROBE_BYTES):
+    """
+    Probe many ports in parallel; results are returned in port order.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(ports)))) as pool:
+        return list(pool.map(lambda port: probe_port(port, baudrates, seconds, budget), ports))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect the baud rate and frame protocol of radar ports.")
+    parser.add_argument("ports", nargs="*", default=[RADAR_PORT], help="serial ports to probe (default: $RADAR_PORT)")
+    parser.add_argument("--baudrates", default=",".join(map(str, CANDIDATE_BAUDRATES)),
+                        help="comma-separated baud rates, tried in order")
+    parser.add_argument("--seconds", type=float, default=PROBE_SECONDS, help="listening time per baud rate")
+    parser.add_argument("--bytes", type=int, default=PROBE_BYTES, help="byte budget per baud rate")
+    args = parser.parse_args()
+
+    baudrates = [int(b) for b in args.baudrates.split(",")]
+    results = probe_ports(args.ports, baudrates, args.seconds, args.bytes)
+    # One JSON object per line and port, in argument order
+    for result in results:
+        print(json.dumps(result._asdict()))
+    sys.exit(0 if all(result.protocol for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
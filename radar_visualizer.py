@@ -1,25 +1,53 @@
 import tkinter as tk
 from tkinter import ttk
 import serial
-import threading
 import math
-import random  # Replace with actual data parsing
+import os
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
+import numpy as np
+
+from gui_loop import FrameIngest, LatestState, RenderLoop
+from tracker import Tracker
 
 # Radar setup
-RADAR_PORT = '/dev/ttyTHS1' 
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')
 RADAR_BAUDRATE = 256000
 RANGE_MAX = 8.0  # Maximum range in meters
-
-# Dummy data function (replace with actual parsing logic)
-def parse_radar_data():
-    # Simulate target data: (distance, angle, speed, trajectory)
-    distance = random.uniform(0, RANGE_MAX)
-    angle = random.uniform(0, 360)
-    speed = random.uniform(0, 5)
-    trajectory = random.choice(["Approaching", "Stationary", "Departing"])
-    return {"distance": distance, "angle": angle, "speed": speed, "trajectory": trajectory}
+RENDER_FPS = int(os.environ.get('RENDER_FPS', 30))  # Render ticks per second, independent of the frame rate
+TRAJECTORY_SPEED_THRESHOLD = 0.1  # m/s of radial speed before a track counts as moving
+
+# Target data from one decoded report row (DETECTION_DTYPE)
+def parse_radar_data(target):
+    x = target["x_mm"] / 1000
+    y = target["y_mm"] / 1000
+    distance = math.hypot(x, y)
+    angle = math.degrees(math.atan2(x, y))  # 0 straight ahead, positive to the right
+    speed = target["speed_cms"] / 100  # Negative while approaching
+    if speed < 0:
+        trajectory = "Approaching"
+    elif speed > 0:
+        trajectory = "Departing"
+    else:
+        trajectory = "Stationary"
+    return {"x": x, "y": y, "distance": distance, "angle": angle, "speed": speed, "trajectory": trajectory}
+
+# Target data from one confirmed track (tracker.TRACK_DTYPE)
+def parse_track(track):
+    x = track["x_mm"] / 1000
+    y = track["y_mm"] / 1000
+    distance = math.hypot(x, y)
+    angle = math.degrees(math.atan2(x, y))
+    # Radial speed from the track velocity, negative when closing in
+    speed = (x * track["vx_mms"] + y * track["vy_mms"]) / max(distance, 0.001) / 1000
+    if speed < -TRAJECTORY_SPEED_THRESHOLD:
+        trajectory = "Approaching"
+    elif speed > TRAJECTORY_SPEED_THRESHOLD:
+        trajectory = "Departing"
+    else:
+        trajectory = "Stationary"
+    return {"id": int(track["track_id"]), "distance": distance, "angle": angle, "speed": speed,
+            "trajectory": trajectory}
 
 # Main App Class
 class RadarApp:
@@ -72,54 +100,58 @@ class RadarApp:
         self.root.grid_columnconfigure(0, weight=3)
         self.root.grid_columnconfigure(1, weight=1)
 
-        # Start Data Updates
-        self.targets = {}
-        self.update_data()
-
-    def update_data(self):
-        # Read radar data (replace this block with actual data parsing from serial)
-        target_data = parse_radar_data()  # Replace with self.read_serial_data()
+        # Persistent target identities across frames; report slots are
+        # reassigned by the sensor from frame to frame
+        self.tracker = Tracker()
+        self.tracks = self.tracker.tracks(0)
+
+        # Current targets, updated in place instead of redrawing the axes
+        self.target_scatter = self.ax.scatter([], [])
+        self.status_text = self.ax.text(0.02, 0.98, "", transform=self.ax.transAxes, va='top', fontsize=8)
+
+        # Start Data Updates: the ingest thread decodes frames into a
+        # latest-state slot, the render tick on the Tk main thread consumes
+        # them at a fixed rate; only the main thread touches widgets
+        self.frames = LatestState()
+        self.ingest = FrameIngest(self.serial_connection, self.frames)
+        self.ingest.start()
+        self.render_loop = RenderLoop(self.root, self.frames, self.update_data, RENDER_FPS).start()
+
+    def update_data(self, frames):
+        # The plot only changes when a frame arrives, so idle ticks are free
+        if not frames:
+            return
+        self.status_text.set_text(self.render_loop.status())
+
+        # The tracker needs every frame; only the newest detections are plotted
+        for t, detections in frames:
+            self.tracks = self.tracker.step(0, np.column_stack((detections["x_mm"], detections["y_mm"])), t)
+        _, detections = frames[-1]
+        targets = [parse_radar_data(target) for target in detections]
 
         # Update radar plot
-        self.ax.clear()
-        self.ax.set_xlim(-RANGE_MAX, RANGE_MAX)
-        self.ax.set_ylim(-RANGE_MAX, RANGE_MAX)
-        self.ax.set_title("Radar View")
-        self.ax.grid(True)
-        for r in range(1, int(RANGE_MAX) + 1):
-            self.ax.add_artist(plt.Circle((0, 0), r, color='gray', fill=False, linestyle='dashed'))
-
-        target_id = len(self.targets) + 1
-        x = target_data["distance"] * math.cos(math.radians(target_data["angle"]))
-        y = target_data["distance"] * math.sin(math.radians(target_data["angle"]))
-        self.ax.scatter(x, y, label=f"ID {target_id}")
-        self.ax.legend()
-
-        # Update target list
-        self.target_list.insert("", "end", iid=target_id, text=str(target_id), values=(
-            f"{target_data['distance']:.2f}",
-            f"{target_data['angle']:.2f}",
-            f"{target_data['speed']:.2f}",
-            target_data['trajectory']
-        ))
-
-        # Update raw data log
-        raw_data = f"ID: {target_id}, Distance: {target_data['distance']:.2f}, Angle: {target_data['angle']:.2f}, " \
-                   f"Speed: {target_data['speed']:.2f}, Trajectory: {target_data['trajectory']}\n"
-        self.raw_data_text.insert(tk.END, raw_data)
-        self.raw_data_text.see(tk.END)
-
-        self.canvas.draw()
-
-        # Schedule next update
-        self.root.after(100, self.update_data)
-
-    def read_serial_data(self):
-        if self.serial_connection.in_waiting:
-            raw_data = self.serial_connection.readline().decode("utf-8").strip()
-            # Parse and return structured data
-            return parse_radar_data()  # Replace with actual parsing logic
-        return None
+        self.target_scatter.set_offsets(np.array([(t["x"], t["y"]) for t in targets]).reshape(-1, 2))
+
+        # Update target list, one row per confirmed track
+        self.target_list.delete(*self.target_list.get_children())
+        for track in self.tracks:
+            track_data = parse_track(track)
+            self.target_list.insert("", "end", iid=track_data["id"], text=str(track_data["id"]), values=(
+                f"{track_data['distance']:.2f}",
+                f"{track_data['angle']:.2f}",
+                f"{track_data['speed']:.2f}",
+                track_data['trajectory']
+            ))
+
+            # Update raw data log
+            raw_data = f"ID: {track_data['id']}, Distance: {track_data['distance']:.2f}, " \
+                       f"Angle: {track_data['angle']:.2f}, Speed: {track_data['speed']:.2f}, " \
+                       f"Trajectory: {track_data['trajectory']}\n"
+            self.raw_data_text.insert(tk.END, raw_data)
+        if len(self.tracks):
+            self.raw_data_text.see(tk.END)
+
+        self.canvas.draw_idle()
 
 
 # Run App
@@ -0,0 +1,304 @@
+import argparse
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from async_serial import RADAR_BAUDRATE
+from frame_decoder import DETECTION_DTYPE, TARGET_SLOTS
+from multi_sensor import RADAR_PORTS, SensorReactor
+
+RING_CAPACITY = 4096  # Frame records per shard ring (~40 s of 10 sensors at 10 Hz)
+STOP_POLL_INTERVAL = 0.2  # Seconds a worker waits for data before checking for shutdown
+
+# One decoded frame in a ring. Targets use the decoder's own row layout, so
+# record["targets"][:record["count"]] is a DETECTION_DTYPE array as is.
+RING_RECORD_DTYPE = np.dtype([
+    ("t_ns", "<i8"),
+    ("seq", "<u4"),
+    ("sensor", "<u2"),
+    ("count", "u1"),
+    ("targets", DETECTION_DTYPE, (TARGET_SLOTS,)),
+    ("pad", "V10"),
+])
+assert RING_RECORD_DTYPE.itemsize == 64
+
+# Ring header: the writer's counters and the reader's index live on
+# separate cache lines so the two processes do not contend
+HEADER_SIZE = 128
+WRITE_INDEX, DROPPED = 0, 1  # u8 slots in the writer's line
+READ_INDEX = 8  # u8 slot in the reader's line
+
+
+class FrameRing:
+    """
+    Single-producer single-consumer ring of RING_RECORD_DTYPE records in
+    shared memory.
+
+    Indices only ever grow (slot = index % capacity) and each is written by
+    one side only: the worker fills records and then publishes them by
+    advancing the write index, the aggregator reads them in place and then
+    releases them by advancing the read index. Nothing is pickled or copied
+    between processes. A full ring never blocks the worker; new frames are
+    dropped and counted instead.
+    """
+
+    def __init__(self, shm, capacity, owner):
+        self.shm = shm
+        self.capacity = capacity
+        self.owner = owner
+        self._header = np.ndarray((HEADER_SIZE // 8,), dtype="<u8", buffer=shm.buf)
+        self.records = np.ndarray((capacity,), dtype=RING_RECORD_DTYPE, buffer=shm.buf, offset=HEADER_SIZE)
+
+    @classmethod
+    def create(cls, capacity=RING_CAPACITY):
+        shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity * RING_RECORD_DTYPE.itemsize)
+        ring = cls(shm, capacity, owner=True)
+        ring._header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, capacity=RING_CAPACITY):
+        # Workers share their parent's resource tracker, which unlinks the
+        # segment only if the owner never did
+        return cls(shared_memory.SharedMemory(name=name), capacity, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def written(self):
+        return int(self._header[WRITE_INDEX])
+
+    @property
+    def read_index(self):
+        return int(self._header[READ_INDEX])
+
+    @property
+    def dropped(self):
+        return int(self._header[DROPPED])
+
+    def __len__(self):
+        return self.written - self.read_index
+
+    def publish(self, frames):
+        """
+        Producer side: append SensorFrames, dropping what does not fit.
+        """
+        write = self.written
+        free = self.capacity - (write - self.read_index)
+        records = self.records
+        for frame in frames[:free]:
+            record = records[write % self.capacity]
+            count = len(frame.targets)
+            record["t_ns"] = frame.t_ns
+            record["seq"] = frame.seq
+            record["sensor"] = frame.sensor
+            record["count"] = count
+            record["targets"][:count] = frame.targets
+            write += 1
+        if len(frames) > free:
+            self._header[DROPPED] += len(frames) - free
+        # Publishing the index last makes the records visible all at once
+        self._header[WRITE_INDEX] = write
+
+    def peek(self):
+        """
+        Consumer side: view of the readable records up to the end of the
+        ring buffer (call again after advance() for the wrapped part).
+        """
+        read = self.read_index
+        available = self.written - read
+        start = read % self.capacity
+        return self.records[start:start + min(available, self.capacity - start)]
+
+    def advance(self, count):
+        self._header[READ_INDEX] = self.read_index + count
+
+    def close(self):
+        del self._header, self.records
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingAggregator:
+    """
+    Reads every shard's ring in the aggregating process.
+    """
+
+    def __init__(self, rings):
+        self.rings = rings
+
+    def drain(self, handle):
+        """
+        Call handle(records) for every readable batch of every ring. The
+        RING_RECORD_DTYPE view is only valid during the call; copy anything
+        kept. Returns the number of records handled.
+        """
+        total = 0
+        for ring in self.rings:
+            while True:
+                records = ring.peek()
+                if not len(records):
+                    break
+                handle(records)
+                ring.advance(len(records))
+                total += len(records)
+        return total
+
+
+def shard_worker(ports, first_sensor, ring_name, capacity, wake, stop, baudrate, pipeline=None):
+    """
+    Worker process: read this shard's ports with a SensorReactor and publish
+    every batch into the shard's ring. pipeline, if given, is applied to each
+    batch of SensorFrames first (per-sensor work such as tracking).
+    """
+    ring = FrameRing.attach(ring_name, capacity)
+    wake_fd = wake.fileno()
+    os.set_blocking(wake_fd, False)
+    try:
+        with SensorReactor(ports, baudrate, first_sensor=first_sensor) as reactor:
+            while not stop.is_set():
+                frames = reactor.poll(STOP_POLL_INTERVAL)
+                if not frames:
+                    continue
+                if pipeline:
+                    frames = pipeline(frames)
+                ring.publish(frames)
+                try:
+                    os.write(wake_fd, b'\x00')
+                except BlockingIOError:
+                    pass  # The aggregator already has a wakeup pending
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+class ShardedIngest:
+    """
+    Spread sensor ports over worker processes, one ring per worker.
+
+    Ports are split into contiguous shards, so sensor IDs follow the port
+    list order as with a single SensorReactor. Each worker signals new
+    records by writing a byte to its wake pipe; wake_fds can be registered
+    with select() or an asyncio loop.
+    """
+
+    def __init__(self, ports, shards, baudrate=RADAR_BAUDRATE, capacity=RING_CAPACITY, pipeline=None):
+        self.ports = list(ports)
+        self.shards = max(1, min(shards, len(self.ports)))
+        self.baudrate = baudrate
+        self.capacity = capacity
+        self.pipeline = pipeline
+        self.rings = []
+        self.workers = []
+        self.wake_fds = []
+        self._wake_readers = []
+        self._stop = multiprocessing.Event()
+        self.aggregator = RingAggregator(self.rings)
+
+    def start(self):
+        bounds = np.linspace(0, len(self.ports), self.shards + 1).astype(int)
+        for shard in range(self.shards):
+            ports = self.ports[bounds[shard]:bounds[shard + 1]]
+            ring = FrameRing.create(self.capacity)
+            wake_reader, wake_writer = multiprocessing.Pipe(duplex=False)
+            worker = multiprocessing.Process(
+                target=shard_worker, daemon=True, name=f"radar-shard-{shard}",
+                args=(ports, int(bounds[shard]), ring.name, self.capacity, wake_writer, self._stop,
+                      self.baudrate, self.pipeline),
+            )
+            worker.start()
+            wake_writer.close()
+            os.set_blocking(wake_reader.fileno(), False)
+            self.rings.append(ring)
+            self.workers.append(worker)
+            self._wake_readers.append(wake_reader)
+            self.wake_fds.append(wake_reader.fileno())
+        return self
+
+    def clear_wake(self, fd):
+        """
+        Consume pending wakeup bytes from one worker's pipe.
+        """
+        try:
+            while os.read(fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def stats(self):
+        return [
+            {
+                "shard": shard,
+                "alive": worker.is_alive(),
+                "written": ring.written,
+                "backlog": len(ring),
+                "dropped": ring.dropped,
+            }
+            for shard, (worker, ring) in enumerate(zip(self.workers, self.rings))
+        ]
+
+    def stop(self):
+        self._stop.set()
+        for worker in self.workers:
+            worker.join(STOP_POLL_INTERVAL * 5)
+            if worker.is_alive():
+                worker.terminate()
+        for reader in self._wake_readers:
+            reader.close()
+        for ring in self.rings:
+            ring.close()
+        self.rings.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    import select
+
+    parser = argparse.ArgumentParser(description="Read many RD-03D sensors in several worker processes.")
+    parser.add_argument("ports", nargs="*", default=RADAR_PORTS.split(","),
+                        help="serial ports, one per sensor (default: $RADAR_PORTS)")
+    parser.add_argument("--shards", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--baudrate", type=int, default=RADAR_BAUDRATE)
+    parser.add_argument("--stats", type=float, default=1.0, metavar="SECONDS", help="stats interval")
+    args = parser.parse_args()
+
+    counts = {}
+
+    def count(records):
+        sensors, frames = np.unique(records["sensor"], return_counts=True)
+        for sensor, n in zip(sensors.tolist(), frames.tolist()):
+            counts[sensor] = counts.get(sensor, 0) + n
+
+    with ShardedIngest(args.ports, args.shards, args.baudrate) as ingest:
+        print(f"Reading {len(ingest.ports)} ports in {ingest.shards} worker processes")
+        next_stats = time.monotonic() + args.stats
+        try:
+            while True:
+                readable, _, _ = select.select(ingest.wake_fds, [], [], args.stats)
+                for fd in readable:
+                    ingest.clear_wake(fd)
+                ingest.aggregator.drain(count)
+                if time.monotonic() >= next_stats:
+                    next_stats += args.stats
+                    for row in ingest.stats():
+                        print(f"shard {row['shard']}: {row['written']} frames, backlog {row['backlog']}, "
+                              f"dropped {row['dropped']}{'' if row['alive'] else ' (stopped)'}")
+                    print(f"frames per sensor: {dict(sorted(counts.items()))}")
+        except KeyboardInterrupt:
+            print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
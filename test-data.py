@@ -1,8 +1,9 @@
+import os
 import serial
 import time
 
 # Configuration for the radar module
-RADAR_PORT = '/dev/ttyTHS1'  # Update with the correct UART port for the Jetson Nano
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')  # Update with the correct UART port for the Jetson Nano
 RADAR_BAUDRATE = 256000      # Default baud rate from the specifications
 
 def read_radar_data(serial_connection):
@@ -1,3 +1,4 @@
+import os
 import serial
 import struct
 import time
@@ -5,7 +6,7 @@ import curses
 
 
 # Radar constants
-RADAR_PORT = '/dev/ttyTHS1'  # Update with your Jetson Nano UART port
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')  # Update with your Jetson Nano UART port
 RADAR_BAUDRATE = 256000
 
 # Frame markers
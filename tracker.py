@@ -0,0 +1,194 @@
+import itertools
+
+import numpy as np
+
+MAX_TRACKS = 8  # Track slots per sensor
+GATE_CHI2 = 9.21  # 99% gate for a 2-D position innovation
+CONFIRM_HITS = 3  # Associated frames before a tentative track is reported
+MAX_MISSES = 5  # Frames a confirmed track may coast without a detection
+TENTATIVE_MAX_MISSES = 1  # ... and a tentative one; dropped on the next miss
+POSITION_STD = 80.0  # mm, measurement noise
+ACCEL_STD = 2000.0  # mm/s^2, white acceleration process noise
+VELOCITY_STD = 1500.0  # mm/s, initial velocity uncertainty
+
+# Track slot status
+FREE, TENTATIVE, CONFIRMED = 0, 1, 2
+
+TRACK_DTYPE = np.dtype([
+    ("track_id", "<u4"),
+    ("x_mm", "<f4"),
+    ("y_mm", "<f4"),
+    ("vx_mms", "<f4"),
+    ("vy_mms", "<f4"),
+    ("hits", "<u4"),
+    ("age_s", "<f4"),
+])
+
+_H = np.array([[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]])
+_GATED = 1e9  # Cost of a pairing outside the gate
+_PERMUTATIONS = {}
+
+
+def _permutations(columns, rows):
+    key = (columns, rows)
+    if key not in _PERMUTATIONS:
+        _PERMUTATIONS[key] = np.array(list(itertools.permutations(range(columns), rows)), dtype=np.intp)
+    return _PERMUTATIONS[key]
+
+
+def assign(cost, gate):
+    """
+    Optimal gated assignment of rows (detections) to columns (tracks).
+
+    Every row may instead stay unassigned at cost `gate`, so a pairing is
+    only chosen when it beats leaving both sides free. RD-03D frames carry at
+    most three detections, which keeps exhaustive search over the padded
+    matrix small enough to evaluate as one vectorized argmin.
+    Returns a list of (row, column) pairs.
+    """
+    rows, columns = cost.shape
+    if rows == 0 or columns == 0:
+        return []
+    padded = np.full((rows, columns + rows), gate)
+    padded[:, :columns] = cost
+    perms = _permutations(columns + rows, rows)
+    totals = padded[np.arange(rows), perms].sum(axis=1)
+    best = perms[np.argmin(totals)]
+    return [(row, int(col)) for row, col in enumerate(best) if col < columns and cost[row, col] < gate]
+
+
+class Tracker:
+    """
+    Constant-velocity Kalman multi-target tracker with persistent IDs.
+
+    State for every sensor lives in preallocated arrays of shape
+    (sensors, max_tracks, ...), so stepping a sensor is a handful of
+    vectorized operations over its track slots and tracking many sensors
+    allocates nothing per track. Units are mm, mm/s and seconds.
+    """
+
+    def __init__(self, sensors=1, max_tracks=MAX_TRACKS, gate=GATE_CHI2, confirm_hits=CONFIRM_HITS,
+                 max_misses=MAX_MISSES, position_std=POSITION_STD, accel_std=ACCEL_STD,
+                 tentative_max_misses=TENTATIVE_MAX_MISSES):
+        self.gate = gate
+        self.confirm_hits = confirm_hits
+        self.max_misses = max_misses
+        self.tentative_max_misses = tentative_max_misses
+        self.accel_var = accel_std ** 2
+        self.R = np.eye(2) * position_std ** 2
+
+        shape = (sensors, max_tracks)
+        self.state = np.zeros(shape + (4,))  # x, y, vx, vy
+        self.cov = np.zeros(shape + (4, 4))
+        self.status = np.zeros(shape, dtype=np.uint8)
+        self.track_id = np.zeros(shape, dtype=np.uint32)
+        self.hits = np.zeros(shape, dtype=np.uint32)
+        self.misses = np.zeros(shape, dtype=np.uint32)
+        self.born = np.zeros(shape)
+        self.last_t = np.full(sensors, np.nan)
+        self._next_id = 1
+
+    def _predict(self, sensor, active, dt):
+        if dt <= 0 or not len(active):
+            return
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        q = self.accel_var
+        dt2, dt3, dt4 = dt * dt, dt ** 3 / 2, dt ** 4 / 4
+        Q = q * np.array([
+            [dt4, 0, dt3, 0],
+            [0, dt4, 0, dt3],
+            [dt3, 0, dt2, 0],
+            [0, dt3, 0, dt2],
+        ])
+        self.state[sensor, active] = self.state[sensor, active] @ F.T
+        self.cov[sensor, active] = F @ self.cov[sensor, active] @ F.T + Q
+
+    def _birth(self, sensor, z, t):
+        free = np.flatnonzero(self.status[sensor] == FREE)
+        if not len(free):
+            return
+        slot = free[0]
+        self.state[sensor, slot] = (z[0], z[1], 0.0, 0.0)
+        self.cov[sensor, slot] = np.diag([self.R[0, 0], self.R[1, 1], VELOCITY_STD ** 2, VELOCITY_STD ** 2])
+        self.status[sensor, slot] = TENTATIVE
+        self.track_id[sensor, slot] = self._next_id
+        self.hits[sensor, slot] = 1
+        self.misses[sensor, slot] = 0
+        self.born[sensor, slot] = t
+        self._next_id += 1
+
+    def step(self, sensor, detections, t):
+        """
+        Advance one sensor to time t with its detections, an (n, 2) array of
+        x/y positions in mm. Returns the confirmed tracks (TRACK_DTYPE).
+        """
+        z = np.asarray(detections, dtype=float).reshape(-1, 2)
+        dt = 0.0 if np.isnan(self.last_t[sensor]) else t - self.last_t[sensor]
+        self.last_t[sensor] = t
+
+        active = np.flatnonzero(self.status[sensor] != FREE)
+        self._predict(sensor, active, dt)
+
+        pairs = []
+        if len(active) and len(z):
+            x = self.state[sensor, active]
+            P = self.cov[sensor, active]
+            S = _H @ P @ _H.T + self.R  # (A, 2, 2)
+            S_inv = np.linalg.inv(S)
+            innovation = z[:, None, :] - x[None, :, :2]  # (D, A, 2)
+            d2 = np.einsum('dai,aij,daj->da', innovation, S_inv, innovation)
+            cost = np.where(d2 <= self.gate, d2, _GATED)
+            pairs = assign(cost, self.gate)
+
+        assigned = np.zeros(len(active), dtype=bool)
+        if pairs:
+            rows = np.array([row for row, _ in pairs])
+            cols = np.array([col for _, col in pairs])
+            slots = active[cols]
+            P = self.cov[sensor, slots]
+            K = P @ _H.T @ S_inv[cols]  # (k, 4, 2)
+            self.state[sensor, slots] += np.einsum('kij,kj->ki', K, innovation[rows, cols])
+            self.cov[sensor, slots] = (np.eye(4) - K @ _H) @ P
+            self.hits[sensor, slots] += 1
+            self.misses[sensor, slots] = 0
+            assigned[cols] = True
+            confirm = slots[self.hits[sensor, slots] >= self.confirm_hits]
+            self.status[sensor, confirm] = CONFIRMED
+
+        missed = active[~assigned]
+        self.misses[sensor, missed] += 1
+        status = self.status[sensor, missed]
+        lost = missed[((status == TENTATIVE) & (self.misses[sensor, missed] > self.tentative_max_misses)) |
+                      (self.misses[sensor, missed] > self.max_misses)]
+        self.status[sensor, lost] = FREE
+
+        used = {row for row, _ in pairs}
+        for row in range(len(z)):
+            if row not in used:
+                self._birth(sensor, z[row], t)
+
+        return self.tracks(sensor)
+
+    def tracks(self, sensor, confirmed_only=True):
+        if confirmed_only:
+            slots = np.flatnonzero(self.status[sensor] == CONFIRMED)
+        else:
+            slots = np.flatnonzero(self.status[sensor] != FREE)
+        out = np.empty(len(slots), dtype=TRACK_DTYPE)
+        out["track_id"] = self.track_id[sensor, slots]
+        out["x_mm"] = self.state[sensor, slots, 0]
+        out["y_mm"] = self.state[sensor, slots, 1]
+        out["vx_mms"] = self.state[sensor, slots, 2]
+        out["vy_mms"] = self.state[sensor, slots, 3]
+        out["hits"] = self.hits[sensor, slots]
+        out["age_s"] = self.last_t[sensor] - self.born[sensor, slots]
+        return out
+
+    def reset(self, sensor=None):
+        """
+        Drop all tracks (of one sensor, or of every sensor).
+        """
+        index = slice(None) if sensor is None else sensor
+        self.status[index] = FREE
+        self.last_t[index] = np.nan
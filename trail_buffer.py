@@ -0,0 +1,92 @@
+import numpy as np
+
+TRAIL_SECONDS = 3.0  # How long a detection stays on screen while fading out
+TRAIL_CAPACITY = 2048  # Detections kept; the oldest are overwritten first
+
+
+class TrailBuffer:
+    """
+    Fixed-capacity ring of timestamped detections stored as NumPy columns.
+
+    Entries are appended in time order, so expiry is a binary search on the
+    timestamp column and everything returned by live() is a vectorized
+    slice: the cost of drawing the trail does not depend on how it was
+    built, and memory stays constant however long the app runs.
+    """
+
+    def __init__(self, capacity=TRAIL_CAPACITY, ttl=TRAIL_SECONDS):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.t = np.zeros(capacity)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self._rgba = np.zeros((capacity, 4))
+        self._head = 0  # Next slot to write
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, x, y, t):
+        self.t[self._head] = t
+        self.x[self._head] = x
+        self.y[self._head] = y
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def extend(self, xs, ys, t):
+        """
+        Append many detections at once; t is a scalar or one time per entry.
+        """
+        xs = np.asarray(xs, dtype=float)
+        ts = np.broadcast_to(np.asarray(t, dtype=float), xs.shape)
+        xs = xs[-self.capacity:]
+        ys = np.asarray(ys, dtype=float)[-self.capacity:]
+        ts = ts[-self.capacity:]
+        n = len(xs)
+        if not n:
+            return
+        index = (self._head + np.arange(n)) % self.capacity
+        self.t[index] = ts
+        self.x[index] = xs
+        self.y[index] = ys
+        self._head = (self._head + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+
+    def _ordered(self, column):
+        """
+        Column values oldest first; a view unless the ring has wrapped.
+        """
+        tail = (self._head - self._count) % self.capacity
+        if tail + self._count <= self.capacity:
+            return column[tail:tail + self._count]
+        return np.concatenate((column[tail:], column[:self._head]))
+
+    def expire(self, now):
+        """
+        Forget every detection older than the trail length.
+        """
+        t = self._ordered(self.t)
+        self._count -= int(np.searchsorted(t, now - self.ttl, side='right'))
+
+    def live(self, now):
+        """
+        Return (x, y, alpha) arrays for the detections still on screen,
+        alpha fading linearly from 1 to 0 over the trail length.
+        """
+        self.expire(now)
+        t = self._ordered(self.t)
+        alpha = np.clip(1.0 - (now - t) / self.ttl, 0.0, 1.0)
+        return self._ordered(self.x), self._ordered(self.y), alpha
+
+    def colors(self, alpha, rgb=(1.0, 0.0, 0.0)):
+        """
+        RGBA face colors for live() output, written into a preallocated array.
+        """
+        rgba = self._rgba[:len(alpha)]
+        rgba[:, :3] = rgb
+        rgba[:, 3] = alpha
+        return rgba
+
+    def clear(self):
+        self._count = 0
@@ -1,7 +1,27 @@
 import tkinter as tk
 from tkinter import ttk
+import argparse
 import math
+import os
 import random
+import time
+
+import serial
+
+from frame_decoder import decode_frames
+from gui_loop import FrameIngest, LatestState, RenderLoop
+
+# Radar setup
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')
+RADAR_BAUDRATE = 256000
+ANIMATION_FPS = 30  # Single animation tick driving moves and fades
+FADE_GRACE_SECONDS = 0.2  # Two frame intervals at 10 Hz without a report before a target starts to fade
+FADE_SECONDS = 0.5  # ... then it fades out over this long
+MOCK_INTERVAL_MS = 1000  # New random targets in --mock mode
+
+parser = argparse.ArgumentParser(description="Technical radar display")
+parser.add_argument("--mock", action="store_true", help="Show random targets instead of reading the radar")
+args = parser.parse_args()
 
 # Set up the main application window
 app = tk.Tk()
@@ -15,6 +35,11 @@ line_color = "#001f3f"  # Navy blue for grid lines
 tracked_area_color = "#00ffff"  # Cyan color for tracked area
 target_colors = ["red", "green", "blue", "yellow", "purple", "orange"]
 
+# Radar geometry: the sensor sits at the top center of the canvas, looking down
+radar_radius = 300  # Fixed radar radius
+max_distance = 8  # Radar range in meters
+center_x, center_y = 400, 0  # Center of the half-circle
+
 # Sidebar for controls
 sidebar = tk.Frame(app, bg="black", width=125)
 sidebar.pack(side="left", fill="y")
@@ -32,10 +57,6 @@ canvas.pack(expand=True)
 
 # Draw radar grid
 def draw_radar_grid():
-    radar_radius = 300  # Fixed radar radius
-    max_distance = 8  # Radar range in meters
-    center_x, center_y = 400, 0  # Center of the half-circle
-
     # Draw arcs for distance rings (scaled to 8m range)
     for i in range(1, max_distance + 1):
         radius = i * (radar_radius / max_distance)
@@ -51,8 +72,9 @@ def draw_radar_grid():
             width=1,
         )
 
-    # Draw lines for every 15 degrees
-    for angle in range(180, 361, 15):
+    # Draw lines for every 15 degrees (canvas y grows downwards, so these
+    # angles cover the half-circle below the sensor)
+    for angle in range(0, 181, 15):
         rad = math.radians(angle)
         x = center_x + radar_radius * math.cos(rad)
         y = center_y + radar_radius * math.sin(rad)
@@ -60,69 +82,121 @@ def draw_radar_grid():
 
 draw_radar_grid()
 
+# Canvas position of a target; angle is in degrees from straight ahead,
+# positive to the right
+def project(distance, angle):
+    scaled = distance * (radar_radius / max_distance)
+    rad = math.radians(angle)
+    return center_x + scaled * math.sin(rad), center_y + scaled * math.cos(rad)
+
 # Function to generate random targets
 def generate_random_targets():
     targets = []
-    for _ in range(random.randint(1, 5)):
+    for idx in range(random.randint(1, 5)):
         distance = random.uniform(1, 8)  # Constrain within the radar range
-        angle = random.uniform(180, 360)  # Constrain within the half-circle
+        angle = random.uniform(-60, 60)  # Constrain within the field of view
         velocity = random.uniform(0, 10)
-        targets.append({"distance": distance, "angle": angle, "velocity": velocity})
+        targets.append({"slot": idx, "distance": distance, "angle": angle, "velocity": velocity})
     return targets
 
-# Draw targets on the radar
-def draw_targets(targets):
-    center_x, center_y = 400, 0
-
-    for idx, target in enumerate(targets):
-        # Scale distance to the radar radius
-        distance = target["distance"] * (300 / 8)
-        rad = math.radians(target["angle"])
-        x = center_x + distance * math.cos(rad)
-        y = center_y + distance * math.sin(rad)
-        target_circle = canvas.create_oval(
-            x - 5, y - 5, x + 5, y + 5, fill=target_colors[idx % len(target_colors)], tags="target"
-        )
-        fade_target(target_circle)
+# Decode one report frame from the radar into target dicts
+def decode_targets(frame):
+    targets = []
+    for target in decode_frames(frame):
+        x = target["x_mm"] / 1000
+        y = target["y_mm"] / 1000
+        targets.append({
+            "slot": int(target["slot"]),
+            "distance": math.hypot(x, y),
+            "angle": math.degrees(math.atan2(x, y)),
+            "velocity": target["speed_cms"] / 100,
+        })
+    return targets
 
-# Fade effect for targets
-def fade_target(target_circle):
-    for alpha in range(255, 0, -15):
-        color = f"#{alpha:02x}{alpha:02x}{alpha:02x}"
-        canvas.itemconfig(target_circle, fill=color)
-        canvas.update()
-        app.after(30)
+# Blend a color towards the background, level 1.0 being the full color
+def fade_color(rgb, level):
+    return "#" + "".join(f"{round(b + (c - b) * level):02x}" for c, b in zip(rgb, background_rgb))
+
+background_rgb = [c // 256 for c in app.winfo_rgb(radar_bg_color)]
+
+class TargetSlot:
+    """
+    One pooled target: a canvas oval and a card in the top bar, created once
+    and then moved, recolored and relabeled in place.
+    """
+
+    def __init__(self, idx):
+        self.idx = idx
+        self.color = target_colors[idx % len(target_colors)]
+        self.rgb = [c // 256 for c in app.winfo_rgb(self.color)]
+        self.oval = canvas.create_oval(0, 0, 0, 0, fill=self.color, state="hidden", tags="target")
+        self.fill = self.color
+        self.frame = tk.Frame(topbar, bg="gray", padx=5, pady=5)
+        self.label = tk.Label(self.frame, text="", bg="lightgray", fg=self.color, justify="center")
+        self.label.pack()
+        self.text = ""
+        self.last_seen = None  # None while the oval is hidden
+
+    def update(self, target, now):
+        x, y = project(target["distance"], target["angle"])
+        canvas.coords(self.oval, x - 5, y - 5, x + 5, y + 5)
+        if self.last_seen is None:
+            canvas.itemconfig(self.oval, state="normal")
+        self.last_seen = now
+
+        text = f"Target {self.idx + 1}\n" \
+               f"Dist: {target['distance']:.1f}m\n" \
+               f"Angle: {target['angle']:.1f}°\n" \
+               f"Vel: {target['velocity']:.1f}m/s"
+        if text != self.text:
+            self.label.config(text=text)
+            self.text = text
+
+    def fade(self, now):
+        if self.last_seen is None:
+            return
+        level = min(1.0, 1 - (now - self.last_seen - FADE_GRACE_SECONDS) / FADE_SECONDS)
+        if level <= 0:
+            canvas.itemconfig(self.oval, state="hidden")
+            self.last_seen = None
+            return
+        fill = fade_color(self.rgb, level)
+        if fill != self.fill:
+            canvas.itemconfig(self.oval, fill=fill)
+            self.fill = fill
+
+slots = [TargetSlot(idx) for idx in range(len(target_colors))]
+visible_cards = []
 
 # Update target list and status
-def update_target_list(targets):
-    for widget in topbar.winfo_children():
-        widget.destroy()
-
-    # Target boxes
-    for idx, target in enumerate(targets):
-        target_frame = tk.Frame(topbar, bg="gray", padx=5, pady=5)
-        target_frame.pack(side="left", padx=5, pady=5)
-
-        target_label = tk.Label(
-            target_frame,
-            text=f"Target {idx + 1}\n"
-                 f"Dist: {target['distance']:.1f}m\n"
-                 f"Angle: {target['angle']:.1f}°\n"
-                 f"Vel: {target['velocity']:.1f}m/s",
-            bg="lightgray",
-            fg=target_colors[idx % len(target_colors)],
-            justify="center",
-        )
-        target_label.pack()
+def update_target_list(shown):
+    global visible_cards
+    # Cards are only repacked when the set of targets changes
+    if shown == visible_cards:
+        return
+    for slot in visible_cards:
+        slot.frame.pack_forget()
+    for slot in shown:
+        slot.frame.pack(side="left", padx=5, pady=5)
+    visible_cards = shown
 
 # Update radar display and targets
-def update_display():
-    targets = generate_random_targets()
-    canvas.delete("target")  # Clear previous targets
-    draw_targets(targets)
-    update_target_list(targets)
-    if running:
-        app.after(1000, update_display)
+def update_display(targets):
+    now = time.monotonic()
+    shown = []
+    for target in targets:
+        slot = slots[target["slot"] % len(slots)]
+        slot.update(target, now)
+        shown.append(slot)
+    update_target_list(sorted(shown, key=lambda slot: slot.idx))
+
+# Animation tick: show the newest frame, then advance every fade
+def animate(frames):
+    if frames and running:
+        update_display(frames[-1][1])
+    now = time.monotonic()
+    for slot in slots:
+        slot.fade(now)
 
 # Start/Stop functionality
 running = True
@@ -130,8 +204,6 @@ running = True
 def toggle_simulation():
     global running
     running = not running
-    if running:
-        update_display()
 
 # Add control buttons
 start_button = tk.Button(sidebar, text="Start/Stop", command=toggle_simulation, bg="lightgray")
@@ -140,8 +212,20 @@ start_button.pack(pady=10, fill="x")
 quit_button = tk.Button(sidebar, text="Quit", command=app.quit, bg="lightgray")
 quit_button.pack(pady=10, fill="x")
 
+# Target source: the radar, or random targets for UI work without hardware
+frames = LatestState()
+if args.mock:
+    def generate_mock():
+        if running:
+            frames.publish((time.monotonic(), generate_random_targets()))
+        app.after(MOCK_INTERVAL_MS, generate_mock)
+    generate_mock()
+else:
+    serial_connection = serial.Serial(RADAR_PORT, RADAR_BAUDRATE, timeout=1)
+    FrameIngest(serial_connection, frames, decode=decode_targets).start()
+
 # Initialize display
-update_display()
+render_loop = RenderLoop(app, frames, animate, ANIMATION_FPS).start()
 app.mainloop()
 
 # import tkinter as tk
@@ -0,0 +1,387 @@
+import argparse
+import errno
+import json
+import math
+import os
+import random
+import select
+import struct
+import threading
+import time
+import tty
+
+import numpy as np
+
+from capture import CaptureReader
+from frame_scanner import COMMAND_HEADER, COMMAND_MAX_PAYLOAD, COMMAND_TAIL, FRAME_HEADER, FRAME_TAIL
+
+RADAR_BAUDRATE = 256000
+FRAME_INTERVAL = 0.1  # Seconds between report frames
+DISTANCE_RESOLUTION = 360  # mm, reported in the gate field of every target
+MAX_TARGETS = 3
+
+TARGET_STRUCT = struct.Struct('<HHHH')
+EMPTY_TARGET = bytes(TARGET_STRUCT.size)
+
+# Command emulation (see command_channel.py for the client side)
+PROTOCOL_VERSION = 0x0001
+COMMAND_BUFFER_SIZE = 0x0040
+FIRMWARE_VERSION = (0x0000, 0x0102, 0x24061516)  # type, major, minor -> V1.02.24061516
+SINGLE_TARGET, MULTI_TARGET = 1, 2
+
+# Scripted scenarios: each target follows waypoints [t, x_mm, y_mm] and is
+# only reported between its first and last waypoint. Scenarios loop every
+# "duration" seconds.
+SCENARIOS = {
+    "idle": {"duration": 10.0, "targets": []},
+    "walk": {
+        "duration": 12.0,
+        "targets": [
+            {"waypoints": [[0, -2500, 3000], [6, 2500, 3000], [12, -2500, 3000]]},
+        ],
+    },
+    "approach": {
+        "duration": 10.0,
+        "targets": [
+            {"waypoints": [[0, 300, 7000], [8, 0, 800], [10, 0, 800]]},
+        ],
+    },
+    "crossing": {
+        "duration": 20.0,
+        "targets": [
+            {"waypoints": [[0, -3000, 2000], [10, 3000, 4000], [20, -3000, 2000]]},
+            {"waypoints": [[2, 2000, 6000], [12, -1500, 1500], [18, -1500, 1500]]},
+            {"waypoints": [[5, 0, 5000], [9, 500, 4500], [15, -500, 5500], [19, 0, 5000]]},
+        ],
+    },
+}
+
+
+def encode_value(value):
+    """
+    Encode a signed value as an RD-03D sign-magnitude word.
+    """
+    value = max(-0x7FFF, min(0x7FFF, int(round(value))))
+    return 0x8000 | value if value >= 0 else -value
+
+
+def encode_frame(targets):
+    """
+    Build a report frame from up to three (x_mm, y_mm, speed_cms, gate)
+    tuples. Missing slots are sent as zeros, as the sensor does.
+    """
+    slots = []
+    for x, y, speed, gate in targets[:MAX_TARGETS]:
+        slots.append(TARGET_STRUCT.pack(encode_value(x), encode_value(y), encode_value(speed), gate))
+    slots += [EMPTY_TARGET] * (MAX_TARGETS - len(slots))
+    return FRAME_HEADER + b''.join(slots) + FRAME_TAIL
+
+
+def encode_ack(command, status=0, data=b''):
+    """
+    Build the ACK frame the module sends for a command word.
+    """
+    payload = struct.pack('<HH', command | 0x0100, status) + data
+    return COMMAND_HEADER + struct.pack('<H', len(payload)) + payload + COMMAND_TAIL
+
+
+def load_scenario(name_or_path):
+    if name_or_path in SCENARIOS:
+        return SCENARIOS[name_or_path]
+    with open(name_or_path) as f:
+        return json.load(f)
+
+
+def _position(waypoints, t):
+    return np.interp(t, waypoints[:, 0], waypoints[:, 1]), np.interp(t, waypoints[:, 0], waypoints[:, 2])
+
+
+def scenario_targets(scenario, t, dt=FRAME_INTERVAL):
+    """
+    Targets visible at scenario time t as (x_mm, y_mm, speed_cms, gate).
+    Speed is the radial velocity, negative while approaching the sensor.
+    """
+    t = t % scenario["duration"]
+    targets = []
+    for target in scenario["targets"]:
+        waypoints = np.asarray(target["waypoints"], dtype=float)
+        if not waypoints[0, 0] <= t <= waypoints[-1, 0]:
+            continue
+        x, y = _position(waypoints, t)
+        x0, y0 = _position(waypoints, max(waypoints[0, 0], t - dt))
+        elapsed = t - max(waypoints[0, 0], t - dt)
+        speed = (math.hypot(x, y) - math.hypot(x0, y0)) / elapsed / 10 if elapsed else 0.0
+        targets.append((x, y, speed, DISTANCE_RESOLUTION))
+    return targets
+
+
+def generate_frames(scenario, count=None, interval=FRAME_INTERVAL):
+    """
+    Yield the byte-exact frames a sensor would send for a scenario, without
+    any pacing. Deterministic for a given scenario.
+    """
+    k = 0
+    while count is None or k < count:
+        yield encode_frame(scenario_targets(scenario, k * interval, interval))
+        k += 1
+
+
+class FaultInjector:
+    """
+    Corrupt a frame stream the way a noisy UART link does: random bytes
+    inserted between frames, single bytes lost, and frames delivered in
+    several small writes.
+    """
+
+    def __init__(self, noise=0.0, drop=0.0, split=0, seed=None):
+        self.noise = noise
+        self.drop = drop
+        self.split = split
+        self.random = random.Random(seed)
+
+    def apply(self, frame):
+        """
+        Return the list of writes to emit for one frame.
+        """
+        rng = self.random
+        data = bytearray(frame)
+        if self.drop and rng.random() < self.drop:
+            del data[rng.randrange(len(data))]
+        if self.noise and rng.random() < self.noise:
+            data[:0] = bytes(rng.randrange(256) for _ in range(rng.randint(1, 8)))
+        if not self.split:
+            return [bytes(data)]
+        pieces = []
+        while data:
+            n = rng.randint(1, self.split)
+            pieces.append(bytes(data[:n]))
+            del data[:n]
+        return pieces
+
+
+class VirtualRadar:
+    """
+    Emulated RD-03D behind a pseudo-terminal.
+
+    Clients open `port` like the real UART. Frames are written at the frame
+    cadence and paced to the byte rate of the configured baud rate (8N1).
+    If nobody drains the port, excess bytes are discarded like on a real
+    serial line. Passing an iterable of frames instead of a scenario sends
+    exactly those frames at the same cadence.
+
+    Command frames written by the client are answered with ACKs between
+    report frames: configuration mode, single/multi-target tracking (single
+    mode reports only the first slot), tracking mode and firmware queries,
+    and restart.
+    """
+
+    def __init__(self, scenario="walk", baudrate=RADAR_BAUDRATE, interval=FRAME_INTERVAL,
+                 faults=None, replay=None, replay_speed=1.0, link=None):
+        if isinstance(scenario, str):
+            scenario = load_scenario(scenario)
+        self.scenario = scenario
+        self.baudrate = baudrate
+        self.interval = interval
+        self.faults = faults or FaultInjector()
+        self.replay = replay
+        self.replay_speed = replay_speed
+        self.link = link
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        if link:
+            if os.path.islink(link):
+                os.unlink(link)
+            os.symlink(self.port, link)
+            self.port = link
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._command_thread = None
+        # Held for a whole report frame so ACKs never land inside one
+        self._write_lock = threading.Lock()
+        self.config_mode = False
+        self.tracking_mode = MULTI_TARGET
+        self.commands_received = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.bytes_discarded = 0
+        # Optional callback(seq, monotonic_ns) run once a frame's last byte is written
+        self.on_frame = None
+
+    def _write(self, data):
+        try:
+            n = os.write(self._master, data)
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EIO):
+                raise
+            n = 0
+        self.bytes_sent += n
+        self.bytes_discarded += len(data) - n
+
+    def _emit(self, pieces, deadline):
+        """
+        Write the pieces of one frame at the line rate, starting at deadline.
+        """
+        byte_time = 10 / self.baudrate
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        with self._write_lock:
+            for piece in pieces:
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self._write(piece)
+                deadline = max(deadline, time.monotonic()) + len(piece) * byte_time
+
+    def _run_scenario(self):
+        frames = self.scenario
+        if isinstance(frames, dict):
+            frames = generate_frames(frames, interval=self.interval)
+        next_frame = time.monotonic()
+        for seq, frame in enumerate(frames):
+            if self._stop.is_set():
+                return
+            if self.tracking_mode == SINGLE_TARGET:
+                frame = frame[:4 + TARGET_STRUCT.size] + EMPTY_TARGET * (MAX_TARGETS - 1) + frame[-2:]
+            self._emit(self.faults.apply(frame), next_frame)
+            self.frames_sent += 1
+            if self.on_frame:
+                self.on_frame(seq, time.monotonic_ns())
+            next_frame += self.interval
+
+    def _run_replay(self):
+        with CaptureReader(self.replay) as reader:
+            while not self._stop.is_set():
+                for _, data in reader.replay(self.replay_speed):
+                    if self._stop.is_set():
+                        return
+                    self._write(bytes(data))
+
+    def _handle_command(self, command, value):
+        self.commands_received += 1
+        if command == 0x00FF:  # Enable configuration
+            self.config_mode = True
+            return encode_ack(command, 0, struct.pack('<HH', PROTOCOL_VERSION, COMMAND_BUFFER_SIZE))
+        if not self.config_mode:
+            return encode_ack(command, 1)
+        if command == 0x00FE:  # End configuration
+            self.config_mode = False
+            return encode_ack(command)
+        if command in (0x0080, 0x0090):  # Single / multi-target tracking
+            self.tracking_mode = SINGLE_TARGET if command == 0x0080 else MULTI_TARGET
+            return encode_ack(command)
+        if command == 0x0091:  # Query tracking mode
+            return encode_ack(command, 0, struct.pack('<H', self.tracking_mode))
+        if command == 0x00A0:  # Read firmware version
+            return encode_ack(command, 0, struct.pack('<HHI', *FIRMWARE_VERSION))
+        if command == 0x00A3:  # Restart
+            self.config_mode = False
+            self.tracking_mode = MULTI_TARGET
+            return encode_ack(command)
+        return encode_ack(command, 1)
+
+    def _serve_commands(self):
+        """
+        Read command frames from the client and answer each with its ACK.
+        """
+        buf = bytearray()
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._master], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                buf += os.read(self._master, 4096)
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EIO):
+                    raise
+                continue
+            while True:
+                start = buf.find(COMMAND_HEADER)
+                if start < 0:
+                    del buf[:max(0, len(buf) - len(COMMAND_HEADER) + 1)]
+                    break
+                del buf[:start]
+                if len(buf) < len(COMMAND_HEADER) + 2:
+                    break
+                length = int.from_bytes(buf[4:6], 'little')
+                size = len(COMMAND_HEADER) + 2 + length + len(COMMAND_TAIL)
+                if length < 2 or length > COMMAND_MAX_PAYLOAD:
+                    del buf[:1]
+                    continue
+                if len(buf) < size:
+                    break
+                if buf[size - len(COMMAND_TAIL):size] == COMMAND_TAIL:
+                    command = int.from_bytes(buf[6:8], 'little')
+                    ack = self._handle_command(command, bytes(buf[8:size - len(COMMAND_TAIL)]))
+                    with self._write_lock:
+                        self._write(ack)
+                    del buf[:size]
+                else:
+                    del buf[:1]
+
+    def run(self):
+        self._command_thread = threading.Thread(target=self._serve_commands, daemon=True)
+        self._command_thread.start()
+        if self.replay:
+            self._run_replay()
+        else:
+            self._run_scenario()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self._command_thread:
+            self._command_thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate an RD-03D on a pseudo-terminal.")
+    parser.add_argument("--scenario", default="walk",
+                        help=f"built-in scenario ({', '.join(SCENARIOS)}) or path to a JSON scenario")
+    parser.add_argument("--replay", metavar="CAPTURE", help="stream a capture file instead of a scenario")
+    parser.add_argument("--speed", type=float, default=1.0, help="capture replay speed")
+    parser.add_argument("--baudrate", type=int, default=RADAR_BAUDRATE)
+    parser.add_argument("--interval", type=float, default=FRAME_INTERVAL, help="seconds between frames")
+    parser.add_argument("--noise", type=float, default=0.0, help="probability of garbage before a frame")
+    parser.add_argument("--drop", type=float, default=0.0, help="probability of losing a byte of a frame")
+    parser.add_argument("--split", type=int, default=0, help="split frames into writes of up to N bytes")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible fault injection")
+    parser.add_argument("--link", help="also expose the port under this path, e.g. /tmp/ttyRADAR")
+    args = parser.parse_args()
+
+    faults = FaultInjector(args.noise, args.drop, args.split, args.seed)
+    radar = VirtualRadar(args.scenario, args.baudrate, args.interval, faults,
+                         args.replay, args.speed, args.link)
+    print(f"Virtual RD-03D on {radar.port} at {args.baudrate} baud")
+    print(f"Run a client with RADAR_PORT={radar.port}. Press Ctrl+C to stop.")
+    try:
+        radar.run()
+    except KeyboardInterrupt:
+        print(f"\nSent {radar.frames_sent} frames ({radar.bytes_sent} bytes, "
+              f"{radar.bytes_discarded} discarded)")
+    finally:
+        radar.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from detection_store import (DETECTION, TRACK, SegmentedReader, SegmentedWriter, detection_rows, list_segments,
+                             select_rows, track_rows)
+from heatmap import WINDOWS
+
+HISTORY_PORT = 8001  # Plain HTTP, next to the websocket server
+
+DEFAULT_WINDOW = 3600  # Seconds of history when a query gives no start
+PAGE_ROWS = 10000  # Rows per page when no limit is given
+MAX_PAGE_ROWS = 100000
+MAX_POINTS = 100000  # Largest decimation budget
+LTTB_OVERSAMPLE = 8  # Grid pre-thinning keeps this many times the budget before LTTB
+READ_BATCH_ROWS = 1 << 16  # Rows decoded per trip to the worker thread
+
+# Overview store next to the full one: one row per series per
+# OVERVIEW_SECONDS, in hour-long chunks. Decimated queries coarser than that
+# read it instead of every raw row.
+OVERVIEW_SECONDS = 1
+OVERVIEW_CHUNK_SECONDS = 3600
+OVERVIEW_NS = OVERVIEW_SECONDS * 1_000_000_000
+
+# Retention: rows older than this are dropped from both stores, checked once
+# per RETENTION_CHECK_SECONDS of recorded time
+RETENTION_CHECK_SECONDS = 3600
+
+KIND_PATHS = {"/history/detections": DETECTION, "/history/tracks": TRACK}
+DECIMATION = ("lttb", "grid")
+
+# Row layout of every history response; microseconds keep timestamps exact
+# in JavaScript numbers
+COLUMNS = ["t_us", "sensor", "ident", "x_mm", "y_mm", "speed_cms"]
+
+
+def overview_path(path):
+    return path + '.overview'
+
+
+class HistoryRecorder:
+    """
+    Persists what the hub publishes: every detection, plus the confirmed
+    tracks the hub's tracker produced, to the full store and a thinned copy
+    to the overview store. Both are split into day segments; with
+    retention_days, segments older than that are deleted as time goes on.
+    """
+
+    def __init__(self, path, retention_days=None):
+        self.path = path
+        self.writer = SegmentedWriter(path)
+        self.overview = SegmentedWriter(overview_path(path), chunk_seconds=OVERVIEW_CHUNK_SECONDS)
+        self._last_bucket = {}  # (sensor, kind, ident) -> overview bucket of its last kept row
+        self.retention_ns = int(retention_days * 86400e9) if retention_days else None
+        self._next_prune = None
+
+    def record(self, sensor, t_ns, targets, tracks=None):
+        """
+        Store one frame and its confirmed tracks (TRACK_DTYPE); t_ns is wall
+        clock.
+        """
+        self.append(detection_rows(t_ns, sensor, targets))
+        if tracks is not None:
+            self.append(track_rows(t_ns, sensor, tracks))
+
+    def append(self, rows):
+        if not len(rows):
+            return
+        self.writer.append(rows)
+        bucket = int(rows["t_ns"][0]) // OVERVIEW_NS
+        keep = []
+        for i, key in enumerate(zip(rows["sensor"].tolist(), rows["kind"].tolist(), rows["ident"].tolist())):
+            if self._last_bucket.get(key) != bucket:
+                self._last_bucket[key] = bucket
+                keep.append(i)
+        if len(self._last_bucket) > 4096:
+            # Forget series that have gone quiet (lost tracks)
+            self._last_bucket = {key: last for key, last in self._last_bucket.items() if last >= bucket - 1}
+        if keep:
+            self.overview.append(rows[keep])
+        if self.retention_ns:
+            t_ns = int(rows["t_ns"][0])
+            if self._next_prune is None or t_ns >= self._next_prune:
+                self._next_prune = t_ns + RETENTION_CHECK_SECONDS * 1_000_000_000
+                self.prune(t_ns - self.retention_ns)
+
+    def prune(self, before_ns):
+        dropped = self.writer.drop_before(before_ns) + self.overview.drop_before(before_ns)
+        if dropped:
+            print(f"History: deleted {dropped} segments older than {time.ctime(before_ns / 1e9)}")
+
+    def close(self):
+        self.writer.close()
+        self.overview.close()
+
+
+def rows_to_json(rows):
+    """
+    Rows as comma-separated JSON arrays in COLUMNS order (no brackets).
+    """
+    table = np.column_stack((rows["t_ns"] // 1000, rows["sensor"], rows["ident"],
+                             rows["x_mm"], rows["y_mm"], rows["speed_cms"]))
+    return json.dumps(table.tolist(), separators=(',', ':'))[1:-1]
+
+
+def grid_thin(rows, start_ns, end_ns, buckets):
+    """
+    Keep the first row of every series (sensor and ident) in each of
+    `buckets` equal time buckets across [start_ns, end_ns].
+    """
+    span = max(end_ns - start_ns, 1)
+    bucket = np.floor((rows["t_ns"] - start_ns) / span * buckets).astype(np.int64)
+    keys = (bucket << 40) | (rows["sensor"].astype(np.int64) << 32) | rows["ident"].astype(np.int64)
+    _, first = np.unique(keys, return_index=True)
+    return rows[np.sort(first)]
+
+
+def lttb(x, y, target):
+    """
+    Largest-Triangle-Three-Buckets over a path: indices of `target` points
+    that keep its visual shape. Each bucket contributes the point forming
+    the largest triangle with the previous pick and the next bucket's mean.
+    """
+    n = len(x)
+    if target >= n:
+        return np.arange(n)
+    if target < 3:
+        return np.array([0, n - 1][:max(target, 1)])
+    edges = (np.arange(target - 1) * (n - 2) / (target - 2)).astype(np.int64) + 1
+    picked = np.empty(target, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(target - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        mean_x, mean_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - mean_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def lttb_thin(rows, points):
+    """
+    LTTB per series, splitting the point budget by series length.
+    """
+    keys = (rows["sensor"].astype(np.int64) << 32) | rows["ident"].astype(np.int64)
+    order = np.argsort(keys, kind='stable')
+    bounds = np.flatnonzero(np.diff(keys[order])) + 1
+    keep = []
+    for series in np.split(order, bounds):
+        budget = max(1, round(points * len(series) / len(rows)))
+        x = rows["x_mm"][series].astype(np.float64)
+        y = rows["y_mm"][series].astype(np.float64)
+        keep.append(series[lttb(x, y, budget)])
+    return rows[np.sort(np.concatenate(keep))] if keep else rows
+
+
+def decimate(rows, start_ns, end_ns, points, method):
+    if len(rows) <= points:
+        return rows
+    if method == "lttb":
+        return lttb_thin(rows, points)
+    # Coarsen the grid until the budget holds
+    buckets = points
+    rows = grid_thin(rows, start_ns, end_ns, buckets)
+    while len(rows) > points and buckets > 1:
+        buckets = max(1, buckets * points // len(rows))
+        rows = grid_thin(rows, start_ns, end_ns, buckets)
+    return rows
+
+
+def read_batch(chunks):
+    """
+    Decode chunks until about READ_BATCH_ROWS rows are ready; returns a list
+    of (position, rows), or None at the end of the query.
+    """
+    batch = []
+    count = 0
+    for position, rows in chunks:
+        batch.append((position, rows))
+        count += len(rows)
+        if count >= READ_BATCH_ROWS:
+            break
+    return batch or None
+
+
+def parse_cursor(cursor):
+    """
+    A cursor is "<segment>:<chunk>:<matching rows of that chunk already
+    sent>", a position in the store rather than a time, so paging stays
+    exact even where rows from several sensors are out of time order.
+    """
+    segment, chunk, sent = (int(part) for part in cursor.split(":"))
+    return (segment, chunk), sent
+
+
+class HistoryServer:
+    """
+    HTTP API over the detection store, served with asyncio streams.
+
+    GET /history                     store summary
+    GET /history/detections?...      detections
+    GET /history/tracks?...          tracks
+    GET /heatmap?...                 live occupancy heatmap (heatmap.py)
+
+    Query parameters: sensor, start and end (Unix seconds; the last hour by
+    default), then either limit and cursor for paging through raw rows, or
+    points (and decimate=lttb|grid) for a decimated series of about that
+    many points. Chunks are found through the store's time index and read
+    off the event loop; the body is streamed with chunked encoding as they
+    decode, so a response never has to fit in memory. Decimated queries
+    spanning more than OVERVIEW_SECONDS per point read the overview store.
+
+    The heatmap takes sensor (default 0), window (one of heatmap.WINDOWS)
+    and format=json|binary; binary is the raw little-endian uint32 counts,
+    row-major, with the shape in the X-Heatmap-Shape header.
+    """
+
+    def __init__(self, path, recorder=None, heatmaps=None):
+        self.path = path  # None when no history is kept
+        self.recorder = recorder
+        self.heatmaps = heatmaps
+        self.requests = 0
+
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            method, target, _ = head.split(b'\r\n', 1)[0].decode('latin-1').split(' ', 2)
+            self.requests += 1
+            if method != 'GET':
+                await self.respond(writer, 405, {"error": "only GET is supported"})
+                return
+            url = urlsplit(target)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path == "/heatmap" and self.heatmaps:
+                await self.heatmap(writer, params)
+            elif url.path.startswith("/history") and not self.path:
+                await self.respond(writer, 404, {"error": "history is disabled"})
+            elif url.path == "/history":
+                await self.respond(writer, 200, self.summary())
+            elif url.path in KIND_PATHS:
+                try:
+                    query = self.parse_query(params)
+                except ValueError as e:
+                    await self.respond(writer, 400, {"error": str(e)})
+                    return
+                await self.stream(writer, KIND_PATHS[url.path], *query)
+            else:
+                await self.respond(writer, 404, {"error": f"no such endpoint {url.path}"})
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def parse_query(self, params):
+        end = float(params.get("end", time.time()))
+        start = float(params.get("start", end - DEFAULT_WINDOW))
+        if start > end:
+            raise ValueError("start is after end")
+        sensor = int(params["sensor"]) if "sensor" in params else None
+        limit = min(int(params.get("limit", PAGE_ROWS)), MAX_PAGE_ROWS)
+        cursor = parse_cursor(params["cursor"]) if "cursor" in params else None
+        points = min(int(params["points"]), MAX_POINTS) if "points" in params else None
+        method = params.get("decimate", DECIMATION[0])
+        if method not in DECIMATION:
+            raise ValueError(f"decimate must be one of {', '.join(DECIMATION)}")
+        if limit < 1 or (points is not None and points < 1):
+            raise ValueError("limit and points must be positive")
+        return int(start * 1e9), int(end * 1e9), sensor, limit, cursor, points, method
+
+    def summary(self):
+        with SegmentedReader(self.path) as reader:
+            span = reader.time_range
+            rows = len(reader)
+            chunks = reader.chunk_count
+        pending = len(self.recorder.writer.pending()) if self.recorder else 0
+        return {
+            "rows": rows + pending,
+            "chunks": chunks,
+            "start_us": span[0] // 1000 if span else None,
+            "end_us": span[1] // 1000 if span else None,
+            "requests": self.requests,
+        }
+
+    async def rows(self, start_ns, end_ns, sensor, kind, overview=False, after=None):
+        """
+        Yield (position, rows) for each matching chunk: sealed chunks decoded
+        in a worker thread, then the rows the recorder has not written yet,
+        under the position their chunk will have once sealed.
+        """
+        path = overview_path(self.path) if overview else self.path
+        writer = None
+        if self.recorder:
+            writer = self.recorder.overview if overview else self.recorder.writer
+        # Snapshot the index and the open chunk together, so a chunk sealed
+        # while the query runs is seen exactly once
+        reader = SegmentedReader(path)
+        pending = pending_position = None
+        if writer and writer.segment is not None:
+            pending = writer.pending()
+            pending_position = reader.next_position(writer.segment)
+        loop = asyncio.get_running_loop()
+        try:
+            chunks = reader.positioned(start_ns, end_ns, sensor, kind, after)
+            while True:
+                batch = await loop.run_in_executor(None, read_batch, chunks)
+                if batch is None:
+                    break
+                for position, rows in batch:
+                    yield position, rows
+        finally:
+            reader.close()
+        if pending is not None and (after is None or pending_position >= after):
+            rows = select_rows(pending, start_ns, end_ns, sensor, kind)
+            if len(rows):
+                yield pending_position, rows
+
+    async def stream(self, writer, kind, start_ns, end_ns, sensor, limit, cursor, points, method):
+        await self.start_chunked(writer)
+        await self.write_chunk(writer, f'{{"columns":{json.dumps(COLUMNS)},"rows":['.encode())
+        first = True
+        next_cursor = None
+
+        async def emit(rows):
+            nonlocal first
+            if len(rows):
+                await self.write_chunk(writer, (b'' if first else b',') + rows_to_json(rows).encode())
+                first = False
+
+        if points:
+            collected = []
+            overview = (end_ns - start_ns) / points >= OVERVIEW_NS and list_segments(overview_path(self.path))
+            async for _, rows in self.rows(start_ns, end_ns, sensor, kind, overview):
+                # Bound memory on long ranges: grid-thin each chunk first
+                rows = grid_thin(rows, start_ns, end_ns, points * LTTB_OVERSAMPLE)
+                collected.append(rows)
+            if collected:
+                await emit(decimate(np.concatenate(collected), start_ns, end_ns, points, method))
+        else:
+            after, skip = cursor or (None, 0)
+            sent = 0
+            async for position, rows in self.rows(start_ns, end_ns, sensor, kind, after=after):
+                # Rows of the cursor's chunk that the previous page already sent
+                done = skip if position == after else 0
+                rows = rows[done:]
+                if sent + len(rows) >= limit:
+                    rows = rows[:limit - sent]
+                    segment, chunk = position
+                    next_cursor = f"{segment}:{chunk}:{done + len(rows)}"
+                await emit(rows)
+                sent += len(rows)
+                if next_cursor:
+                    break
+        await self.write_chunk(writer, f'],"next":{json.dumps(next_cursor)}}}'.encode())
+        await self.write_chunk(writer, b'')
+
+    async def heatmap(self, writer, params):
+        sensor = params.get("sensor", "0")
+        window = params.get("window", next(iter(WINDOWS)))
+        fmt = params.get("format", "json")
+        if not sensor.isdigit() or int(sensor) not in self.heatmaps:
+            await self.respond(writer, 404, {"error": f"no frames from sensor {sensor}"})
+            return
+        if window not in WINDOWS or fmt not in ("json", "binary"):
+            await self.respond(writer, 400, {"error": f"window must be one of {', '.join(WINDOWS)}, "
+                                                      f"format json or binary"})
+            return
+        heatmap = self.heatmaps[int(sensor)]
+        # The hub feeds heatmaps on the monotonic clock
+        counts = heatmap.counts(window, time.monotonic())
+        if fmt == "binary":
+            await self.respond(writer, 200, counts.astype('<u4').tobytes(), 'application/octet-stream',
+                               {"X-Heatmap-Shape": ",".join(map(str, counts.shape)), "X-Heatmap-Window": window})
+        else:
+            await self.respond(writer, 200, dict(heatmap.describe(window), counts=counts.tolist()))
+
+    async def start_chunked(self, writer):
+        writer.write(b'HTTP/1.1 200 OK\r\n'
+                     b'Content-Type: application/json\r\n'
+                     b'Transfer-Encoding: chunked\r\n'
+                     b'Access-Control-Allow-Origin: *\r\n'
+                     b'Connection: close\r\n\r\n')
+        await writer.drain()
+
+    async def write_chunk(self, writer, data):
+        writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+        await writer.drain()
+
+    async def respond(self, writer, status, body, content_type='application/json', headers=None):
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}[status]
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        extra = ''.join(f'{name}: {value}\r\n' for name, value in (headers or {}).items())
+        writer.write(f'HTTP/1.1 {status} {reason}\r\n'
+                     f'Content-Type: {content_type}\r\n'
+                     f'Content-Length: {len(data)}\r\n'
+                     f'{extra}'
+                     f'Access-Control-Allow-Origin: *\r\n'
+                     f'Connection: close\r\n\r\n'.encode() + data)
+        await writer.drain()
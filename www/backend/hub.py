@@ -0,0 +1,343 @@
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+import serial
+
+from async_serial import AsyncSerialReader
+from frame_decoder import to_sign_magnitude
+from tracker import Tracker
+from wire import WireEvent, WireFrame
+
+# What a subscriber queue does when a client falls behind
+DROP_OLDEST = "drop-oldest"      # keep the freshest frames
+DROP_NEWEST = "drop-newest"      # keep what is queued, discard new frames
+DISCONNECT = "disconnect"        # close the slow client
+QUEUE_POLICIES = (DROP_OLDEST, DROP_NEWEST, DISCONNECT)
+
+# Subscription channels: every decoded frame, or only derived events
+FRAMES = "frames"
+EVENTS = "events"
+CHANNELS = (FRAMES, EVENTS)
+
+# Delivery controls (see DeliveryFilter) are opt-in per subscription; these
+# are the values a control takes when a client sets some but not all of
+# them. About 75 mm and 10 cm/s hide the position jitter of a still person.
+MAX_RATE = 0  # Frames per second per sensor, 0 for no cap
+DEADBAND_MM = 0  # Position change that counts as movement, 0 to not compare positions
+DEADBAND_CMS = 0  # Speed change that counts as movement, 0 to not compare speeds
+KEYFRAME_SECONDS = 2.0  # Longest gap between frames sent for a sensor, 0 to disable
+
+RECONNECT_DELAY = 2.0  # Seconds between attempts to reopen the serial port
+
+
+class SubscriptionClosed(Exception):
+    pass
+
+
+class DeliveryFilter:
+    """
+    Decides which frames one client actually needs.
+
+    Each sensor's frame is compared with the last frame sent to this client
+    for that sensor: it goes out when a target appeared or left, or when a
+    target moved more than deadband_mm or changed speed by more than
+    deadband_cms, and is suppressed otherwise; with both dead-bands 0 every
+    frame counts as changed and only max_rate applies. Comparing with what
+    was sent, not with the previous frame, means slow drift still gets
+    through once it adds up. Movement is sent as soon as it is seen; max_rate only caps how
+    often. A changed frame that arrives too soon is held, replacing any
+    older held frame, and released by the subscription when the interval
+    ends, so the last position of a target that stops is never lost. A
+    keyframe goes out after keyframe_s without any frame, so a client that
+    lost frames resyncs and still sees that the sensor is alive.
+    """
+
+    def __init__(self, max_rate=MAX_RATE, deadband_mm=DEADBAND_MM, deadband_cms=DEADBAND_CMS,
+                 keyframe_s=KEYFRAME_SECONDS):
+        if min(max_rate, deadband_mm, deadband_cms, keyframe_s) < 0:
+            raise ValueError("delivery controls must not be negative")
+        self.min_interval_us = int(1e6 / max_rate) if max_rate else 0
+        self.deadband_mm = deadband_mm
+        self.deadband_cms = deadband_cms
+        self.keyframe_us = int(keyframe_s * 1e6)
+        self.sent = {}  # sensor -> (t_us, targets) last sent
+        self.held = {}  # sensor -> frame waiting for the rate interval to end
+        self.keyframes = 0
+
+    def changed(self, last, targets):
+        if len(last) != len(targets) or np.any(last["slot"] != targets["slot"]):
+            return True
+        if not (self.deadband_mm or self.deadband_cms):
+            return True
+        # Widened first: int16 differences can overflow
+        if self.deadband_mm:
+            moved = np.hypot(targets["x_mm"].astype(np.int32) - last["x_mm"],
+                             targets["y_mm"].astype(np.int32) - last["y_mm"])
+            if np.any(moved > self.deadband_mm):
+                return True
+        if self.deadband_cms:
+            speed = np.abs(targets["speed_cms"].astype(np.int32) - last["speed_cms"])
+            if np.any(speed > self.deadband_cms):
+                return True
+        return False
+
+    def accept(self, frame):
+        """
+        True to send the frame now. A False frame may have been held; see
+        held and release().
+        """
+        last = self.sent.get(frame.sensor)
+        if last is not None:
+            elapsed = frame.t_us - last[0]
+            if elapsed < self.min_interval_us:
+                if self.changed(last[1], frame.targets):
+                    self.held[frame.sensor] = frame
+                else:
+                    self.held.pop(frame.sensor, None)  # Back where the client last saw it
+                return False
+            if self.keyframe_us and elapsed >= self.keyframe_us:
+                self.keyframes += 1
+            elif not self.changed(last[1], frame.targets):
+                self.held.pop(frame.sensor, None)
+                return False
+        self.held.pop(frame.sensor, None)
+        self.sent[frame.sensor] = (frame.t_us, frame.targets)
+        return True
+
+    def release_in(self, sensor):
+        """
+        Seconds until the frame held for sensor may be sent.
+        """
+        return max(0.0, (self.sent[sensor][0] + self.min_interval_us - self.held[sensor].t_us) / 1e6)
+
+    def release(self, sensor):
+        """
+        The held frame for sensor, now due, or None if newer frames made it
+        unnecessary. It counts as sent when its interval ended.
+        """
+        frame = self.held.pop(sensor, None)
+        if frame is not None:
+            self.sent[sensor] = (self.sent[sensor][0] + self.min_interval_us, frame.targets)
+        return frame
+
+
+class Subscription:
+    """
+    Bounded per-client queue. offer() never blocks, so a stalled client can
+    only lose its own frames, never delay ingestion or other clients. With a
+    DeliveryFilter, frames the client does not need never enter the queue.
+    """
+
+    def __init__(self, size, policy=DROP_OLDEST, on_overflow=None, delivery=None):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"unknown queue policy {policy!r}")
+        self.size = size
+        self.policy = policy
+        self.on_overflow = on_overflow
+        self.delivery = delivery
+        self.dropped = 0
+        self.delivered = 0
+        self.suppressed = 0
+        self.closed = False
+        self._queue = deque()
+        self._ready = asyncio.Event()
+        self._releases = {}  # sensor -> timer for a held frame
+
+    def offer(self, item):
+        if self.closed:
+            return
+        if self.delivery is not None and not self.delivery.accept(item):
+            self.suppressed += 1
+            if item.sensor in self.delivery.held and item.sensor not in self._releases:
+                self._releases[item.sensor] = asyncio.get_running_loop().call_later(
+                    self.delivery.release_in(item.sensor), self._release, item.sensor)
+            return
+        self._enqueue(item)
+
+    def _release(self, sensor):
+        del self._releases[sensor]
+        item = self.delivery.release(sensor)
+        if item is not None and not self.closed:
+            self.suppressed -= 1  # Counted when it was held
+            self._enqueue(item)
+
+    def _enqueue(self, item):
+        if len(self._queue) >= self.size:
+            if self.policy == DISCONNECT:
+                self.close()
+                if self.on_overflow:
+                    self.on_overflow()
+                return
+            self.dropped += 1
+            if self.policy == DROP_NEWEST:
+                return
+            self._queue.popleft()
+        self._queue.append(item)
+        self._ready.set()
+
+    async def get(self):
+        while not self._queue:
+            if self.closed:
+                raise SubscriptionClosed()
+            self._ready.clear()
+            await self._ready.wait()
+        self.delivered += 1
+        return self._queue.popleft()
+
+    def close(self):
+        self.closed = True
+        for timer in self._releases.values():
+            timer.cancel()
+        self._releases.clear()
+        self._ready.set()
+
+
+class SensorHub:
+    """
+    Owns the only reader of the radar port and fans decoded frames out to
+    any number of subscribers; subscribers of the events channel get only
+    the events derived from them.
+    """
+
+    def __init__(self, port, baudrate, queue_size=64, policy=DROP_OLDEST, recorder=None, heatmaps=None,
+                 events=None, sensors=1, calibrations=None):
+        self.port = port
+        self.baudrate = baudrate
+        self.queue_size = queue_size
+        self.policy = policy
+        self.subscribers = set()
+        self.event_subscribers = set()
+        self.channels = {FRAMES: self.subscribers, EVENTS: self.event_subscribers}
+        self.frames = 0
+        self.events_published = 0
+        self.reader = None
+        self.recorder = recorder  # history.HistoryRecorder, if history is kept
+        self.heatmaps = heatmaps  # heatmap.SensorHeatmaps, fed on the monotonic clock
+        self.events = events  # events.EventDeriver, if events are derived
+        # sensor -> calibration.Calibration for units with their own
+        # calibration file; the heatmaps bin calibrated positions, as hex-vis does
+        self.calibrations = calibrations or {}
+        # One tracker for everything that needs persistent track IDs
+        self.tracker = Tracker(sensors) if recorder or events else None
+        # Frames are stamped on the monotonic clock; clients get wall time
+        self._clock_offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def wall_us(self, t_ns):
+        return (t_ns + self._clock_offset_ns) // 1000
+
+    def subscribe(self, queue_size=None, policy=None, on_overflow=None, channel=FRAMES, delivery=None):
+        """
+        delivery is a DeliveryFilter for the frames channel, or None to send
+        every frame; events are always sent.
+        """
+        if channel not in self.channels:
+            raise ValueError(f"unknown channel {channel!r}")
+        if channel != FRAMES:
+            delivery = None
+        subscription = Subscription(queue_size or self.queue_size, policy or self.policy, on_overflow, delivery)
+        self.channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        for subscribers in self.channels.values():
+            subscribers.discard(subscription)
+
+    def publish(self, item):
+        self.frames += 1
+        for subscription in tuple(self.subscribers):
+            subscription.offer(item)
+
+    def publish_event(self, item):
+        self.events_published += 1
+        for subscription in tuple(self.event_subscribers):
+            subscription.offer(item)
+
+    def ingest(self, t_ns, targets, sensor=0):
+        """
+        Track, record and aggregate one decoded frame (as configured),
+        publish it, then publish the events it caused.
+        """
+        # One coordinate frame for everything downstream: with a calibration
+        # file the raw x/y fields are read through the unit's tables, as
+        # hex-vis does, so zones drawn over the heatmap match their events
+        calibration = self.calibrations.get(sensor)
+        if calibration is not None and len(targets):
+            x, y = calibration.to_cartesian(to_sign_magnitude(targets["x_mm"]), to_sign_magnitude(targets["y_mm"]))
+            targets = targets.copy()
+            targets["x_mm"] = np.clip(np.round(x * 1000), -32768, 32767)
+            targets["y_mm"] = np.clip(np.round(y * 1000), -32768, 32767)
+        tracks = None
+        if self.tracker is not None and sensor < len(self.tracker.last_t):
+            detections = np.column_stack((targets["x_mm"], targets["y_mm"]))
+            tracks = self.tracker.step(sensor, detections, t_ns / 1e9)
+        if self.recorder:
+            self.recorder.record(sensor, t_ns + self._clock_offset_ns, targets, tracks)
+        if self.heatmaps:
+            self.heatmaps.add(sensor, t_ns / 1e9, targets["x_mm"], targets["y_mm"])
+        t_us = self.wall_us(t_ns)
+        self.publish(WireFrame(self.frames, t_us, targets, sensor))
+        if self.events is not None and tracks is not None:
+            for event in self.events.update(sensor, t_ns / 1e9, tracks):
+                self.publish_event(WireEvent(self.events_published, t_us, event))
+
+    def stats(self):
+        subscribers = self.subscribers | self.event_subscribers
+        return {
+            "frames": self.frames,
+            "events": self.events_published,
+            "subscribers": len(self.subscribers),
+            "event_subscribers": len(self.event_subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+            "suppressed": sum(s.suppressed for s in self.subscribers),
+        }
+
+    async def run(self):
+        """
+        Read the port forever, reopening it if the device goes away.
+        """
+        while True:
+            try:
+                async with AsyncSerialReader(self.port, self.baudrate) as reader:
+                    self.reader = reader
+                    print(f"Reading radar on {self.port} at {self.baudrate} baud")
+                    async for frame in reader:
+                        self.ingest(frame.t_ns, frame.targets)
+            except (OSError, serial.SerialException) as e:
+                print(f"Radar read error: {e}")
+            finally:
+                self.reader = None
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def run_sharded(self, ingest):
+        """
+        Publish frames from a started ShardedIngest (sharded_ingest.py)
+        instead of reading a port here: the worker processes own the ports
+        and this loop only wakes up to read their shared-memory rings.
+        """
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wake(fd):
+            ingest.clear_wake(fd)
+            ready.set()
+
+        for fd in ingest.wake_fds:
+            loop.add_reader(fd, wake, fd)
+        print(f"Reading {len(ingest.ports)} radars in {ingest.shards} worker processes")
+        try:
+            while True:
+                await ready.wait()
+                ready.clear()
+                ingest.aggregator.drain(self._publish_records)
+        finally:
+            for fd in ingest.wake_fds:
+                loop.remove_reader(fd)
+
+    def _publish_records(self, records):
+        # Ring slots are reused once drained, so each frame keeps its own targets
+        for t_ns, sensor, count, targets in zip(records["t_ns"].tolist(), records["sensor"].tolist(),
+                                                records["count"].tolist(), records["targets"]):
+            self.ingest(t_ns, targets[:count].copy(), sensor)
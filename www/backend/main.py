@@ -1,47 +1,152 @@
-import serial
 import asyncio
-import json
-import time
+import os
+import sys
 import websockets
+from urllib.parse import parse_qs, urlparse
+
+# Shared serial and decoder modules live at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from calibration import Calibration, calibration_path
+from events import EventDeriver
+from heatmap import SensorHeatmaps
+from history import HISTORY_PORT, HistoryRecorder, HistoryServer
+from hub import (DEADBAND_CMS, DEADBAND_MM, DROP_OLDEST, FRAMES, KEYFRAME_SECONDS, MAX_RATE, DeliveryFilter,
+                 SensorHub, SubscriptionClosed)
+from sharded_ingest import ShardedIngest
+from wire import SUBPROTOCOLS, negotiate, select_subprotocol
+from zones import RADAR_ZONES, ZoneEngine
 
 # Configuration for the radar module
-RADAR_PORT = '/dev/ttyTHS1'
+RADAR_PORT = os.environ.get('RADAR_PORT', '/dev/ttyTHS1')
 RADAR_BAUDRATE = 256000
 
+# Set RADAR_SHARDS to read the comma-separated RADAR_PORTS in that many
+# worker processes (sharded_ingest.py) instead of RADAR_PORT in this one
+RADAR_SHARDS = int(os.environ.get('RADAR_SHARDS', 0))
+RADAR_PORTS = os.environ.get('RADAR_PORTS', RADAR_PORT)
+
+# Sensor serial numbers, comma-separated in port order; a unit with its own
+# calibration file (calibration.py) gets calibrated heatmap positions
+RADAR_SERIALS = os.environ.get('RADAR_SERIALS', os.environ.get('RADAR_SERIAL', ''))
+
 # WebSocket configuration
 WEBSOCKET_HOST = "localhost"
 WEBSOCKET_PORT = 8000
 
-def decode_packet(raw_data):
-    try:
-        if len(raw_data) < 10:
-            return {"Angle": None, "Distance (mm)": None, "Speed (mm/s)": None}
+# Detection and track history served over HTTP on HISTORY_PORT, along with
+# the live heatmaps. RADAR_HISTORY is the base path of the day segment files
+# (detection_store.SegmentedWriter); an empty string keeps no history.
+RADAR_HISTORY = os.environ.get('RADAR_HISTORY', 'radar-history.det')
+RADAR_HISTORY_DAYS = float(os.environ.get('RADAR_HISTORY_DAYS', 7))  # Days kept, 0 to keep everything
+
+# Per-client queue: frames buffered for a slow viewer, and what to do when it fills
+CLIENT_QUEUE_SIZE = 64
+CLIENT_QUEUE_POLICY = DROP_OLDEST
+
+# Per-client frame delivery controls (hub.DeliveryFilter), off unless a
+# client passes ?rate=HZ, ?deadband=MM, ?deadband_speed=CMS or ?keyframe=S,
+# or the matching environment variable sets a default for every client
+DELIVERY_CONTROLS = {
+    "rate": ('RADAR_MAX_RATE', MAX_RATE),
+    "deadband": ('RADAR_DEADBAND_MM', DEADBAND_MM),
+    "deadband_speed": ('RADAR_DEADBAND_CMS', DEADBAND_CMS),
+    "keyframe": ('RADAR_KEYFRAME_SECONDS', KEYFRAME_SECONDS),
+}
 
-        angle = int.from_bytes(raw_data[4:6], byteorder='little', signed=False)
-        distance = int.from_bytes(raw_data[6:8], byteorder='little', signed=False)
-        speed = int.from_bytes(raw_data[8:10], byteorder='little', signed=False)
+# Single reader shared by every connection, created in main()
+hub = None
 
-        return {"Angle": angle, "Distance (mm)": distance, "Speed (mm/s)": speed}
-    except Exception as e:
-        print(f"Error decoding packet: {e}")
-        return {"Angle": None, "Distance (mm)": None, "Speed (mm/s)": None}
+def delivery_filter(params):
+    """
+    DeliveryFilter for the controls a client asked for (or the environment
+    sets), or None to send every frame.
+    """
+    values = {}
+    for name, (variable, default) in DELIVERY_CONTROLS.items():
+        value = params.get(name, [os.environ.get(variable)])[0]
+        values[name] = default if value is None else float(value)
+    if not (values["rate"] or values["deadband"] or values["deadband_speed"]):
+        return None  # Nothing to hold back
+    return DeliveryFilter(values["rate"], values["deadband"], values["deadband_speed"], values["keyframe"])
 
 async def radar_data_listener(websocket):
+    """
+    Streams frames from the shared hub to one client. Query parameters
+    ?queue=N&policy=drop-oldest|drop-newest|disconnect override the
+    per-client queue defaults; ?format=binary|json (or the websocket
+    subprotocol) selects the payload format; ?channel=events streams only
+    derived events (track start/lost, zone enter/exit/dwell, approach and
+    depart, as JSON) instead of every frame. For frames,
+    ?rate=HZ&deadband=MM&deadband_speed=CMS&keyframe=S turn on delivery
+    controls (see delivery_filter()).
+    """
+    def disconnect_slow_client():
+        asyncio.ensure_future(websocket.close(1013, "client too slow"))
+
+    params = parse_qs(urlparse(websocket.request.path).query)
+    try:
+        queue_size = int(params.get("queue", [CLIENT_QUEUE_SIZE])[0])
+        policy = params.get("policy", [CLIENT_QUEUE_POLICY])[0]
+        subprotocol = negotiate(websocket, params)
+        channel = params.get("channel", [FRAMES])[0]
+        delivery = delivery_filter(params)
+        subscription = hub.subscribe(queue_size, policy, disconnect_slow_client, channel, delivery)
+    except ValueError as e:
+        await websocket.close(1008, str(e))
+        return
+
     try:
-        with serial.Serial(RADAR_PORT, RADAR_BAUDRATE, timeout=1) as ser:
-            while True:
-                if ser.in_waiting:
-                    raw_data = ser.read(ser.in_waiting)
-                    decoded_data = decode_packet(raw_data)
-                    await websocket.send(json.dumps(decoded_data))
-                await asyncio.sleep(0.1)
-    except Exception as e:
-        print(f"Error: {e}")
+        while True:
+            frame = await subscription.get()
+            await websocket.send(frame.encode(subprotocol))
+    except (SubscriptionClosed, websockets.ConnectionClosed):
+        pass
+    finally:
+        hub.unsubscribe(subscription)
+        print(f"Client disconnected ({subscription.delivered} {channel} sent, {subscription.dropped} dropped, "
+              f"{subscription.suppressed} suppressed)")
+
+def load_calibrations(serials):
+    """
+    sensor -> Calibration for the listed serials that have a calibration
+    file. Uncalibrated units keep the positions the sensor reports.
+    """
+    calibrations = {}
+    for sensor, serial in enumerate(serials.split(",")):
+        path = calibration_path(serial.strip())
+        if serial.strip() and os.path.exists(path):
+            calibrations[sensor] = Calibration.load(path)
+            print(f"Sensor {sensor}: calibration {path}")
+    return calibrations
 
 async def main():
-    async with websockets.serve(radar_data_listener, WEBSOCKET_HOST, WEBSOCKET_PORT):
-        print(f"WebSocket server running at ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
-        await asyncio.Future()  # Run forever
+    global hub
+    ports = RADAR_PORTS.split(",") if RADAR_SHARDS else [RADAR_PORT]
+    recorder = HistoryRecorder(RADAR_HISTORY, RADAR_HISTORY_DAYS) if RADAR_HISTORY else None
+    heatmaps = SensorHeatmaps()
+    zones = ZoneEngine(RADAR_ZONES).start()
+    hub = SensorHub(RADAR_PORT, RADAR_BAUDRATE, CLIENT_QUEUE_SIZE, CLIENT_QUEUE_POLICY, recorder, heatmaps,
+                    EventDeriver(zones), len(ports), load_calibrations(RADAR_SERIALS))
+    shards = None
+    if RADAR_SHARDS:
+        shards = ShardedIngest(ports, RADAR_SHARDS, RADAR_BAUDRATE).start()
+        ingest = asyncio.create_task(hub.run_sharded(shards))
+    else:
+        ingest = asyncio.create_task(hub.run())
+    try:
+        history = HistoryServer(RADAR_HISTORY or None, recorder, heatmaps)
+        await asyncio.start_server(history.handle, WEBSOCKET_HOST, HISTORY_PORT)
+        print(f"History and heatmap API running at http://{WEBSOCKET_HOST}:{HISTORY_PORT}")
+        async with websockets.serve(radar_data_listener, WEBSOCKET_HOST, WEBSOCKET_PORT,
+                                    subprotocols=SUBPROTOCOLS, select_subprotocol=select_subprotocol):
+            print(f"WebSocket server running at ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
+            await ingest  # Run forever
+    finally:
+        if shards:
+            shards.stop()
+        if recorder:
+            recorder.close()
+        zones.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
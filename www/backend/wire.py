@@ -0,0 +1,144 @@
+import json
+import struct
+import time
+
+# Websocket payload formats. Clients pick one with the Sec-WebSocket-Protocol
+# header or ?format=binary|json; plain clients get JSON.
+BINARY_SUBPROTOCOL = "rd03d.v2.binary"
+JSON_SUBPROTOCOL = "rd03d.v1.json"
+SUBPROTOCOLS = [BINARY_SUBPROTOCOL, JSON_SUBPROTOCOL]
+FORMATS = {"binary": BINARY_SUBPROTOCOL, "json": JSON_SUBPROTOCOL}
+
+# Binary frame: header followed by one fixed-width record per target, in
+# slot order, all little-endian. The sequence and timestamp are truncated;
+# clients unwrap the timestamp against their own clock (see decode_binary()),
+# which works while it is within half a wrap (about 35 minutes) of theirs.
+WIRE_VERSION = 2
+FRAME_HEADER = struct.Struct('<BBBHI')  # version, slot mask, sensor id, sequence mod 2^16, us since epoch mod 2^32
+TARGET_RECORD = struct.Struct('<hhhH')  # x_mm, y_mm, speed_cms, gate
+TIME_WRAP_US = 1 << 32
+
+
+class WireFrame:
+    """
+    One published frame. Each encoding is produced at most once and the same
+    bytes/str object is sent to every client that asked for it.
+    """
+
+    __slots__ = ("seq", "t_us", "sensor", "targets", "_binary", "_json")
+
+    def __init__(self, seq, t_us, targets, sensor=0):
+        self.seq = seq
+        self.t_us = t_us
+        self.sensor = sensor
+        self.targets = targets  # DETECTION_DTYPE array
+        self._binary = None
+        self._json = None
+
+    def binary(self):
+        if self._binary is None:
+            rows = sorted(self.targets[["slot", "x_mm", "y_mm", "speed_cms", "gate"]].tolist())
+            slots = 0
+            for row in rows:
+                slots |= 1 << row[0]
+            self._binary = FRAME_HEADER.pack(WIRE_VERSION, slots, self.sensor, self.seq & 0xFFFF,
+                                             self.t_us % TIME_WRAP_US) + \
+                b''.join(TARGET_RECORD.pack(*row[1:]) for row in rows)
+        return self._binary
+
+    def json(self):
+        if self._json is None:
+            self._json = json.dumps({
+                "seq": self.seq,
+                "t_us": self.t_us,
+                "sensor": self.sensor,
+                "targets": [
+                    {"slot": slot, "x_mm": x, "y_mm": y, "speed_cms": speed, "gate": gate}
+                    for slot, x, y, speed, gate in self.targets[["slot", "x_mm", "y_mm", "speed_cms", "gate"]].tolist()
+                ],
+            }, separators=(',', ':'))
+        return self._json
+
+    def encode(self, subprotocol):
+        return self.binary() if subprotocol == BINARY_SUBPROTOCOL else self.json()
+
+
+class WireEvent:
+    """
+    One derived event (events.py). Events are rare, so they are sent as
+    JSON text whichever format the client picked.
+    """
+
+    __slots__ = ("seq", "t_us", "event", "_json")
+
+    def __init__(self, seq, t_us, event):
+        self.seq = seq
+        self.t_us = t_us
+        self.event = event
+        self._json = None
+
+    def json(self):
+        if self._json is None:
+            event = self.event
+            self._json = json.dumps({
+                "seq": self.seq,
+                "t_us": self.t_us,
+                "sensor": event.sensor,
+                "event": event.kind,
+                "track_id": event.track_id,
+                "x_mm": event.x_mm,
+                "y_mm": event.y_mm,
+                "zone": event.zone,
+                "dwell_s": event.dwell_s,
+            }, separators=(',', ':'))
+        return self._json
+
+    def encode(self, subprotocol):
+        return self.json()
+
+
+def select_subprotocol(connection, subprotocols):
+    """
+    Handshake hook: accept the first format the client offers, and accept
+    clients that offer none (they get JSON).
+    """
+    for subprotocol in subprotocols:
+        if subprotocol in SUBPROTOCOLS:
+            return subprotocol
+    return None
+
+
+def negotiate(websocket, params):
+    """
+    Pick the payload format for a connection: an explicit ?format= wins,
+    then the negotiated subprotocol, then JSON.
+    """
+    requested = params.get("format", [None])[0]
+    if requested is not None:
+        if requested not in FORMATS:
+            raise ValueError(f"unknown format {requested!r}")
+        return FORMATS[requested]
+    return websocket.subprotocol or JSON_SUBPROTOCOL
+
+
+def decode_binary(message, now_us=None):
+    """
+    Parse a binary frame back into the JSON shape (for clients and tests).
+    The timestamp is unwrapped to the one nearest now_us (default: this
+    machine's clock); seq stays truncated to 16 bits.
+    """
+    version, slots, sensor, seq, t_us = FRAME_HEADER.unpack_from(message)
+    if version != WIRE_VERSION:
+        raise ValueError(f"unsupported wire version {version}")
+    if now_us is None:
+        now_us = time.time_ns() // 1000
+    half = TIME_WRAP_US // 2
+    t_us = now_us - (now_us - t_us + half) % TIME_WRAP_US + half
+    targets = []
+    offset = FRAME_HEADER.size
+    for slot in range(8):
+        if slots & (1 << slot):
+            x, y, speed, gate = TARGET_RECORD.unpack_from(message, offset)
+            targets.append({"slot": slot, "x_mm": x, "y_mm": y, "speed_cms": speed, "gate": gate})
+            offset += TARGET_RECORD.size
+    return {"seq": seq, "t_us": t_us, "sensor": sensor, "targets": targets}
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+RANGE_MAX_MM = 8000  # Sensor range covered by the label grid (as drawn by hex-vis.py)
+FOV_DEG = 60  # Half of the field of view
+ZONE_CELL_MM = 50  # Label grid resolution
+
+# Zone definitions, JSON:
+# {"zones": [{"name": "door", "polygon": [[x_mm, y_mm], ...], "sensor": 0}, ...]}
+# Zones without a sensor apply to every sensor.
+RADAR_ZONES = os.environ.get('RADAR_ZONES', 'zones.json')
+RELOAD_INTERVAL = 1.0  # Seconds between checks of the zone file's mtime
+
+Zone = namedtuple("Zone", ["index", "name", "polygon", "sensor"])
+
+
+def load_zones(path):
+    with open(path) as f:
+        spec = json.load(f)
+    zones = []
+    for i, zone in enumerate(spec.get("zones", [])):
+        polygon = np.asarray(zone["polygon"], dtype=np.float64)
+        if polygon.ndim != 2 or polygon.shape[1] != 2 or len(polygon) < 3:
+            raise ValueError(f"zone {zone.get('name', i)!r} needs a polygon of at least 3 [x_mm, y_mm] points")
+        zones.append(Zone(i, zone.get("name", f"zone{i}"), polygon, zone.get("sensor")))
+    return zones
+
+
+class LabelGrid:
+    """
+    Cells of ZONE_CELL_MM over x in [-range, range], y in [0, range] (mm),
+    with a mask of the cells inside the sensor's range and field of view.
+    """
+
+    def __init__(self, cell_mm=ZONE_CELL_MM, range_mm=RANGE_MAX_MM, fov_deg=FOV_DEG):
+        self.cell_mm = cell_mm
+        self.range_mm = range_mm
+        self.shape = (int(np.ceil(range_mm / cell_mm)), int(np.ceil(2 * range_mm / cell_mm)))  # rows (y), columns (x)
+        rows, columns = np.indices(self.shape)
+        self.center_x = (columns + 0.5) * cell_mm - range_mm
+        self.center_y = (rows + 0.5) * cell_mm
+        angle = np.degrees(np.arctan2(self.center_x, self.center_y))
+        self.in_view = (np.hypot(self.center_x, self.center_y) <= range_mm) & (np.abs(angle) <= fov_deg)
+
+    def cells(self, x_mm, y_mm):
+        """
+        Flat cell index for each point, -1 outside the grid.
+        """
+        column = np.floor((np.asarray(x_mm, dtype=np.float64) + self.range_mm) / self.cell_mm).astype(np.int64)
+        row = np.floor(np.asarray(y_mm, dtype=np.float64) / self.cell_mm).astype(np.int64)
+        inside = (column >= 0) & (column < self.shape[1]) & (row >= 0) & (row < self.shape[0])
+        return np.where(inside, row * self.shape[1] + column, -1)
+
+    def rasterize(self, polygon):
+        """
+        Mask of the in-view cells whose center lies inside the polygon
+        (even-odd rule), evaluated only over the polygon's bounding box.
+        """
+        mask = np.zeros(self.shape, dtype=bool)
+        (x_min, y_min), (x_max, y_max) = polygon.min(axis=0), polygon.max(axis=0)
+        c0 = max(0, int((x_min + self.range_mm) // self.cell_mm))
+        c1 = min(self.shape[1], int((x_max + self.range_mm) // self.cell_mm) + 1)
+        r0 = max(0, int(y_min // self.cell_mm))
+        r1 = min(self.shape[0], int(y_max // self.cell_mm) + 1)
+        if c0 >= c1 or r0 >= r1:
+            return mask
+        x = self.center_x[r0:r1, c0:c1]
+        y = self.center_y[r0:r1, c0:c1]
+        inside = np.zeros(x.shape, dtype=bool)
+        for (x_a, y_a), (x_b, y_b) in zip(polygon, np.roll(polygon, -1, axis=0)):
+            crosses = (y_a > y) != (y_b > y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = x_a + (y - y_a) * (x_b - x_a) / (y_b - y_a)
+            inside ^= crosses & (x < x_cross)
+        mask[r0:r1, c0:c1] = inside
+        return mask & self.in_view
+
+
+class ZoneLayer:
+    """
+    Zones of one sensor compiled into a label grid.
+
+    Every cell holds a label naming the exact set of zones covering it
+    (label 0 is no zone), so overlapping zones cost nothing extra at lookup
+    time: a detection's zones are one grid read and one table read.
+    """
+
+    def __init__(self, grid, zones):
+        self.grid = grid
+        self.zones = zones
+        labels = np.zeros(grid.shape, dtype=np.int32)
+        zone_sets = [()]
+        known = {(): 0}
+        for position, zone in enumerate(zones):
+            mask = grid.rasterize(zone.polygon)
+            old = labels[mask]
+            new = np.empty_like(old)
+            for label in np.unique(old):
+                zone_set = zone_sets[label] + (position,)
+                if zone_set not in known:
+                    known[zone_set] = len(zone_sets)
+                    zone_sets.append(zone_set)
+                new[old == label] = known[zone_set]
+            labels[mask] = new
+        self.labels = labels.ravel()
+        self.zone_sets = zone_sets
+        # label x zone membership, for vectorized enter/exit checks
+        self.membership = np.zeros((len(zone_sets), len(zones)), dtype=bool)
+        for label, zone_set in enumerate(zone_sets):
+            self.membership[label, list(zone_set)] = True
+
+    def lookup(self, x_mm, y_mm):
+        """
+        Label per point (0 outside every zone or outside the grid).
+        """
+        cells = self.grid.cells(x_mm, y_mm)
+        return np.where(cells >= 0, self.labels[np.maximum(cells, 0)], 0)
+
+    def names(self, label):
+        return [self.zones[position].name for position in self.zone_sets[label]]
+
+
+class ZoneMap:
+    """
+    Immutable compiled zone file: one ZoneLayer per sensor that has zones of
+    its own, plus the layer of shared zones for every other sensor.
+    """
+
+    def __init__(self, zones, grid=None, mtime=None):
+        self.grid = grid or LabelGrid()
+        self.zones = zones
+        self.mtime = mtime
+        shared = [zone for zone in zones if zone.sensor is None]
+        self.default = ZoneLayer(self.grid, shared)
+        self.layers = {
+            sensor: ZoneLayer(self.grid, [zone for zone in zones if zone.sensor in (None, sensor)])
+            for sensor in {zone.sensor for zone in zones if zone.sensor is not None}
+        }
+
+    @classmethod
+    def load(cls, path, grid=None):
+        mtime = os.stat(path).st_mtime_ns
+        return cls(load_zones(path), grid, mtime)
+
+    def layer(self, sensor):
+        return self.layers.get(sensor, self.default)
+
+    def zones_at(self, sensor, x_mm, y_mm):
+        """
+        Zone names for each point.
+        """
+        layer = self.layer(sensor)
+        return [layer.names(label) for label in layer.lookup(x_mm, y_mm).tolist()]
+
+
+class ZoneEngine:
+    """
+    Holds the current ZoneMap and keeps it in sync with the zone file.
+
+    A watcher thread checks the file's mtime every RELOAD_INTERVAL and
+    compiles a changed file off the ingest path; the new map replaces the
+    old one with a single reference swap, so callers that read .map once per
+    frame always see one consistent map. A file that fails to load leaves
+    the previous map in place. A missing file means no zones.
+    """
+
+    def __init__(self, path=RADAR_ZONES, reload_interval=RELOAD_INTERVAL, grid=None):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.grid = grid or LabelGrid()
+        self.map = ZoneMap([], self.grid)
+        self.reloads = 0
+        self._failed_mtime = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.reload()
+
+    def reload(self):
+        """
+        Recompile the zone file if its mtime changed. Returns True on a swap.
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            if self.map.zones:
+                self.map = ZoneMap([], self.grid)
+                print(f"Zone file {self.path} removed, no zones active")
+                return True
+            return False
+        if mtime in (self.map.mtime, self._failed_mtime):
+            return False
+        try:
+            start = time.perf_counter()
+            zone_map = ZoneMap(load_zones(self.path), self.grid, mtime)
+        except (OSError, ValueError, KeyError) as e:
+            self._failed_mtime = mtime
+            print(f"Zone file {self.path} not loaded, keeping previous zones: {e}")
+            return False
+        self.map = zone_map
+        self.reloads += 1
+        print(f"Loaded {len(zone_map.zones)} zones from {self.path} in {time.perf_counter() - start:.3f} s")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            self.reload()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._watch, daemon=True, name="zone-watcher")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def lookup(self, sensor, x_mm, y_mm):
+        """
+        Returns (layer, labels) from one consistent map.
+        """
+        layer = self.map.layer(sensor)
+        return layer, layer.lookup(x_mm, y_mm)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a zone file and look up points.")
+    parser.add_argument("path", nargs="?", default=RADAR_ZONES, help="zone file (default: $RADAR_ZONES)")
+    parser.add_argument("--sensor", type=int, default=0)
+    parser.add_argument("--at", action="append", default=[], metavar="X,Y", help="point in mm to look up")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    zone_map = ZoneMap.load(args.path)
+    layer = zone_map.layer(args.sensor)
+    print(f"{len(zone_map.zones)} zones, {len(layer.zone_sets) - 1} distinct overlaps for sensor {args.sensor}, "
+          f"{layer.labels.size} cells, compiled in {time.perf_counter() - start:.3f} s")
+    for point in args.at:
+        x, y = (float(v) for v in point.split(","))
+        print(f"({x:.0f}, {y:.0f}) mm: {', '.join(zone_map.zones_at(args.sensor, [x], [y])[0]) or 'no zone'}")
+
+
+if __name__ == "__main__":
+    main()